@@ -18,6 +18,8 @@ datas += [
 
 binaries = collect_dynamic_libs('torch')
 binaries += collect_dynamic_libs('torchvision')
+# ONNX Runtime 推理后端 (默认优先使用 int8 / fp32 ONNX 模型)
+binaries += collect_dynamic_libs('onnxruntime')
 
 a = Analysis(
     ['main.py'],
@@ -27,6 +29,7 @@ a = Analysis(
     hiddenimports=[
         'torch',
         'torchvision',
+        'onnxruntime',
         'mne',
         'scipy.special._cdflib',
         'scipy.linalg.cython_blas',
@@ -0,0 +1,128 @@
+# File: benchmarks/early_decision_latency.py
+# 提前决策 (ModelController.set_early_decision) 对命令延迟的影响：
+# 用 data/ 下的录制回放 ModelController (事件触发模式)，按提示统计正确率、从提示开始到命令的延迟和每分钟的正确命令数。
+# 录制中提示间隔约 7 秒，决策后的等待不起作用；为模拟连续打字，把每个提示开始后的一段拼接起来，
+# 得到给定命令间隔的录制 (拼接处按上一段末尾的值平移，消除直流跳变)。
+# 用法: python benchmarks/early_decision_latency.py [--intervals 2000 1500 1250 1000] [--max-recordings 20]
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recordings import recording_paths, _load_raw_bipolar
+from processing.inference_backend import configure_cpu_threads, CPU_INFERENCE_THREADS
+from processing.eog_model_controller import ModelController, CLASS_LABELS, TARGET_SAMPLE_RATE, EOG_TAP_NAME
+
+CHUNK_SAMPLES = TARGET_SAMPLE_RATE // 10  # 回放时每个数据块 100 ms
+
+
+def typing_session(raw, markers, interval):
+    """把每个提示开始后的 interval 个样本依次拼接 -> (x, [(标签, 提示开始样本)])"""
+    markers = sorted(markers, key=lambda m: m[1])
+    segments, cues = [], []
+    position = 0
+    for label, start, _ in markers:
+        segment = raw[:, start:start + interval]
+        if segment.shape[1] < interval:
+            continue
+        if segments:
+            segment = segment - segment[:, :1] + segments[-1][:, -1:]
+        segments.append(segment)
+        cues.append((label, position))
+        position += interval
+    return (np.concatenate(segments, axis=1), cues) if segments else (None, [])
+
+
+def replay(controller, x, early):
+    """回放一段数据 -> [(命令, 发出时的样本序号)]"""
+    commands = []
+    controller.prediction_ready.connect(lambda p: commands.append((p, controller.detector.n_samples)))
+    with contextlib.redirect_stdout(io.StringIO()):
+        controller.set_active(True)
+        controller.set_early_decision(early)
+        for i in range(0, x.shape[1], CHUNK_SAMPLES):
+            controller.process_tap_data(EOG_TAP_NAME, x[:, i:i + CHUNK_SAMPLES])
+            # 模拟实时的时间流逝 (冷却期和反向抑制按墙上时间计)
+            controller.last_prediction_time -= CHUNK_SAMPLES / TARGET_SAMPLE_RATE
+            controller.last_valid_time -= CHUNK_SAMPLES / TARGET_SAMPLE_RATE
+        controller.set_active(False)
+    controller.prediction_ready.disconnect()
+    return commands
+
+
+def score(commands, cues, length):
+    """每个提示取 [提示开始, 下一个提示开始) 内的第一个命令 -> (正确数, 错误数, 多余命令数, 正确命令的延迟 (样本))"""
+    correct = wrong = extra = 0
+    latencies = []
+    bounds = [start for _, start in cues[1:]] + [length]
+    for (label, start), end in zip(cues, bounds):
+        issued = [(c, n) for c, n in commands if start <= n < end]
+        if not issued:
+            continue
+        extra += len(issued) - 1
+        if issued[0][0] == CLASS_LABELS[label].upper():
+            correct += 1
+            latencies.append(issued[0][1] - start)
+        else:
+            wrong += 1
+    return correct, wrong, extra, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Command latency with and without early (partial-window) decisions.")
+    parser.add_argument('--intervals', type=int, nargs='+', default=[2000, 1500, 1250, 1000],
+                        help="spliced command intervals in ms (the unspliced recordings are always included)")
+    parser.add_argument('--max-recordings', type=int, default=0, help="0 = all usable recordings")
+    args = parser.parse_args()
+
+    configure_cpu_threads(CPU_INFERENCE_THREADS)
+    recordings = [r for r in map(_load_raw_bipolar, recording_paths()) if r is not None]
+    if args.max_recordings:
+        recordings = recordings[:args.max_recordings]
+
+    # 模型 (和级联第一级) 只加载一次，各次回放共用
+    with contextlib.redirect_stdout(io.StringIO()):
+        loader = ModelController()
+        loader._load_model()
+    if loader.model is None:
+        print("Model could not be loaded.")
+        return 1
+    print(f"{len(recordings)} recordings, backend {loader.model.name}, "
+          f"cascade {'on' if loader.cascade is not None else 'off'}")
+
+    print(f"{'interval':>9} {'early':>6} {'cues':>5} {'correct':>8} {'wrong':>6} {'extra':>6} "
+          f"{'median ms':>10} {'p90 ms':>7} {'correct/min':>12}")
+    for interval in [None] + args.intervals:
+        for early in (False, True):
+            totals = np.zeros(4, dtype=np.int64)  # 提示数, 正确, 错误, 多余
+            latencies = []
+            seconds = 0.0
+            for raw, markers in recordings:
+                if interval is None:
+                    x, cues = raw, [(label, start) for label, start, _ in sorted(markers, key=lambda m: m[1])]
+                else:
+                    x, cues = typing_session(raw, markers, interval * TARGET_SAMPLE_RATE // 1000)
+                if x is None:
+                    continue
+                controller = ModelController()
+                controller.model, controller.cascade = loader.model, loader.cascade
+                correct, wrong, extra, lat = score(replay(controller, x.astype(np.float32), early), cues, x.shape[1])
+                totals += (len(cues), correct, wrong, extra)
+                latencies.extend(lat)
+                # 每分钟正确命令数只按提示所在的时段计 (不含录制开头的静息)
+                seconds += (x.shape[1] - cues[0][1]) / TARGET_SAMPLE_RATE
+            ms = np.asarray(latencies, dtype=np.float64) * 1000 / TARGET_SAMPLE_RATE
+            median, p90 = (np.median(ms), np.percentile(ms, 90)) if len(ms) else (np.nan, np.nan)
+            print(f"{'natural' if interval is None else interval:>9} {'on' if early else 'off':>6} {totals[0]:5d} "
+                  f"{totals[1] / totals[0]:8.1%} {totals[2] / totals[0]:6.1%} {totals[3]:6d} "
+                  f"{median:10.0f} {p90:7.0f} {totals[1] / seconds * 60:12.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
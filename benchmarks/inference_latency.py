@@ -0,0 +1,67 @@
+# File: benchmarks/inference_latency.py
+# 单窗口 (1, 2, 250) CPU 推理延迟：各推理后端的加载时间和逐次调用延迟 (original 为未转换的训练结构)
+# 用法: python benchmarks/inference_latency.py [--backends onnxruntime torchscript compile eager] [--runs 500]
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from processing.rsca_model import RSCA_Net
+from processing.inference_backend import load_backend, EagerBackend, INFERENCE_BACKENDS
+from processing.eog_model_controller import (MODEL_PATH, CLASS_LABELS, EOG_DERIVED_CHANNELS,
+                                             PREDICTION_WINDOW_SAMPLES)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Single-window CPU inference latency of RSCA_Net backends.")
+    parser.add_argument('--checkpoint', default=MODEL_PATH)
+    parser.add_argument('--backends', nargs='+', default=list(INFERENCE_BACKENDS), choices=INFERENCE_BACKENDS)
+    parser.add_argument('--runs', type=int, default=500)
+    args = parser.parse_args()
+
+    shape = (1, len(EOG_DERIVED_CHANNELS), PREDICTION_WINDOW_SAMPLES)
+    device = torch.device('cpu')
+    rng = np.random.default_rng(0)
+    windows = rng.standard_normal((args.runs,) + shape).astype(np.float32)
+    print(f"torch {torch.__version__}, {torch.get_num_threads()} threads, input {shape}, {args.runs} runs")
+
+    def original():
+        # 未经 for_inference() 转换的训练结构，作为对照
+        model = RSCA_Net(in_channels=shape[1], num_classes=len(CLASS_LABELS))
+        model.load_state_dict(torch.load(args.checkpoint, map_location=device))
+        return EagerBackend(model.eval(), device)
+
+    reference = None
+    print(f"{'backend':<12} {'load ms':>9} {'median us':>10} {'p95 us':>9} {'max |dlogit|':>13}")
+    for name in ['original'] + args.backends:
+        t_start = time.perf_counter()
+        if name == 'original':
+            backend = original()
+        else:
+            backend = load_backend(lambda: RSCA_Net(in_channels=shape[1], num_classes=len(CLASS_LABELS)),
+                                   args.checkpoint, shape, device, backends=(name,))
+        load_ms = (time.perf_counter() - t_start) * 1000
+        if name != 'original' and backend.name != name:
+            print(f"{name:<12} unavailable (fell back to {backend.name})")
+            continue
+
+        latencies = np.empty(args.runs)
+        outputs = np.empty((args.runs, len(CLASS_LABELS)), dtype=np.float32)
+        for i in range(args.runs):
+            t0 = time.perf_counter()
+            outputs[i] = backend(windows[i])[0]
+            latencies[i] = time.perf_counter() - t0
+        if reference is None:
+            reference = outputs
+        error = float(np.abs(outputs - reference).max())
+        print(f"{name:<12} {load_ms:9.0f} {np.median(latencies) * 1e6:10.0f} "
+              f"{np.percentile(latencies, 95) * 1e6:9.0f} {error:13.2e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+# File: benchmarks/quantize_int8.py
+# 离线 int8 量化：用 data/ 下的录制窗口校准，核对与 fp32 模型的精度差异，合格后写出 models/xxx.int8.onnx
+# 用法: python benchmarks/quantize_int8.py [--checkpoint models/xxx.pth] [--min-agreement 0.98] [--force]
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recordings import load_labelled_windows
+from processing.rsca_model import RSCA_Net
+from processing.inference_backend import (OnnxRuntimeInt8Backend, EagerBackend, configure_cpu_threads,
+                                          int8_model_path, CPU_INFERENCE_THREADS, INT8_CALIBRATION_WINDOWS)
+from processing.eog_model_controller import MODEL_PATH, CLASS_LABELS
+
+
+def single_window_latency(backend, windows, runs=500):
+    latencies = np.empty(runs)
+    for i in range(runs):
+        window = windows[i % len(windows)][None]
+        t0 = time.perf_counter()
+        backend(window)
+        latencies[i] = time.perf_counter() - t0
+    return np.median(latencies) * 1000, np.percentile(latencies, 99) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantize RSCA_Net to int8 and check accuracy on data/.")
+    parser.add_argument('--checkpoint', default=MODEL_PATH)
+    parser.add_argument('--min-agreement', type=float, default=0.98,
+                        help="minimum top-1 agreement with the fp32 model on the evaluation windows")
+    parser.add_argument('--force', action='store_true', help="write the model even if the check fails")
+    args = parser.parse_args()
+
+    configure_cpu_threads(CPU_INFERENCE_THREADS)
+    # 评估窗口从提示开始处切，校准窗口取同一段内稍后的位置 (不与评估窗口重合)
+    X, y, _ = load_labelled_windows(offsets=(0,))
+    calibration, _, _ = load_labelled_windows(offsets=(62, 125))
+    rng = np.random.default_rng(0)
+    calibration = calibration[rng.choice(len(calibration), min(INT8_CALIBRATION_WINDOWS, len(calibration)),
+                                         replace=False)]
+    print(f"{len(X)} evaluation windows, {len(calibration)} calibration windows, "
+          f"{CPU_INFERENCE_THREADS} thread(s)")
+
+    model = RSCA_Net(in_channels=X.shape[1], num_classes=len(CLASS_LABELS))
+    model.load_state_dict(torch.load(args.checkpoint, map_location='cpu'))
+    model = model.eval().for_inference()
+    fp32 = EagerBackend(model, torch.device('cpu'))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'model.int8.onnx')
+        OnnxRuntimeInt8Backend.quantize(model, args.checkpoint, calibration, path)
+        int8 = OnnxRuntimeInt8Backend.load(path, torch.device('cpu'))
+
+        reference = np.concatenate([fp32(X[i:i + 64]) for i in range(0, len(X), 64)]).argmax(axis=1)
+        predicted = np.concatenate([int8(X[i:i + 64]) for i in range(0, len(X), 64)]).argmax(axis=1)
+        agreement = float(np.mean(predicted == reference))
+        print(f"{'model':<6} {'accuracy':>9} {'median ms':>10} {'p99 ms':>8}")
+        for name, backend, labels in (('fp32', fp32, reference), ('int8', int8, predicted)):
+            median, p99 = single_window_latency(backend, X)
+            print(f"{name:<6} {np.mean(labels == y):9.3f} {median:10.2f} {p99:8.2f}")
+        print(f"top-1 agreement int8 vs fp32: {agreement:.3f}")
+        for c, label in enumerate(CLASS_LABELS):
+            mask = y == c
+            if mask.any():
+                print(f"  {label:<12} n={mask.sum():4d}  fp32 {np.mean(reference[mask] == c):.3f}  "
+                      f"int8 {np.mean(predicted[mask] == c):.3f}")
+
+        if agreement < args.min_agreement and not args.force:
+            print(f"Agreement below {args.min_agreement:g}, quantized model not written.")
+            return 1
+        out_path = int8_model_path(args.checkpoint)
+        shutil.copyfile(path, out_path)
+        print(f"Wrote {out_path} ({os.path.getsize(out_path) / 1024:.0f} KiB).")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
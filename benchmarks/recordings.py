@@ -0,0 +1,136 @@
+# File: benchmarks/recordings.py
+# 从 data/ 下引导采集的录制文件 (.mat) 中切出带标签的模型输入窗口，供离线评估脚本使用
+
+import glob
+import os
+import sys
+import numpy as np
+from scipy.io import loadmat
+from scipy.signal import sosfiltfilt
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from processing.eog_model_controller import (SignalProcessor, CLASS_LABELS, EOG_DERIVED_CHANNELS,
+                                             PREDICTION_WINDOW_SAMPLES, TARGET_SAMPLE_RATE, EVENT_RETRY_SAMPLES)
+from processing.event_detector import RunningVarianceDetector, EVENT_ONSET
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+# 早期 6 分类录制中的标记名称 -> CLASS_LABELS
+MARKER_ALIASES = {'blink': 'blink_once'}
+
+
+def recording_paths(data_dir=DATA_DIR):
+    return sorted(glob.glob(os.path.join(data_dir, '*', '*.mat')))
+
+
+def load_recording(path):
+    """
+    -> (x, markers)
+    x: (2, n) 与 ModelController 相同的预处理 (双极派生 + 陷波/低通，整段 filtfilt)
+    markers: [(CLASS_LABELS 中的索引, 开始样本, 结束样本)]
+    没有 EOG 通道名、采样率不是 250Hz 或没有标记的录制返回 None
+    """
+    loaded = _load_raw_bipolar(path)
+    if loaded is None:
+        return None
+    raw, markers = loaded
+    return sosfiltfilt(SignalProcessor(fs=TARGET_SAMPLE_RATE).sos, raw, axis=1), markers
+
+
+def _load_raw_bipolar(path):
+    """-> (未滤波的双极派生 (2, n), markers)，条件同 load_recording"""
+    mat = loadmat(path)
+    if int(np.ravel(mat['sampling_rate'])[0]) != TARGET_SAMPLE_RATE or 'marker_labels' not in mat:
+        return None
+    names = [str(c).strip().lower() for c in np.ravel(mat['channels'])]
+    if not all(ch in names for _, plus, minus in EOG_DERIVED_CHANNELS for ch in (plus, minus)):
+        return None
+
+    data = mat['data'].astype(np.float64)
+    x = np.vstack([data[names.index(plus)] - data[names.index(minus)] for _, plus, minus in EOG_DERIVED_CHANNELS])
+
+    labels = [str(s).strip() for s in np.ravel(mat['marker_labels'])]
+    times = np.ravel(mat['marker_timestamps']).astype(np.int64)
+    starts = {}
+    markers = []
+    for label, t in zip(labels, times):
+        name, _, edge = label.rpartition('_')
+        name = MARKER_ALIASES.get(name.lower(), name.lower())
+        if name not in CLASS_LABELS:
+            continue
+        if edge == 'START':
+            starts[name] = t
+        elif edge == 'END' and name in starts:
+            markers.append((CLASS_LABELS.index(name), int(starts.pop(name)), int(t)))
+    return (x, markers) if markers else None
+
+
+def zscore(windows):
+    """与 ModelController 相同的逐窗口、逐通道 Z-Score"""
+    mean = windows.mean(axis=-1, keepdims=True)
+    std = windows.std(axis=-1, keepdims=True)
+    return np.where(std > 1e-6, (windows - mean) / np.maximum(std, 1e-6), windows - mean)
+
+
+def load_labelled_windows(paths=None, offsets=(0,), window=PREDICTION_WINDOW_SAMPLES):
+    """
+    每个标记段在 (开始样本 + offset) 处切一个窗口。
+    -> (X: (n, 2, window) float32, y: (n,) int64, recording: (n,) 所属录制的序号)
+    """
+    X, y, recording = [], [], []
+    for i, path in enumerate(paths if paths is not None else recording_paths()):
+        loaded = load_recording(path)
+        if loaded is None:
+            continue
+        x, markers = loaded
+        for label, start, _ in markers:
+            for offset in offsets:
+                if start + offset + window <= x.shape[1]:
+                    X.append(x[:, start + offset:start + offset + window])
+                    y.append(label)
+                    recording.append(i)
+    X = zscore(np.asarray(X, dtype=np.float64)).astype(np.float32)
+    return X, np.asarray(y, dtype=np.int64), np.asarray(recording, dtype=np.int64)
+
+
+def load_triggered_windows(paths=None, max_attempts=4, cue_margin=PREDICTION_WINDOW_SAMPLES):
+    """
+    按 ModelController 事件触发模式的方式回放录制：滑动方差检测到事件后，在起始处及之后每 EVENT_RETRY_SAMPLES
+    取一个已滤波窗口 (流式滤波，未归一化，单位 uV)，每个事件最多 max_attempts 个。
+    事件起点落在某个提示段 [开始, 结束 + cue_margin) 内时标为该提示的类别，否则标为 fixation (非事件，如漂移、自发眨眼)。
+    -> (X: (n, 2, 250) float32, y: (n,) int64, recording: (n,), event: (n,) 全局事件序号, attempt: (n,))
+    """
+    X, y, recording, event, attempt = [], [], [], [], []
+    n_events = 0
+    fixation = CLASS_LABELS.index('fixation')
+    for i, path in enumerate(paths if paths is not None else recording_paths()):
+        loaded = _load_raw_bipolar(path)
+        if loaded is None:
+            continue
+        raw, markers = loaded
+        detector = RunningVarianceDetector(raw.shape[0], TARGET_SAMPLE_RATE)
+        dsp = SignalProcessor(fs=TARGET_SAMPLE_RATE, num_channels=raw.shape[0])
+        due = []  # [(样本序号, 事件序号, 第几次尝试, 标签)]
+        chunk = TARGET_SAMPLE_RATE // 10
+        for start in range(0, raw.shape[1], chunk):
+            block = raw[:, start:start + chunk]
+            dsp.process(block)
+            for e in detector.update(block):
+                if e.kind != EVENT_ONSET:
+                    continue
+                label = next((c for c, s, t in markers if s <= e.sample_index < t + cue_margin), fixation)
+                due.extend((e.sample_index + k * EVENT_RETRY_SAMPLES, n_events, k, label) for k in range(max_attempts))
+                n_events += 1
+            n = detector.n_samples
+            while due and due[0][0] <= n:
+                _, event_id, k, label = due.pop(0)
+                if detector.active or k == 0:
+                    window = dsp.latest(PREDICTION_WINDOW_SAMPLES)
+                    if window.shape[1] == PREDICTION_WINDOW_SAMPLES:
+                        X.append(window.copy())
+                        y.append(label)
+                        recording.append(i)
+                        event.append(event_id)
+                        attempt.append(k)
+    return (np.asarray(X, dtype=np.float32), np.asarray(y, dtype=np.int64), np.asarray(recording, dtype=np.int64),
+            np.asarray(event, dtype=np.int64), np.asarray(attempt, dtype=np.int64))
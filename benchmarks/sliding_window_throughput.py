@@ -0,0 +1,111 @@
+# File: benchmarks/sliding_window_throughput.py
+# 连续模式 (ModelController.set_continuous_hop) 的吞吐量：
+#   1. 各推理后端在不同批大小下每个窗口的开销
+#   2. 给定数据块间隔时，各 hop 需要的 CPU 占比 (积压的窗口按块合并为一个批次)
+#   3. 用录制数据实际回放 ModelController，测量每秒数据的处理时间
+# 用法: python benchmarks/sliding_window_throughput.py [--backends onnxruntime_int8 eager] [--chunk-ms 100]
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recordings import recording_paths, load_recording
+from processing.rsca_model import RSCA_Net
+from processing.inference_backend import load_backend, INFERENCE_BACKENDS, DEFAULT_BACKEND_ORDER
+from processing.eog_model_controller import (ModelController, MODEL_PATH, CLASS_LABELS, EOG_DERIVED_CHANNELS,
+                                             PREDICTION_WINDOW_SAMPLES, TARGET_SAMPLE_RATE, EOG_TAP_NAME)
+
+BATCH_SIZES = (1, 2, 4, 8, 16, 32)
+HOPS = (1, 2, 5, 10, 25, 50)
+CPU_BUDGET = 0.5  # 推理线程最多占用一个核心的比例，超过视为不可持续
+
+
+def batch_costs(backend, runs):
+    """批大小 -> 每个窗口的开销 (秒，中位数)"""
+    rng = np.random.default_rng(0)
+    costs = {}
+    for batch in BATCH_SIZES:
+        x = rng.standard_normal((batch, len(EOG_DERIVED_CHANNELS), PREDICTION_WINDOW_SAMPLES)).astype(np.float32)
+        backend(x)
+        times = np.empty(max(5, runs // batch))
+        for i in range(len(times)):
+            t0 = time.perf_counter()
+            backend(x)
+            times[i] = time.perf_counter() - t0
+        costs[batch] = float(np.median(times)) / batch
+    return costs
+
+
+def replay(backend, hop, seconds):
+    """用第一个可用的录制回放 ModelController (连续模式)，返回 (每秒数据的处理时间, 动作数)"""
+    for path in recording_paths():
+        loaded = load_recording(path)
+        if loaded is not None:
+            break
+    x = loaded[0].astype(np.float32)[:, :int(seconds * TARGET_SAMPLE_RATE)]
+    chunk = TARGET_SAMPLE_RATE // 10
+
+    controller = ModelController()
+    controller.model = backend
+    controller.is_active = True
+    actions = []
+    controller.prediction_ready.connect(actions.append)
+    # 回放中不需要控制台输出
+    with contextlib.redirect_stdout(io.StringIO()):
+        controller.set_continuous_hop(hop)
+        t0 = time.perf_counter()
+        for i in range(0, x.shape[1], chunk):
+            controller.process_tap_data(EOG_TAP_NAME, x[:, i:i + chunk])
+            controller.last_prediction_time -= chunk / TARGET_SAMPLE_RATE  # 模拟实时的时间流逝
+        elapsed = time.perf_counter() - t0
+    return elapsed / (x.shape[1] / TARGET_SAMPLE_RATE), len(actions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sliding-window (continuous mode) inference throughput.")
+    parser.add_argument('--checkpoint', default=MODEL_PATH)
+    parser.add_argument('--backends', nargs='+', default=list(DEFAULT_BACKEND_ORDER), choices=INFERENCE_BACKENDS)
+    parser.add_argument('--chunk-ms', type=float, default=100.0, help="interval between incoming data chunks")
+    parser.add_argument('--runs', type=int, default=256)
+    parser.add_argument('--replay-seconds', type=float, default=60.0)
+    args = parser.parse_args()
+
+    shape = (1, len(EOG_DERIVED_CHANNELS), PREDICTION_WINDOW_SAMPLES)
+    chunk_samples = args.chunk_ms / 1000 * TARGET_SAMPLE_RATE
+    print(f"torch {torch.__version__}, {torch.get_num_threads()} threads, chunk every {args.chunk_ms:g} ms, "
+          f"CPU budget {CPU_BUDGET:.0%} of one core")
+
+    for name in args.backends:
+        backend = load_backend(lambda: RSCA_Net(in_channels=shape[1], num_classes=len(CLASS_LABELS)),
+                               args.checkpoint, shape, torch.device('cpu'), backends=(name,))
+        if backend.name != name:
+            print(f"\n{name}: unavailable (fell back to {backend.name})")
+            continue
+        costs = batch_costs(backend, args.runs)
+        print(f"\n{name}: per-window cost by batch size")
+        print("  " + "  ".join(f"b={b}: {c * 1000:.2f} ms" for b, c in costs.items()))
+
+        print(f"  {'hop':>4} {'hop ms':>7} {'windows/s':>10} {'batch':>6} {'CPU':>7} {'replay CPU':>11} {'actions':>8}")
+        sustainable = None
+        for hop in HOPS:
+            windows_per_second = TARGET_SAMPLE_RATE / hop
+            batch = max(1, int(round(chunk_samples / hop)))
+            nearest = min(BATCH_SIZES, key=lambda b: abs(b - batch))
+            load = windows_per_second * costs[nearest]
+            replay_load, actions = replay(backend, hop, args.replay_seconds)
+            if max(load, replay_load) <= CPU_BUDGET and sustainable is None:
+                sustainable = hop
+            print(f"  {hop:4d} {hop * 1000 / TARGET_SAMPLE_RATE:7.0f} {windows_per_second:10.1f} {batch:6d} "
+                  f"{load:7.1%} {replay_load:11.1%} {actions:8d}")
+        print(f"  smallest sustainable hop: {sustainable if sustainable else 'none'} samples")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+# File: benchmarks/train_cascade.py
+# 训练级联分类的第一级 (手工特征 + 逻辑回归)，在留出的录制上报告拒绝率和端到端精度，写出 models/eog_cascade_stage1.npz
+# 第一级的目标是 RSCA_Net 自己的决策 (动作类别或 "无动作")，而不是提示标签：它只负责替网络挡掉不会产生动作的窗口
+# 用法: python benchmarks/train_cascade.py [--checkpoint models/xxx.pth] [--C 1.0] [--reject-threshold 0.9] [--dry-run]
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import torch
+from sklearn.linear_model import LogisticRegression
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recordings import load_triggered_windows, zscore
+from processing.rsca_model import RSCA_Net
+from processing.inference_backend import EagerBackend, configure_cpu_threads, CPU_INFERENCE_THREADS
+from processing.eog_model_controller import MODEL_PATH, CLASS_LABELS, CONFIDENCE_THRESHOLD
+from processing.eog_cascade import (CascadeStageOne, eog_features, CASCADE_MODEL_PATH, CASCADE_REJECT_THRESHOLD,
+                                    CASCADE_ACCEPT_THRESHOLD, CASCADE_EASY_CLASSES)
+
+FIXATION = CLASS_LABELS.index('fixation')
+SWEEP_REJECT_THRESHOLDS = (0.8, 0.85, 0.9, 0.95, 0.98)
+
+
+def actions(probabilities):
+    """与 ModelController._decide 相同的门限：置信度不足或 fixation 都视为无动作 (FIXATION)"""
+    best = probabilities.argmax(axis=1)
+    return np.where((probabilities.max(axis=1) >= CONFIDENCE_THRESHOLD) & (best != FIXATION), best, FIXATION)
+
+
+def replay_events(decided, event, attempt):
+    """
+    按事件触发模式回放：每个事件依次尝试，第一个给出动作的窗口即为该事件的结果，之后的尝试不再运行。
+    -> (每个事件的动作 (无动作为 FIXATION), 每个窗口是否被实际尝试)
+    """
+    order = np.lexsort((attempt, event))
+    result = {}
+    tried = np.zeros(len(event), dtype=bool)
+    for i in order:
+        e = int(event[i])
+        if e in result and result[e] != FIXATION:
+            continue
+        tried[i] = True
+        result[e] = int(decided[i])
+    return result, tried
+
+
+def evaluate(name, decided, y, event, attempt, network_run):
+    """打印端到端 (事件级) 指标；network_run: 每个窗口是否运行了网络"""
+    result, tried = replay_events(decided, event, attempt)
+    cue = {int(e): int(label) for e, label in zip(event, y)}
+    cued = [e for e in result if cue[e] != FIXATION]
+    idle = [e for e in result if cue[e] == FIXATION]
+    accuracy = np.mean([result[e] == cue[e] for e in cued])
+    false_actions = np.mean([result[e] != FIXATION for e in idle]) if idle else 0.0
+    runs = int(np.count_nonzero(network_run & tried))
+    print(f"{name:<14} {accuracy:9.3f} {false_actions:9.3f} {runs:9d} {runs / max(tried.sum(), 1):9.1%}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the cascade stage one on data/ and report its effect.")
+    parser.add_argument('--checkpoint', default=MODEL_PATH)
+    parser.add_argument('--C', type=float, default=1.0, help="inverse L2 regularization strength")
+    parser.add_argument('--reject-threshold', type=float, default=CASCADE_REJECT_THRESHOLD,
+                        help="P(fixation) threshold used for the end-to-end comparison")
+    parser.add_argument('--dry-run', action='store_true', help="report only, do not write the model")
+    args = parser.parse_args()
+
+    configure_cpu_threads(CPU_INFERENCE_THREADS)
+    X, y, recording, event, attempt = load_triggered_windows()
+    # 偶数序号的录制用于训练，奇数序号的录制留出评估 (同一录制的窗口不会同时出现在两边)
+    train = recording % 2 == 0
+    test = ~train
+    print(f"{len(X)} triggered windows from {len(np.unique(event))} events "
+          f"({train.sum()} train / {test.sum()} held-out), {np.mean(y == FIXATION):.0%} outside any cue")
+
+    model = RSCA_Net(in_channels=X.shape[1], num_classes=len(CLASS_LABELS))
+    model.load_state_dict(torch.load(args.checkpoint, map_location='cpu'))
+    network = EagerBackend(model.eval().for_inference(), torch.device('cpu'))
+    Z = zscore(X.astype(np.float64)).astype(np.float32)
+    logits = np.concatenate([network(Z[i:i + 64]) for i in range(0, len(Z), 64)]).astype(np.float64)
+    network_probabilities = np.exp(logits - logits.max(axis=1, keepdims=True))
+    network_probabilities /= network_probabilities.sum(axis=1, keepdims=True)
+    target = actions(network_probabilities)
+    print(f"network acts on {np.mean(target != FIXATION):.0%} of the windows")
+
+    # --- 训练 (所有类别都要出现在 coef 中，缺少的类别补一个极小的截距) ---
+    features = eog_features(X)
+    mean, scale = features[train].mean(axis=0), features[train].std(axis=0) + 1e-9
+    classifier = LogisticRegression(C=args.C, max_iter=5000)
+    classifier.fit((features[train] - mean) / scale, target[train])
+    coef = np.zeros((len(CLASS_LABELS), features.shape[1]))
+    intercept = np.full(len(CLASS_LABELS), -30.0)
+    coef[classifier.classes_], intercept[classifier.classes_] = classifier.coef_, classifier.intercept_
+    easy = [CLASS_LABELS.index(c) for c in CASCADE_EASY_CLASSES]
+    stage_one = CascadeStageOne(mean, scale, coef, intercept, easy_classes=easy, fixation_index=FIXATION)
+
+    # --- 留出录制上的窗口级分流 ---
+    t0 = time.perf_counter()
+    probabilities = stage_one.predict_proba(X[test])
+    cost_us = (time.perf_counter() - t0) / test.sum() * 1e6
+    reference = target[test]
+    print(f"\nstage one: {cost_us:.0f} us/window; held-out window routing")
+    print(f"{'reject >=':>9} {'rejected':>9} {'lost acts':>9} {'resolved':>9} {'res. agree':>10} {'agreement':>9}")
+    for threshold in SWEEP_REJECT_THRESHOLDS:
+        stage_one.reject_threshold = threshold
+        rejected, resolved = stage_one.route(probabilities)
+        cascade = reference.copy()
+        cascade[rejected] = FIXATION
+        cascade[resolved] = actions(probabilities[resolved])
+        would_act = reference != FIXATION
+        lost = np.count_nonzero(rejected & would_act) / max(np.count_nonzero(would_act), 1)
+        resolved_agreement = np.mean(cascade[resolved] == reference[resolved]) if resolved.any() else float('nan')
+        print(f"{threshold:9.2f} {np.mean(rejected):9.1%} {lost:9.1%} {np.mean(resolved):9.1%} "
+              f"{resolved_agreement:10.3f} {np.mean(cascade == reference):9.3f}")
+    stage_one.reject_threshold = args.reject_threshold
+    stage_one.accept_threshold = CASCADE_ACCEPT_THRESHOLD
+
+    # --- 留出录制上的端到端 (事件级) 对比 ---
+    rejected, resolved = stage_one.route(probabilities)
+    cascade = reference.copy()
+    cascade[rejected] = FIXATION
+    cascade[resolved] = actions(probabilities[resolved])
+    print(f"\nheld-out events, reject >= {args.reject_threshold}, accept >= {CASCADE_ACCEPT_THRESHOLD} "
+          f"for {', '.join(CASCADE_EASY_CLASSES)}")
+    print(f"{'pipeline':<14} {'cue acc':>9} {'false act':>9} {'net runs':>9} {'of tried':>9}")
+    everything = np.ones(test.sum(), dtype=bool)
+    baseline = evaluate('network only', reference, y[test], event[test], attempt[test], everything)
+    result = evaluate('cascade', cascade, y[test], event[test], attempt[test], ~(rejected | resolved))
+    print(f"event-level agreement with network only: {np.mean([result[e] == baseline[e] for e in baseline]):.3f}")
+
+    if not args.dry_run:
+        stage_one.save(CASCADE_MODEL_PATH, args.checkpoint)
+        print(f"Wrote {CASCADE_MODEL_PATH}.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
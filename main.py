@@ -1,5 +1,6 @@
 import sys
 import os
+import multiprocessing
 
 import pyqtgraph as pg
 # 开启 OpenGL 硬件加速，这会让绘图从 CPU 转移到 GPU
@@ -276,6 +277,8 @@ QMenu::item:selected { background-color: #E8F0FE; color: #1967D2; }
 """
 
 if __name__ == '__main__':
+    # ICA 训练使用 spawn 方式的进程池，打包 (PyInstaller) 后需要此调用
+    multiprocessing.freeze_support()
     #app.setStyle('Windows')
     os.environ["QT_ENABLE_HIGHDPI_SCALING"] = "1"
     app = QApplication(sys.argv)
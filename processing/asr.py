@@ -0,0 +1,147 @@
+# File: processing/asr.py
+
+import numpy as np
+
+# --- 配置参数 ---
+ASR_CUTOFF = 20.0  # 阈值：校准数据 RMS 分布的标准差倍数 (越大越保守)
+ASR_WINDOW_SECONDS = 0.5  # 统计 RMS / 协方差的时间窗口
+ASR_WINDOW_OVERLAP = 0.66  # 校准时 RMS 窗口的重叠比例
+ASR_BLOCK_SECONDS = 0.1  # 校准时估计鲁棒协方差的子块长度
+ASR_UPDATE_SECONDS = 0.032  # 处理时重建矩阵的更新间隔 (约 30 次/秒，与数据块大小无关)
+ASR_MAX_DIMS_FRACTION = 0.66  # 单次最多重建的子空间维数比例
+ASR_MIN_CALIBRATION_SECONDS = 15.0  # 校准数据的最短长度
+
+
+class ArtifactSubspaceReconstruction:
+    """
+    流式伪迹子空间重建 (ASR, Kothe & Jung 2016)。
+    校准：由干净数据的鲁棒协方差得到混合矩阵 M = sqrtm(C)，在其主成分方向上统计窗口 RMS 的分布，
+    预先算好阈值矩阵 T (每个方向允许的最大幅度)。
+    处理：指数加权地递推更新协方差 (每个新样本 O(n^2))，每 ASR_UPDATE_SECONDS 做一次 n×n 特征分解，
+    方差超过阈值的主成分视为伪迹，用其余成分和 M 重建；新旧重建矩阵之间用升余弦过渡，避免块边界跳变。
+    完全因果 (不向前看)，不引入额外延迟。输入需已高通 (无直流偏置)。
+    只作用于 channel_indices 指定的通道 (与 ICA 一致，EOG 通道保留原样)。
+    """
+
+    def __init__(self, channel_indices, sampling_rate):
+        self.channel_indices = np.asarray(channel_indices, dtype=np.int64)
+        self.sampling_rate = float(sampling_rate)
+        n = len(self.channel_indices)
+        self.mixing = np.eye(n)  # M
+        self.threshold = None  # T: (n, n)
+        self.calibration_cov = np.eye(n)
+        self._update_samples = max(1, int(round(ASR_UPDATE_SECONDS * self.sampling_rate)))
+        # 每个样本的协方差遗忘系数：等效窗口长度 ASR_WINDOW_SECONDS
+        self._decay = np.exp(-1.0 / (ASR_WINDOW_SECONDS * self.sampling_rate))
+        self._max_dims = max(1, int(round(ASR_MAX_DIMS_FRACTION * n)))
+        self.reconstructed_fraction = 0.0  # 发生重建的更新所占比例 (指数平滑)
+        self.reset()
+
+    @property
+    def calibrated(self):
+        return self.threshold is not None
+
+    def reset(self):
+        """清除处理状态 (重新开始采集时调用)"""
+        self.cov = self.calibration_cov.copy()
+        self.reconstruction = None  # 上一次的重建矩阵，None 表示恒等
+        self._carry = 0  # 距离下一次更新还需的样本数
+
+    # --- 校准 ---
+    def calibrate(self, data):
+        """data: (n_all_channels, n_samples) 干净的校准数据 (已滤波，未做空间滤波)"""
+        x = np.asarray(data, dtype=np.float64)[self.channel_indices]
+        n, n_samples = x.shape
+        if n < 2:
+            raise ValueError("ASR needs at least 2 channels.")
+        if n_samples < ASR_MIN_CALIBRATION_SECONDS * self.sampling_rate:
+            raise ValueError(f"ASR calibration needs at least {ASR_MIN_CALIBRATION_SECONDS:g}s of data.")
+        x = x - x.mean(axis=1, keepdims=True)
+
+        # 1. 鲁棒协方差：各子块协方差的逐元素中位数 (少数伪迹子块不影响结果)
+        block = max(n, int(ASR_BLOCK_SECONDS * self.sampling_rate))
+        n_blocks = n_samples // block
+        blocks = x[:, :n_blocks * block].reshape(n, n_blocks, block)
+        covs = np.einsum('ibk,jbk->bij', blocks, blocks) / block
+        cov = np.median(covs, axis=0)
+        cov = 0.5 * (cov + cov.T)
+
+        # 2. M = sqrtm(C)，在其特征方向上统计窗口 RMS
+        eigvals, eigvecs = np.linalg.eigh(cov)
+        eigvals = np.maximum(eigvals, 1e-12 * eigvals.max())
+        mixing = eigvecs @ np.diag(np.sqrt(eigvals)) @ eigvecs.T
+        _, basis = np.linalg.eigh(mixing)
+        power = (basis.T @ x) ** 2
+
+        window = int(ASR_WINDOW_SECONDS * self.sampling_rate)
+        step = max(1, int(round(window * (1.0 - ASR_WINDOW_OVERLAP))))
+        cumsum = np.concatenate((np.zeros((n, 1)), np.cumsum(power, axis=1)), axis=1)
+        starts = np.arange(0, n_samples - window + 1, step)
+        rms = np.sqrt((cumsum[:, starts + window] - cumsum[:, starts]) / window)
+
+        # 3. 每个方向的阈值 = 中位数 + cutoff * 鲁棒标准差 (MAD)
+        mu = np.median(rms, axis=1)
+        sigma = 1.4826 * np.median(np.abs(rms - mu[:, None]), axis=1)
+        self.threshold = np.diag(mu + ASR_CUTOFF * sigma) @ basis.T
+        self.mixing = mixing
+        self.calibration_cov = cov
+        self.reset()
+
+    # --- 处理 ---
+    def process(self, chunk):
+        """
+        chunk: (n_all_channels, n) -> 新数组，channel_indices 各行已清理，其余行不变
+        chunk 本身不修改 (它可能已被录制缓冲或排队的信号持有)
+        """
+        if not self.calibrated or chunk.shape[1] == 0:
+            return chunk
+        out = chunk.copy()
+        x = chunk[self.channel_indices].astype(np.float64)
+        cleaned = np.empty_like(x)
+
+        # 按更新间隔切分，块边界与数据包大小无关
+        start = 0
+        n_samples = x.shape[1]
+        while start < n_samples:
+            stop = min(n_samples, start + (self._carry or self._update_samples))
+            segment = x[:, start:stop]
+            m = segment.shape[1]
+
+            # 递推协方差：C <- d^m C + (1 - d^m) * 段内平均外积
+            decay = self._decay ** m
+            self.cov = decay * self.cov + (1.0 - decay) * (segment @ segment.T) / m
+
+            new = self._reconstruction_matrix()
+            cleaned[:, start:stop] = self._blend(self.reconstruction, new, segment)
+            self.reconstruction = new
+            self._carry = (self._carry or self._update_samples) - m
+            start = stop
+
+        out[self.channel_indices] = cleaned
+        return out
+
+    def _reconstruction_matrix(self):
+        """当前协方差下的重建矩阵；没有需要去除的成分时返回 None"""
+        n = len(self.channel_indices)
+        eigvals, eigvecs = np.linalg.eigh(self.cov)
+        # 阈值矩阵投影到当前特征方向上，得到每个方向允许的最大方差
+        allowed = np.sum((self.threshold @ eigvecs) ** 2, axis=0)
+        keep = (eigvals < allowed) | (np.arange(n) < n - self._max_dims)
+
+        rejected = not keep.all()
+        self.reconstructed_fraction += 0.01 * (float(rejected) - self.reconstructed_fraction)
+        if not rejected:
+            return None
+        # R = M * pinv(keep .* (V^T M)) * V^T
+        return self.mixing @ np.linalg.pinv(keep[:, None] * (eigvecs.T @ self.mixing)) @ eigvecs.T
+
+    @staticmethod
+    def _blend(old, new, segment):
+        """在本段内从旧重建矩阵升余弦过渡到新矩阵"""
+        if old is None and new is None:
+            return segment
+        m = segment.shape[1]
+        weight = 0.5 * (1.0 - np.cos(np.pi * np.arange(1, m + 1) / m))
+        new_part = segment if new is None else new @ segment
+        old_part = segment if old is None else old @ segment
+        return weight * new_part + (1.0 - weight) * old_part
@@ -0,0 +1,70 @@
+# File: processing/autoscale.py
+
+import numpy as np
+
+# --- 配置参数 ---
+AUTOSCALE_PERCENTILES = (1.0, 99.0)  # 每个数据块统计的上下分位数
+AUTOSCALE_HISTORY_BLOCKS = 50  # 参与中位数平滑的块数 (100 ms/块 -> 约 5 s)
+AUTOSCALE_MARGIN = 1.25  # 在分位数范围外留出的余量
+AUTOSCALE_CHANGE_RATIO = 0.15  # 范围变化超过当前半幅的该比例才重新发布
+MIN_HALF_RANGE_UV = 5.0  # 最小半幅，避免平直信号被放大成噪声
+
+
+class RobustRangeTracker:
+    """
+    实时波形的鲁棒 Y 轴范围估计 (运行在处理线程)。
+    每个数据块对所有通道一次性求上下分位数，再对最近 AUTOSCALE_HISTORY_BLOCKS 个块取中位数：
+    单次眨眼/运动伪迹只影响少数几个块，不会把坐标轴撑大。
+    只有范围变化足够大时 update() 才返回新结果，UI 不必每帧重新布局。
+    """
+
+    def __init__(self, num_channels, history=AUTOSCALE_HISTORY_BLOCKS):
+        self.history = int(history)
+        self.reset(num_channels)
+
+    def reset(self, num_channels):
+        self.num_channels = int(num_channels)
+        self._lo = np.zeros((self.history, self.num_channels), dtype=np.float32)
+        self._hi = np.zeros((self.history, self.num_channels), dtype=np.float32)
+        self._count = 0
+        self._center = None  # 已发布的中心 / 半幅
+        self._half = None
+
+    def update(self, chunk):
+        """
+        chunk: (n_channels, n) 新数据块
+        返回 (n_channels, 2) 的 [下限, 上限]；范围没有明显变化时返回 None
+        """
+        if chunk.shape[0] != self.num_channels or chunk.shape[1] == 0:
+            return None
+
+        # 用 partition 取顺序统计量，比 np.percentile 的插值快得多
+        n_samples = chunk.shape[1]
+        k_lo = int(AUTOSCALE_PERCENTILES[0] / 100.0 * (n_samples - 1))
+        k_hi = int(np.ceil(AUTOSCALE_PERCENTILES[1] / 100.0 * (n_samples - 1)))
+        ordered = np.partition(chunk, (k_lo, k_hi), axis=1)
+
+        slot = self._count % self.history
+        self._lo[slot] = ordered[:, k_lo]
+        self._hi[slot] = ordered[:, k_hi]
+        self._count += 1
+
+        n = min(self._count, self.history)
+        mid = n // 2
+        lo = np.partition(self._lo[:n], mid, axis=0)[mid]
+        hi = np.partition(self._hi[:n], mid, axis=0)[mid]
+        center = 0.5 * (lo + hi)
+        half = np.maximum(0.5 * (hi - lo) * AUTOSCALE_MARGIN, MIN_HALF_RANGE_UV)
+
+        if self._center is None:
+            self._center, self._half = center, half
+        else:
+            tolerance = AUTOSCALE_CHANGE_RATIO * self._half
+            changed = (np.abs(half - self._half) > tolerance) | (np.abs(center - self._center) > tolerance)
+            if not np.any(changed):
+                return None
+            # 只替换变化明显的通道，其余通道保持原值，UI 侧可以跳过它们
+            self._center = np.where(changed, center, self._center)
+            self._half = np.where(changed, half, self._half)
+
+        return np.stack((self._center - self._half, self._center + self._half), axis=1)
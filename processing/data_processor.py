@@ -5,22 +5,36 @@ import collections
 from PyQt6.QtCore import QObject, pyqtSignal, pyqtSlot, QTimer, QThread
 import scipy.signal as signal
 import threading
+import time
 
-# --- MNE 导入优化 ---
-try:
-    from mne import create_info, pick_types
-    from mne.io import RawArray
-
-    MNE_AVAILABLE = True
-except ImportError:
-    print("Warning: MNE-Python is not installed. ICA cleaning will not be available.")
-    MNE_AVAILABLE = False
-    create_info, pick_types, RawArray = None, None, None
+from .plot_buffers import PlotPyramid
+from .autoscale import RobustRangeTracker
+from .multirate import PolyphaseDecimator, MultirateTap
+from .spatial_filter import SpatialFilter, REFERENCE_LINKED_MASTOIDS, REFERENCE_CUSTOM, MASTOID_NAMES
 
 # --- 常量定义 ---
 FFT_UPDATE_RATE = 4  # 每秒更新 FFT 次数
 FFT_WINDOW_SECONDS = 1.0  # FFT 时间窗口
 PROCESSING_INTERVAL_MS = 100  # 数据处理间隔
+PLOT_LEVEL_FACTORS = (1, 10, 100)  # 绘图金字塔各层相对绘图采样率的抽取倍数
+
+# --- 数据消费者 ---
+# 各消费者通过 subscribe() 声明需要的通道和速率，处理线程只计算有人订阅的部分
+CONSUMER_PLOTS = 'plots'
+CONSUMER_FFT = 'fft'
+CONSUMER_BAND_POWER = 'band_power'
+CONSUMER_RECORDING = 'recording'
+CONSUMER_CALIBRATION = 'calibration'
+CONSUMER_ONLINE_ICA = 'online_ica'  # 在线 ICA 需要空间滤波之前的全部通道 (ica_input_ready)
+CONSUMER_ASR = 'asr'
+SPECTRAL_CONSUMERS = (CONSUMER_FFT, CONSUMER_BAND_POWER)
+
+# --- 校准数据的用途 (calibration_data_ready 的第一个参数) ---
+CALIBRATION_ICA = 'ica'
+CALIBRATION_ASR = 'asr'
+
+# channels: 通道索引元组，None 表示全部通道; rate: 期望的更新/采样速率 (Hz)
+Subscription = collections.namedtuple('Subscription', ['channels', 'rate'])
 
 BANDS = {
     'Delta': [0.5, 4],
@@ -38,8 +52,16 @@ class DataProcessor(QObject):
     stats_ready = pyqtSignal(int, int)
     marker_added_live = pyqtSignal()
     band_power_ready = pyqtSignal(np.ndarray)
-    filtered_data_ready = pyqtSignal(np.ndarray)
-    calibration_data_ready = pyqtSignal(np.ndarray)
+    # (校准用途 CALIBRATION_*, 校准数据)
+    calibration_data_ready = pyqtSignal(str, np.ndarray)
+    # (校准用途 CALIBRATION_*, 错误信息)：校准没有开始或没有收到数据，UI 据此恢复按钮状态
+    calibration_failed = pyqtSignal(str, str)
+    # 空间滤波之前的滤波数据，供在线 ICA 使用
+    ica_input_ready = pyqtSignal(np.ndarray)
+    # 自动缩放：(n_channels, 2) 的 [下限, 上限]，只在范围明显变化时发出
+    autoscale_ranges_ready = pyqtSignal(np.ndarray)
+    # 多速率输出：(tap 名称, (len(channels), n) 降采样后的数据，可包含派生通道)
+    tap_data_ready = pyqtSignal(str, np.ndarray)
 
     def __init__(self):
         super().__init__()
@@ -52,11 +74,17 @@ class DataProcessor(QObject):
         # 原始数据队列 (限制长度防止内存溢出)
         self.raw_data_buffer = collections.deque(maxlen=200)
 
-        # 绘图 Buffer 使用 float32
+        # 绘图 Buffer 使用 float32：版本化三缓冲，UI 无锁读取
+        # 金字塔各层容量相同，第 0 层覆盖 120 s，min/max 层可回看数十分钟
         self.plot_buffer_samples = 12000
-        self.plot_buffer = np.zeros((self.num_channels, self.plot_buffer_samples), dtype=np.float32)
-        self.plot_buffer_ptr = 0
-        self.plot_buffer_lock = threading.Lock()
+        self.plot_pyramid = PlotPyramid(self.num_channels, self.downsample_factor,
+                                        PLOT_LEVEL_FACTORS, self.plot_buffer_samples)
+        self.plot_levels = self.plot_pyramid.levels
+        self.plot_buffer_lock = threading.Lock()  # 只用于串行化写入方
+
+        # Y 轴自动缩放 (Vert Scale = Auto 时启用)
+        self.autoscale_enabled = False
+        self.range_tracker = RobustRangeTracker(self.num_channels)
 
         # FFT Buffer 使用 float32
         self.fft_samples = int(self.sampling_rate * FFT_WINDOW_SECONDS)
@@ -90,17 +118,43 @@ class DataProcessor(QObject):
         # 定时器
         self.processing_timer = None
         self.fft_timer = None
+        self.stats_timer = None
+        self.fft_rate = FFT_UPDATE_RATE  # LoadGovernor 设定的 FFT 刷新率上限
+        self.band_power_enabled = True
+        self.is_running = False
+
+        # 消费者订阅 (写时复制，整体替换，处理线程读取时无需加锁)
+        self.subscriptions = {}
+        self.active_channels = None  # 需要滤波的通道索引，None 表示全部
+        self.spectral_channels = None  # 需要做 FFT 的通道索引
+
+        # 命名的多速率输出 (抗混叠降采样)，同名 tap 只计算一次，所有消费者共享
+        self.taps = {}
+
+        # 耗时统计 (ms, 指数平滑)，供 UI 侧的 LoadGovernor 读取
+        self.processing_cost_ms = 0.0
+        self.fft_cost_ms = 0.0
         self.calibration_timer = None
 
+        # 校准数据采集 (ICA / ASR 共用)
+        self.calibration_target = None  # 正在采集的校准用途，None 表示未在采集
+        self.calibration_buffer = []
+
         # ICA 状态
-        self.is_calibrating_ica = False
-        self.ica_calibration_buffer = []
         self.ica_model = None
         self.ica_bad_indices = []
         self.ica_enabled = False
         self.ica_filter_matrix_ = None
         self.eeg_indices_ = None
         self.eog_indices_ = None
+        self.online_ica_active = False
+
+        # ASR 状态
+        self.asr = None
+        self.asr_enabled = False
+
+        # 空间滤波 (ICA + 重参考 + 派生双极通道，合成为一个矩阵)
+        self.spatial_filter = SpatialFilter(self.num_channels)
 
         self.set_num_channels(self.num_channels)
 
@@ -116,12 +170,21 @@ class DataProcessor(QObject):
             self.channel_names = [f'CH {i + 1}' for i in range(self.num_channels)]
 
             # 重置 Buffer (保持 float32)
-            self.plot_buffer = np.zeros((num_channels, self.plot_buffer_samples), dtype=np.float32)
-            self.plot_buffer_ptr = 0
+            self.plot_pyramid.reset(num_channels)
+            self.range_tracker.reset(num_channels)
 
             self.fft_buffer = np.zeros((num_channels, self.fft_samples), dtype=np.float32)
             self.fft_ptr = 0
 
+            # 空间滤波配置与通道数相关，ICA 需要重新训练
+            self.spatial_filter.reset(num_channels)
+            self.ica_enabled = False
+            self._clear_asr()
+
+            # 超出范围的订阅通道在这里被丢弃
+            self._rebuild_taps()
+            self._update_demand()
+
             # 重新初始化滤波器状态
             self.update_filter_settings(self.current_hp, self.current_lp)
             self.update_notch_filter(self.notch_enabled, self.current_notch_freq)
@@ -155,6 +218,8 @@ class DataProcessor(QObject):
 
         self.update_filter_settings(self.current_hp, self.current_lp)
         self.update_notch_filter(self.notch_enabled, self.current_notch_freq)
+        self._rebuild_taps()
+        self._clear_asr()
 
     @pyqtSlot(float, float)
     def update_filter_settings(self, high_pass, low_pass):
@@ -222,6 +287,7 @@ class DataProcessor(QObject):
         全流程保持 float32 以获得最佳性能
         """
         if not self.raw_data_buffer: return
+        t_start = time.perf_counter()
 
         # 1. 拼接所有待处理的数据块
         all_chunks = []
@@ -234,39 +300,41 @@ class DataProcessor(QObject):
         self.byte_counter += large_chunk.nbytes
         self.packet_counter += len(all_chunks)
 
-        # 2. 陷波滤波
-        if self.notch_enabled and self.notch_b is not None:
-            # lfilter 输出默认可能会变回 float64，取决于 scipy 版本，这里尽量保持类型
-            notched_chunk, self.notch_zi = signal.lfilter(
-                self.notch_b, self.notch_a, large_chunk, axis=1, zi=self.notch_zi
-            )
-            # 确保还是 float32
-            if notched_chunk.dtype != np.float32:
-                notched_chunk = notched_chunk.astype(np.float32)
-        else:
-            notched_chunk = large_chunk
-
-        # 3. 主滤波器 (SOS)
-        if self.filter_sos is not None:
-            filtered_chunk, self.filter_zi = signal.sosfilt(
-                self.filter_sos, notched_chunk, axis=1, zi=self.filter_zi
-            )
-            if filtered_chunk.dtype != np.float32:
-                filtered_chunk = filtered_chunk.astype(np.float32)
-        else:
-            filtered_chunk = notched_chunk
-
-        # 4. ICA 去伪迹
-        if self.is_calibrating_ica:
-            self.ica_calibration_buffer.append(filtered_chunk)
+        subscriptions = self.subscriptions
+        active = self.active_channels
 
-        if self.ica_enabled and self.ica_filter_matrix_ is not None:
-            final_chunk = self.apply_ica_cleaning(filtered_chunk)
+        # 2-3. 陷波 + 主滤波器，只处理有人订阅的通道
+        if active is None:
+            filtered_chunk = self._filter_channels(large_chunk, slice(None))
         else:
-            final_chunk = filtered_chunk
-
-        # 发出滤波后的数据信号
-        self.filtered_data_ready.emit(final_chunk)
+            # 未订阅的通道置零，不把未滤波的直流偏置混进绘图 / 自动缩放
+            filtered_chunk = np.zeros_like(large_chunk)
+            if len(active):
+                filtered_chunk[active] = self._filter_channels(large_chunk[active], active)
+
+        # 4. 空间滤波：ICA 去伪迹 + 重参考 + 派生通道，一次矩阵乘法
+        # ICA / ASR 校准使用空间滤波之前的数据
+        if self.calibration_target is not None:
+            self.calibration_buffer.append(filtered_chunk)
+        if CONSUMER_ONLINE_ICA in subscriptions:
+            self.ica_input_ready.emit(filtered_chunk)
+
+        # ASR 是时变的非线性操作，不能并入空间滤波矩阵，单独在这里处理
+        asr = self.asr
+        if self.asr_enabled and asr is not None:
+            filtered_chunk = asr.process(filtered_chunk)
+
+        spatial_chunk = self.spatial_filter.apply(filtered_chunk)
+        # 前 num_channels 行是原通道 (视图，不拷贝)，其后是派生通道
+        final_chunk = spatial_chunk[:self.num_channels]
+
+        # 4.5 多速率输出
+        for name, tap in self.taps.items():
+            if max(tap.rows) >= spatial_chunk.shape[0]:
+                continue
+            tap_chunk = tap.decimator.process(spatial_chunk[tap.rows])
+            if tap_chunk.shape[1] > 0:
+                self.tap_data_ready.emit(name, tap_chunk)
 
         # 5. 录制数据
         if self.is_recording:
@@ -275,7 +343,7 @@ class DataProcessor(QObject):
 
         # 6. 更新 FFT 环形缓冲区
         n_new = final_chunk.shape[1]
-        if n_new > 0:
+        if n_new > 0 and any(name in subscriptions for name in SPECTRAL_CONSUMERS):
             start = self.fft_ptr
             end = start + n_new
             if end <= self.fft_samples:
@@ -288,32 +356,55 @@ class DataProcessor(QObject):
                 self.fft_buffer[:, :part2] = final_chunk[:, part1:]
             self.fft_ptr = end % self.fft_samples
 
-        # 7. 更新 Plot 环形缓冲区 (含降采样)
-        downsampled_data = final_chunk[:, ::self.downsample_factor]
-        n_ds_samples = downsampled_data.shape[1]
-
-        if n_ds_samples > 0:
-            # 获取锁，写入绘图缓冲
+        # 7. 更新绘图金字塔 (降采样 + 多级 min/max)
+        plotting = CONSUMER_PLOTS in subscriptions
+        if plotting and final_chunk.shape[1] > 0:
+            # 写入后台缓冲并发布新版本，读者不受影响
             with self.plot_buffer_lock:
-                start = self.plot_buffer_ptr
-                end = start + n_ds_samples
-                if end <= self.plot_buffer_samples:
-                    self.plot_buffer[:, start:end] = downsampled_data
-                else:
-                    part1 = self.plot_buffer_samples - start
-                    part2 = n_ds_samples - part1
-                    self.plot_buffer[:, start:] = downsampled_data[:, :part1]
-                    self.plot_buffer[:, :part2] = downsampled_data[:, part1:]
-                self.plot_buffer_ptr = end % self.plot_buffer_samples
+                self.plot_pyramid.write(final_chunk)
+
+        # 8. 自动缩放范围
+        if plotting and self.autoscale_enabled:
+            ranges = self.range_tracker.update(final_chunk)
+            if ranges is not None:
+                self.autoscale_ranges_ready.emit(ranges)
+
+        cost = (time.perf_counter() - t_start) * 1000
+        self.processing_cost_ms += 0.2 * (cost - self.processing_cost_ms)
+
+    def _filter_channels(self, chunk, rows):
+        """对 chunk (对应 rows 通道) 做陷波 + SOS 滤波，并只更新这些通道的滤波器状态"""
+        if self.notch_enabled and self.notch_b is not None:
+            # lfilter 输出默认可能会变回 float64，取决于 scipy 版本，这里尽量保持类型
+            chunk, self.notch_zi[rows] = signal.lfilter(
+                self.notch_b, self.notch_a, chunk, axis=1, zi=self.notch_zi[rows]
+            )
+
+        if self.filter_sos is not None:
+            chunk, self.filter_zi[:, rows] = signal.sosfilt(
+                self.filter_sos, chunk, axis=1, zi=self.filter_zi[:, rows]
+            )
+
+        # 确保还是 float32
+        if chunk.dtype != np.float32:
+            chunk = chunk.astype(np.float32)
+        return chunk
 
     def calculate_fft(self):
-        """计算 FFT 并发出信号"""
+        """计算 FFT 并发出信号 (只计算订阅了频谱的通道)"""
+        subscriptions = self.subscriptions
+        if not any(name in subscriptions for name in SPECTRAL_CONSUMERS):
+            return
+        t_start = time.perf_counter()
+
         # 1. 从 Ring Buffer 提取对齐的数据 (Copy)
+        rows = self.spectral_channels
+        source = self.fft_buffer if rows is None else self.fft_buffer[rows]
         if self.fft_ptr == 0:
-            data_ordered = self.fft_buffer.copy()
+            data_ordered = source.copy() if rows is None else source
         else:
-            data_ordered = np.concatenate((self.fft_buffer[:, self.fft_ptr:],
-                                           self.fft_buffer[:, :self.fft_ptr]), axis=1)
+            data_ordered = np.concatenate((source[:, self.fft_ptr:],
+                                           source[:, :self.fft_ptr]), axis=1)
 
         # 2. 去趋势 (In-place, 节省内存)
         # type='constant' 相当于减去均值
@@ -326,16 +417,24 @@ class DataProcessor(QObject):
         fft_complex = np.fft.rfft(data_ordered, axis=1)
         # 计算幅度并归一化
         magnitudes = np.abs(fft_complex) / self.fft_samples
+        if rows is not None:
+            # 未订阅的通道补零，保持 (n_channels, n_freqs) 的形状
+            full = np.zeros((self.num_channels, magnitudes.shape[1]), dtype=magnitudes.dtype)
+            full[rows] = magnitudes
+            magnitudes = full
 
         # 发送信号 (使用预计算的频率轴)
-        self.fft_data_ready.emit(self.fft_freqs, magnitudes)
+        if CONSUMER_FFT in subscriptions:
+            self.fft_data_ready.emit(self.fft_freqs, magnitudes)
 
-        # 顺便发送统计数据
-        self.stats_ready.emit(self.packet_counter, self.byte_counter)
-        self.packet_counter = 0
-        self.byte_counter = 0
+        # 5. 计算频带功率 (Band Power)，过载降级时可暂停
+        if self.band_power_enabled and CONSUMER_BAND_POWER in subscriptions:
+            self._emit_band_power(magnitudes[self._band_power_rows()])
+
+        cost = (time.perf_counter() - t_start) * 1000
+        self.fft_cost_ms += 0.2 * (cost - self.fft_cost_ms)
 
-        # 5. 计算频带功率 (Band Power)
+    def _emit_band_power(self, magnitudes):
         psd = magnitudes ** 2
         band_powers = np.zeros(len(BANDS))
 
@@ -347,23 +446,203 @@ class DataProcessor(QObject):
 
         self.band_power_ready.emit(band_powers)
 
-    def get_plot_data(self):
+    def _band_power_rows(self):
+        channels = self.subscriptions[CONSUMER_BAND_POWER].channels
+        return slice(None) if channels is None else list(channels)
+
+    def _emit_stats(self):
+        self.stats_ready.emit(self.packet_counter, self.byte_counter)
+        self.packet_counter = 0
+        self.byte_counter = 0
+
+    # --- 消费者订阅 ---
+    @pyqtSlot(str, object, float)
+    def subscribe(self, name, channels, rate):
+        """
+        声明一个消费者需要的数据。
+        channels: 通道索引列表，None 表示全部通道; rate: 期望速率 (Hz)
+        重复订阅会覆盖之前的声明。
+        """
+        if channels is not None:
+            channels = tuple(sorted(set(int(c) for c in channels)))
+        subscriptions = dict(self.subscriptions)
+        subscriptions[name] = Subscription(channels, float(rate))
+        self.subscriptions = subscriptions
+        self._update_demand()
+        if name in SPECTRAL_CONSUMERS:
+            self._update_fft_timer()
+
+    @pyqtSlot(str)
+    def unsubscribe(self, name):
+        if name not in self.subscriptions:
+            return
+        subscriptions = dict(self.subscriptions)
+        del subscriptions[name]
+        self.subscriptions = subscriptions
+        self._update_demand()
+        if name in SPECTRAL_CONSUMERS:
+            self._update_fft_timer()
+
+    @pyqtSlot(str, list, float)
+    def open_tap(self, name, channels, rate):
+        """
+        打开一个命名的多速率输出，例如 open_tap('eog_250hz', ['H_EOG', 'V_EOG'], 250)。
+        channels 可以是通道索引或派生通道名，输出行按 channels 的顺序排列，
+        经过抗混叠 FIR 后降到 rate (整数倍抽取)。
+        """
+        rows = self._resolve_rows(channels)
+        if not rows:
+            print(f"Warning: Invalid channels for tap '{name}': {channels}")
+            return
+        decimator = PolyphaseDecimator(self.sampling_rate, rate, len(rows))
+        if decimator.out_rate != rate:
+            print(f"Warning: Tap '{name}' runs at {decimator.out_rate:g} Hz (requested {rate:g} Hz).")
+        taps = dict(self.taps)
+        taps[name] = MultirateTap(list(channels), rows, decimator)
+        self.taps = taps
+        self.subscribe(name, self._source_channels(rows), rate)
+
+    @pyqtSlot(str)
+    def close_tap(self, name):
+        if name not in self.taps:
+            return
+        taps = dict(self.taps)
+        del taps[name]
+        self.taps = taps
+        self.unsubscribe(name)
+
+    def _resolve_rows(self, channels):
+        """通道索引 / 派生通道名 -> 空间滤波输出中的行号；有无效项时返回 None"""
+        rows = []
+        for c in channels:
+            row = self.spatial_filter.derived_index(c) if isinstance(c, str) else int(c)
+            if row is None or not 0 <= row < self.num_channels + len(self.spatial_filter.derived):
+                return None
+            rows.append(row)
+        return rows
+
+    def _source_channels(self, rows):
+        return sorted(set(c for row in rows for c in self.spatial_filter.source_channels(row)))
+
+    def _rebuild_taps(self):
+        """采样率 / 通道数 / 派生通道变化后重新解析各 tap 的通道并设计抽取器"""
+        taps = {}
+        for name, tap in self.taps.items():
+            rows = self._resolve_rows(tap.channels)
+            if rows:
+                rate = self.subscriptions[name].rate
+                taps[name] = MultirateTap(tap.channels, rows, PolyphaseDecimator(self.sampling_rate, rate, len(rows)))
+                self.subscribe(name, self._source_channels(rows), rate)
+            else:
+                print(f"Warning: Closing tap '{name}', channels no longer available.")
+        for name in set(self.taps) - set(taps):
+            self.unsubscribe(name)
+        self.taps = taps
+
+    # --- 空间滤波 ---
+    @pyqtSlot(str)
+    def set_reference(self, mode):
+        """切换重参考方式；双侧乳突参考按通道名 (M1/M2, A1/A2, TP9/TP10) 查找参考电极"""
+        try:
+            if mode == REFERENCE_LINKED_MASTOIDS:
+                names = [n.upper().strip() for n in self.channel_names]
+                channels = [i for i, n in enumerate(names) if n in MASTOID_NAMES]
+                self.spatial_filter.set_reference(mode, channels=channels)
+            else:
+                self.spatial_filter.set_reference(mode)
+        except ValueError as e:
+            print(f"Warning: Cannot set reference '{mode}': {e}")
+            return
+        print(f"Info: Reference set to '{mode}'.")
+        self._update_demand()
+
+    @pyqtSlot(object)
+    def set_custom_montage(self, montage):
+        """自定义导联：(n_channels, n_channels) 矩阵，输出 = montage @ 输入"""
+        try:
+            self.spatial_filter.set_reference(REFERENCE_CUSTOM, montage=montage)
+        except ValueError as e:
+            print(f"Warning: Cannot set custom montage: {e}")
+            return
+        self._update_demand()
+
+    @pyqtSlot(str, int, int)
+    def set_derived_channel(self, name, plus, minus):
+        """添加双极派生通道 name = plus - minus，所有 tap 都可以按名字使用"""
+        try:
+            self.spatial_filter.set_derived(name, plus, minus)
+        except ValueError as e:
+            print(f"Warning: {e}")
+            return
+        self._rebuild_taps()
+
+    @pyqtSlot(str)
+    def remove_derived_channel(self, name):
+        self.spatial_filter.remove_derived(name)
+        self._rebuild_taps()
+
+    def _union_channels(self, names):
+        """给定消费者所需通道的并集；任一消费者要全部通道时返回 None"""
+        subs = [self.subscriptions[name] for name in names if name in self.subscriptions]
+        if any(sub.channels is None for sub in subs):
+            return None
+        union = sorted(set(c for sub in subs for c in sub.channels if c < self.num_channels))
+        if len(union) == self.num_channels:
+            return None
+        return np.asarray(union, dtype=np.int64)
+
+    def _update_demand(self):
+        """根据订阅重新计算需要滤波 / 做 FFT 的通道"""
+        # ICA / 重参考会混合所有通道，启用时必须全部滤波
+        if self.spatial_filter.mixes_channels:
+            active = None
+        else:
+            active = self._union_channels(self.subscriptions)
+        self.spectral_channels = self._union_channels(SPECTRAL_CONSUMERS)
+        self.active_channels = active
+
+    def _update_fft_timer(self):
+        """FFT 定时器速率 = min(订阅者要求的最高速率, LoadGovernor 上限)；无人订阅时停止"""
+        if self.fft_timer is None:
+            return
+        rates = [self.subscriptions[name].rate for name in SPECTRAL_CONSUMERS if name in self.subscriptions]
+        if not rates:
+            self.fft_timer.stop()
+            self.fft_cost_ms = 0.0
+            return
+        rate = max(0.1, min(max(rates), self.fft_rate))
+        self.fft_timer.setInterval(int(1000 / rate))
+        if self.is_running and not self.fft_timer.isActive():
+            self.fft_timer.start()
+
+    @pyqtSlot(float)
+    def set_fft_rate(self, rate):
+        """调整 FFT 刷新率上限 (Hz)，由 LoadGovernor 在过载时降低"""
+        self.fft_rate = rate
+        self._update_fft_timer()
+
+    @pyqtSlot(bool)
+    def set_band_power_enabled(self, enabled):
+        self.band_power_enabled = enabled
+
+    @pyqtSlot(int)
+    def set_vertical_scale(self, scale_uv):
+        """Vert Scale 为 Auto (0) 时开始跟踪各通道的鲁棒范围"""
+        enabled = (scale_uv == 0)
+        if enabled and not self.autoscale_enabled:
+            self.range_tracker.reset(self.num_channels)
+        self.autoscale_enabled = enabled
+
+    def get_plot_snapshot(self, level=0):
         """
-        非阻塞获取绘图数据。
-        如果处理线程正在写 Buffer，这里不会死等，而是直接返回 None。
-        这样 UI 线程永远不会被数据处理卡住。
+        无锁获取某一层的最新绘图快照 (PlotSnapshot)。
+        data 是只读的线性化数组 (零拷贝)，UI 应比较 version 跳过没有新数据的帧。
         """
-        if self.plot_buffer_lock.acquire(blocking=False):
-            try:
-                # 提取线性连续的数据
-                data_part1 = self.plot_buffer[:, self.plot_buffer_ptr:]
-                data_part2 = self.plot_buffer[:, :self.plot_buffer_ptr]
-                return np.concatenate((data_part1, data_part2), axis=1)
-            finally:
-                self.plot_buffer_lock.release()
-
-        # 如果锁被占用，返回 None，UI 这一帧跳过更新
-        return None
+        return self.plot_levels[level].ring.snapshot
+
+    def get_plot_data(self):
+        """兼容接口：返回第 0 层最新快照的数据数组 (只读，零拷贝)"""
+        return self.plot_levels[0].ring.snapshot.data
 
     @pyqtSlot()
     def start(self):
@@ -375,27 +654,39 @@ class DataProcessor(QObject):
 
         if self.fft_timer is None:
             self.fft_timer = QTimer(self)
-            self.fft_timer.setInterval(int(1000 / FFT_UPDATE_RATE))
             self.fft_timer.timeout.connect(self.calculate_fft)
 
+        if self.stats_timer is None:
+            self.stats_timer = QTimer(self)
+            self.stats_timer.setInterval(int(1000 / FFT_UPDATE_RATE))
+            self.stats_timer.timeout.connect(self._emit_stats)
+
         if self.calibration_timer is None:
             self.calibration_timer = QTimer(self)
             self.calibration_timer.setSingleShot(True)
-            self.calibration_timer.timeout.connect(self.finish_ica_calibration)
+            self.calibration_timer.timeout.connect(self.finish_calibration)
 
         self.raw_data_buffer.clear()
+        for tap in self.taps.values():
+            tap.decimator.reset(len(tap.rows))
+        if self.asr is not None:
+            self.asr.reset()
         with self.plot_buffer_lock:
             self.fft_buffer.fill(0)
             self.fft_ptr = 0
 
         self.packet_counter = 0
+        self.is_running = True
         self.processing_timer.start()
-        self.fft_timer.start()
+        self.stats_timer.start()
+        self._update_fft_timer()
 
     @pyqtSlot()
     def stop(self):
+        self.is_running = False
         if self.processing_timer: self.processing_timer.stop()
         if self.fft_timer: self.fft_timer.stop()
+        if self.stats_timer: self.stats_timer.stop()
         if self.calibration_timer: self.calibration_timer.stop()
         if self.is_recording: self.stop_recording()
 
@@ -414,12 +705,15 @@ class DataProcessor(QObject):
         self.recording_buffer.clear()
         self.markers = {'timestamps': [], 'labels': []}
         self.total_recorded_samples = 0
+        # 录制保存全部通道
+        self.subscribe(CONSUMER_RECORDING, None, self.sampling_rate)
         self.is_recording = True
 
     @pyqtSlot()
     def stop_recording(self):
         self.is_recording = False
         self._process_buffered_data()
+        self.unsubscribe(CONSUMER_RECORDING)
         if not self.recording_buffer:
             self.recording_finished.emit(None)
             return
@@ -442,86 +736,142 @@ class DataProcessor(QObject):
             self.ica_enabled = False
             return
         self.ica_enabled = enabled
+        if not self.online_ica_active:
+            self.spatial_filter.set_ica_enabled(enabled)
+            self._update_demand()
         print(f"ICA cleaning {'enabled' if enabled else 'disabled'}.")
 
     @pyqtSlot(int)
     def start_ica_calibration(self, duration_seconds):
-        if self.is_calibrating_ica: return
-        print(f"Starting ICA calibration ({duration_seconds}s)...")
-        self.ica_calibration_buffer = []
-        self.is_calibrating_ica = True
+        self._start_calibration(CALIBRATION_ICA, duration_seconds)
+
+    @pyqtSlot(int)
+    def start_asr_calibration(self, duration_seconds):
+        self._start_calibration(CALIBRATION_ASR, duration_seconds)
+
+    def _start_calibration(self, target, duration_seconds):
+        if self.calibration_target is not None:
+            self.calibration_failed.emit(
+                target, f"{self.calibration_target.upper()} calibration is already running, please wait.")
+            return
+        print(f"Starting {target.upper()} calibration ({duration_seconds}s)...")
+        self.calibration_buffer = []
+        # 校准需要全部通道
+        self.subscribe(CONSUMER_CALIBRATION, None, self.sampling_rate)
+        self.calibration_target = target
         self.calibration_timer.start(duration_seconds * 1000)
 
-    def finish_ica_calibration(self):
-        if not self.is_calibrating_ica: return
-        print("ICA calibration data collection finished.")
-        self.is_calibrating_ica = False
-        if not self.ica_calibration_buffer:
+    def finish_calibration(self):
+        target = self.calibration_target
+        if target is None: return
+        print(f"{target.upper()} calibration data collection finished.")
+        self.calibration_target = None
+        self.unsubscribe(CONSUMER_CALIBRATION)
+        if not self.calibration_buffer:
+            self.calibration_failed.emit(target, "No data was received during calibration.")
+            return
+        full_calib_data = np.concatenate(self.calibration_buffer, axis=1)
+        self.calibration_buffer = []
+        self.calibration_data_ready.emit(target, full_calib_data)
+
+    @pyqtSlot(bool)
+    def set_online_ica_active(self, active):
+        """在线 ICA 开关：打开时订阅全部通道；关闭时恢复离线训练的 ICA 模型 (如果有)"""
+        self.online_ica_active = active
+        if active:
+            self.subscribe(CONSUMER_ONLINE_ICA, None, self.sampling_rate)
+            return
+        self.unsubscribe(CONSUMER_ONLINE_ICA)
+        if self.ica_filter_matrix_ is not None:
+            self.spatial_filter.set_ica(self.ica_filter_matrix_, self.eeg_indices_)
+        else:
+            self.spatial_filter.set_ica(None, None)
+        self.spatial_filter.set_ica_enabled(self.ica_enabled)
+        self._update_demand()
+
+    @pyqtSlot(np.ndarray, np.ndarray)
+    def set_online_ica_matrix(self, matrix, indices):
+        """在线 ICA 发布的新清理矩阵，整体替换空间滤波矩阵"""
+        if not self.online_ica_active:
             return
-        full_calib_data = np.concatenate(self.ica_calibration_buffer, axis=1)
-        self.ica_calibration_buffer = []
-        self.calibration_data_ready.emit(full_calib_data)
+        try:
+            self.spatial_filter.set_ica(matrix, indices)
+        except ValueError as e:
+            print(f"Warning: Online ICA matrix rejected: {e}")
+            return
+        if not self.spatial_filter.ica_enabled:
+            self.spatial_filter.set_ica_enabled(True)
+            self._update_demand()
 
     @pyqtSlot(object, list)
     def set_ica_parameters(self, model, bad_indices):
-        """预计算 ICA 空间滤波矩阵"""
-        if not MNE_AVAILABLE: return
-
+        """
+        model: ICAProcessor 训练得到的 ICAProjector
+        清理矩阵直接由 ICA 各矩阵算出并按去除成分缓存，更改 bad_indices 时立即生效
+        """
         print(f"DataProcessor received ICA model. Bad components: {bad_indices}")
         self.ica_model = model
         self.ica_bad_indices = bad_indices
 
         if self.ica_model is None:
             self.ica_filter_matrix_ = None
+            self.spatial_filter.set_ica(None, None)
             return
 
         try:
-            self.eeg_indices_ = pick_types(self.ica_model.info, eeg=True, eog=False, exclude=[])
-
-            # 创建单位矩阵数据，模拟每个通道的脉冲
-            n_eeg = len(self.eeg_indices_)
-            identity_data = np.eye(n_eeg)
-
-            dummy_info = create_info(model.ch_names, self.sampling_rate, ch_types='eeg')
-            dummy_raw = RawArray(identity_data, dummy_info, verbose=False)
-
-            # MNE Apply (这一步计算了混合->去除->反混合的全过程)
-            model.apply(dummy_raw, exclude=bad_indices, verbose=False)
-
-            # 提取出的就是我们要的线性变换矩阵
-            # 【优化】转换为 float32
-            self.ica_filter_matrix_ = dummy_raw.get_data().astype(np.float32)
+            self.eeg_indices_ = model.channel_indices
+            if np.max(self.eeg_indices_) >= self.num_channels:
+                raise ValueError(f"ICA was trained on channels {list(self.eeg_indices_)}, "
+                                 f"only {self.num_channels} available.")
+            self.ica_filter_matrix_ = model.matrix(bad_indices)
 
             print(f"Info: ICA spatial filter matrix ready. Shape: {self.ica_filter_matrix_.shape}")
             self.ica_enabled = True
+            # 在线 ICA 运行时先保存，关闭在线模式后再生效
+            if self.online_ica_active:
+                return
+            self.spatial_filter.set_ica(self.ica_filter_matrix_, self.eeg_indices_)
+            self.spatial_filter.set_ica_enabled(True)
+            self._update_demand()
 
         except Exception as e:
             print(f"Error calculating ICA matrix: {e}")
             self.ica_enabled = False
             self.ica_filter_matrix_ = None
+            self.spatial_filter.set_ica(None, None)
+
+    # --- ASR 相关功能 ---
+    @pyqtSlot(object)
+    def set_asr_model(self, model):
+        """model: 已校准的 ArtifactSubspaceReconstruction，校准完成后立即启用"""
+        if model is None or np.max(model.channel_indices) >= self.num_channels \
+                or model.sampling_rate != self.sampling_rate:
+            print("Warning: ASR model does not match the current channel/sample rate setup.")
+            self._clear_asr()
+            return
+        if self.current_hp <= 0:
+            print("Warning: ASR expects high-passed data; enable a high-pass filter for reliable cleaning.")
+        model.reset()
+        self.asr = model
+        self.toggle_asr(True)
 
-    def apply_ica_cleaning(self, data_chunk):
-        """
-        实时应用 ICA 清理
-        data_chunk 和 matrix 都是 float32，运算极快
-        """
-        if self.ica_filter_matrix_ is None or self.eeg_indices_ is None:
-            return data_chunk
-
-        try:
-            # 1. 提取 EEG
-            eeg_data = data_chunk[self.eeg_indices_, :]
-
-            # 2. 矩阵乘法 (去伪迹)
-            cleaned_eeg_data = self.ica_filter_matrix_ @ eeg_data
-
-            # 3. 填回数据 (Copy)
-            reconstructed_chunk = data_chunk.copy()
-            reconstructed_chunk[self.eeg_indices_, :] = cleaned_eeg_data
-
-            return reconstructed_chunk
-
-        except Exception as e:
-            print(f"Error during real-time ICA cleaning: {e}. Disabling ICA.")
-            self.ica_enabled = False
-            return data_chunk
\ No newline at end of file
+    @pyqtSlot(bool)
+    def toggle_asr(self, enabled):
+        if self.asr is None:
+            print("Cannot enable ASR: not calibrated.")
+            self.asr_enabled = False
+            return
+        self.asr_enabled = enabled
+        # ASR 需要全部通道都经过时域滤波
+        if enabled:
+            self.subscribe(CONSUMER_ASR, None, self.sampling_rate)
+        else:
+            self.unsubscribe(CONSUMER_ASR)
+        print(f"ASR cleaning {'enabled' if enabled else 'disabled'}.")
+
+    def _clear_asr(self):
+        """ASR 校准与通道数 / 采样率相关，配置变化后需要重新校准"""
+        self.asr = None
+        self.asr_enabled = False
+        if CONSUMER_ASR in self.subscriptions:
+            self.unsubscribe(CONSUMER_ASR)
@@ -0,0 +1,101 @@
+# File: processing/eog_cascade.py
+
+import numpy as np
+
+from .inference_backend import _file_sha1
+
+# --- 配置参数 ---
+CASCADE_MODEL_PATH = "./models/eog_cascade_stage1.npz"
+# 第一级 (特征 + 多分类逻辑回归) 的决策阈值，由 benchmarks/train_cascade.py 在录制数据上选定
+CASCADE_REJECT_THRESHOLD = 0.9  # P(fixation) 超过该值直接判为非事件，不运行网络
+CASCADE_ACCEPT_THRESHOLD = 0.97  # 容易的类别概率超过该值直接采用第一级的结果
+CASCADE_EASY_CLASSES = ('blink_once',)  # 允许第一级直接给出结果的类别 (形态特征足够区分)
+FEATURE_RATE = 250  # 特征计算假定的采样率 (与模型输入一致)
+
+
+def eog_features(windows):
+    """
+    手工 EOG 特征。windows: (n, 2, L) 已滤波、未归一化的 [H_EOG, V_EOG] 窗口 (uV)。
+    每个通道：峰峰值、标准差、相对中位数的最大正/负偏移、最大上升/下降斜率、
+    首尾平台差 (扫视的阶跃)、去均值后的过零次数、超过半幅的正峰个数 (眨眼次数)；
+    另加 H/V 幅度比。幅度类特征取对数 (有符号)，降低个体间幅度差异的影响。
+    -> (n, n_features) float64
+    """
+    x = np.asarray(windows, dtype=np.float64)
+    n, channels, length = x.shape
+    centered = x - np.median(x, axis=2, keepdims=True)
+    slope = np.diff(x, axis=2) * FEATURE_RATE
+    edge = max(1, length // 5)
+
+    ptp = np.ptp(x, axis=2)
+    std = x.std(axis=2)
+    pos, neg = centered.max(axis=2), -centered.min(axis=2)
+    rise, fall = slope.max(axis=2), -slope.min(axis=2)
+    step = x[:, :, -edge:].mean(axis=2) - x[:, :, :edge].mean(axis=2)
+
+    demeaned = x - x.mean(axis=2, keepdims=True)
+    crossings = np.count_nonzero(np.diff(np.signbit(demeaned), axis=2), axis=2) / length * FEATURE_RATE
+
+    # 正峰：局部极大值且超过最大正偏移的一半
+    half = 0.5 * pos[:, :, None]
+    peaks = (centered[:, :, 1:-1] > centered[:, :, :-2]) & (centered[:, :, 1:-1] >= centered[:, :, 2:]) \
+        & (centered[:, :, 1:-1] > half)
+    peak_count = np.count_nonzero(peaks, axis=2)
+
+    def log(v):
+        return np.sign(v) * np.log1p(np.abs(v))
+
+    ratio = np.log((ptp[:, 0] + 1.0) / (ptp[:, 1] + 1.0))[:, None]
+    return np.concatenate((log(ptp), log(std), log(pos), log(neg), log(rise), log(fall), log(step),
+                           crossings, peak_count, ratio), axis=1)
+
+
+class CascadeStageOne:
+    """
+    级联分类的第一级：标准化特征上的多分类逻辑回归 (纯 numpy，参数由离线脚本训练后存为 npz)。
+    明显的非事件直接拒绝、容易的类别直接给出结果，其余 (不确定的) 窗口才交给 RSCA_Net。
+    第一级学的是某个检查点的决策，npz 中保存该检查点的 sha1，换了模型权重后不再使用。
+    """
+
+    def __init__(self, mean, scale, coef, intercept, reject_threshold=CASCADE_REJECT_THRESHOLD,
+                 accept_threshold=CASCADE_ACCEPT_THRESHOLD, easy_classes=(), fixation_index=-1):
+        self.mean, self.scale = np.asarray(mean), np.asarray(scale)
+        self.coef, self.intercept = np.asarray(coef), np.asarray(intercept)
+        self.reject_threshold = reject_threshold
+        self.accept_threshold = accept_threshold
+        self.easy = np.zeros(len(self.intercept), dtype=bool)
+        self.easy[list(easy_classes)] = True
+        self.fixation_index = fixation_index
+        # 统计: 经过第一级的窗口数 / 被拒绝的 / 直接给出结果的
+        self.n_windows = self.n_rejected = self.n_resolved = 0
+
+    @classmethod
+    def load(cls, path, class_labels, checkpoint_path=None):
+        params = np.load(path)
+        source = str(params['checkpoint_sha1']) if 'checkpoint_sha1' in params else None
+        if checkpoint_path is not None and source != _file_sha1(checkpoint_path):
+            raise RuntimeError("cascade stage one was trained for a different checkpoint")
+        easy = [class_labels.index(c) for c in CASCADE_EASY_CLASSES]
+        return cls(params['mean'], params['scale'], params['coef'], params['intercept'],
+                   easy_classes=easy, fixation_index=class_labels.index('fixation'))
+
+    def save(self, path, checkpoint_path):
+        """checkpoint_path: 训练目标 (网络决策) 所用的模型权重"""
+        np.savez(path, mean=self.mean, scale=self.scale, coef=self.coef, intercept=self.intercept,
+                 checkpoint_sha1=_file_sha1(checkpoint_path))
+
+    def predict_proba(self, windows):
+        z = (eog_features(windows) - self.mean) / self.scale
+        logits = z @ self.coef.T + self.intercept
+        probabilities = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return probabilities / probabilities.sum(axis=1, keepdims=True)
+
+    def route(self, probabilities):
+        """-> (rejected, resolved)：两个布尔掩码，其余窗口需要运行网络"""
+        rejected = probabilities[:, self.fixation_index] >= self.reject_threshold
+        best = np.argmax(probabilities, axis=1)
+        resolved = ~rejected & self.easy[best] & (probabilities.max(axis=1) >= self.accept_threshold)
+        self.n_windows += len(probabilities)
+        self.n_rejected += int(rejected.sum())
+        self.n_resolved += int(resolved.sum())
+        return rejected, resolved
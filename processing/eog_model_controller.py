@@ -1,13 +1,17 @@
 # File: processing/model_controller.py
 
-import numpy as np
 import collections
+import numpy as np
 from PyQt6.QtCore import QObject, pyqtSignal, pyqtSlot
 import torch
-import torch.nn.functional as F
 import os
 import time
-from scipy.signal import butter, filtfilt, iirnotch
+from scipy.signal import butter, iirnotch, tf2sos, sosfilt, sosfilt_zi
+
+from .ring_buffer import SampleRing
+from .event_detector import RunningVarianceDetector, EVENT_ONSET
+from .inference_backend import load_backend, DEFAULT_BACKEND_ORDER
+from .eog_cascade import CascadeStageOne, CASCADE_MODEL_PATH
 
 # --- 尝试导入模型类 ---
 try:
@@ -26,6 +30,8 @@ except ImportError:
 # --- 常量配置 ---
 MODEL_PATH = "./models/rsca_net_8class_5_robust.pth"
 CLASS_LABELS = ['up', 'down', 'left', 'right', 'blink_once', 'blink_twice', 'blink_three', 'fixation']
+# 推理后端的尝试顺序 (见 inference_backend.py)，导出的模型缓存在 ~/.exgmp/model_cache
+INFERENCE_BACKEND_ORDER = DEFAULT_BACKEND_ORDER
 
 # 反向动作映射（用于防误触抑制）
 OPPOSITE_ACTIONS = {
@@ -37,60 +43,139 @@ OPPOSITE_ACTIONS = {
 
 # --- 核心参数设置 ---
 TARGET_SAMPLE_RATE = 250  # 模型训练时的采样率 (Hz)
+EOG_TAP_NAME = 'eog_250hz'  # DataProcessor 中抗混叠降采样到 250Hz 的 EOG 输出
+# 双极派生通道 (由 DataProcessor 的空间滤波级计算)，同时也是 tap 输出的行顺序
+# H_EOG = RIGHT - LEFT, V_EOG = UP - DOWN
+EOG_DERIVED_CHANNELS = (('H_EOG', 'right', 'left'), ('V_EOG', 'up', 'down'))
 CONFIDENCE_THRESHOLD = 0.85  # 置信度阈值
 COOLDOWN_PERIOD = 0.4  # 两次预测之间的最小间隔 (秒)
 REBOUND_SUPPRESSION_TIME = 0.6  # 反向动作抑制时间 (秒)
 
 # 窗口参数
 PREDICTION_WINDOW_SAMPLES = 250  # 模型需要的输入长度 (1秒 @ 250Hz)
-FILTER_PADDING = 16  # 滤波边缘填充长度 (用于消除 filtfilt 边缘效应)
-ENERGY_WINDOW_SAMPLES = 50  # 能量检测窗口
-EVENT_TRIGGER_THRESHOLD = 20.0  # 触发预测的能量阈值
+# 零相位: 模型训练数据经过 filtfilt，默认用固定延迟平滑器得到等价的零相位输出
+# False 时只用因果滤波 (无额外延迟，但相位与训练数据不一致)
+ZERO_PHASE_SMOOTHING = True
+# 固定延迟平滑器的延迟 (32 = 128 ms)：逐块回放与整段 filtfilt 相比，1 秒窗口的相对误差平均约 0.3%、最大约 0.5-0.6%
+# (95% 分位)；48 时 < 0.1%，但每次决策多 64 ms 延迟
+SMOOTHER_LAG_SAMPLES = 32
+EVENT_RETRY_SAMPLES = 25  # 事件期间被拒绝 (低置信度 / fixation) 后，再次尝试的间隔 (100 ms)
+# 提前决策：上一次决策后不必等满一个完整的新窗口，新数据达到该长度即可对部分窗口分类
+# (左侧用第一个新样本的值补齐到 PREDICTION_WINDOW_SAMPLES，即假定之前是静息)，之后每次重试窗口随新数据增长。
+# 命令间隔短时能多识别命令，但错误命令也更多，默认关闭 (可用 set_early_decision 打开)
+EARLY_DECISION = False
+EARLY_DECISION_MIN_SAMPLES = 125  # 部分窗口的最短长度 (500 ms)
+EARLY_DECISION_CONFIRM_WINDOWS = 2  # 同一类别需在连续这么多个增长的部分窗口上都超过置信度阈值
+
+# 连续模式：不等事件检测，每隔 hop 个样本对重叠窗口打分，积压的窗口合并为一次批量推理，结果按时间投票
+CONTINUOUS_HOP_SAMPLES = 0  # 0 = 事件触发模式；例如 10 = 每 40 ms 一个窗口 (可用 set_continuous_hop 修改)
+CONTINUOUS_MAX_BATCH = 32  # 单次批量推理最多的窗口数 (积压更多时丢弃较早的窗口)
+VOTE_WINDOWS = 8  # 参与投票的最近窗口数 (hop 10 时覆盖 320 ms)
+VOTE_MIN_WINDOWS = 6  # 同一类别至少在这么多个窗口中胜出才做决策
 MAX_BUFFER_SIZE = 1000  # 缓冲区最大长度
 
 
 class SignalProcessor:
-    def __init__(self, fs=250):
+    """
+    流式 EOG 前端：50Hz 陷波 + 12Hz 4 阶低通，合并为一组 SOS，跨数据块保存滤波器状态。
+    数据到达时滤波一次，滤好的窗口随时可以从环形缓冲区以 O(1) 取出，触发时无需重新滤波。
+    zero_phase=True 时再接一个固定延迟的反向平滑器：每个新数据块对最近 (n + lag) 个前向输出做一次反向滤波，
+    只保留离末端至少 lag 个样本的结果 (反向滤波的起始瞬态已衰减)，效果与 filtfilt 一致，输出延迟 lag 个样本。
+    """
+
+    def __init__(self, fs=250, num_channels=2, capacity=1000, zero_phase=ZERO_PHASE_SMOOTHING,
+                 lag=SMOOTHER_LAG_SAMPLES):
         self.fs = fs
-        # 1. 设计低通滤波器 (12Hz, 4阶)
-        # 用于提取眼动信号包络，压制高频肌电
-        self.b, self.a = butter(4, 12 / (0.5 * fs), btype='low')
+        # 1. 工频陷波器 (50Hz) + 2. 低通滤波器 (12Hz, 4阶，提取眼动信号包络，压制高频肌电)
+        b_notch, a_notch = iirnotch(50, 30, fs)
+        self.sos = np.vstack((tf2sos(b_notch, a_notch), butter(4, 12 / (0.5 * fs), btype='low', output='sos')))
+        self._zi_unit = sosfilt_zi(self.sos)  # 单位阶跃的稳态状态，按首个样本缩放
+        # 反向滤波前在末端做奇对称延拓 (与 sosfiltfilt 的默认填充长度相同)，减小起始瞬态
+        self._padlen = 3 * (2 * len(self.sos) + 1)
+
+        self.zero_phase = zero_phase
+        self.lag = int(lag) if zero_phase else 0
+        self.forward = SampleRing(num_channels, capacity + self.lag)  # 前向 (因果) 滤波输出
+        self.output = SampleRing(num_channels, capacity)  # 最终输出 (平滑器关闭时即前向输出)
+        self.reset()
+
+    def reset(self):
+        self._zi = None
+        self._pending = 0  # 已前向滤波、尚未输出平滑结果的样本数
+        self.forward.clear()
+        self.output.clear()
+        self.n_samples = 0  # 已输出的样本总数 (零相位模式下比输入少 lag 个)
+
+    def _steady_state(self, x0):
+        """以 x0 (每通道一个值) 为稳态的滤波器状态: (sections, channels, 2)"""
+        return self._zi_unit[:, None, :] * x0[None, :, None]
+
+    def process(self, chunk):
+        """chunk: (channels, n) 新数据 -> 追加到 output，可用 latest(k) 取出"""
+        n = chunk.shape[1]
+        if n == 0:
+            return
+        if self._zi is None:
+            # 用首个样本初始化稳态，避免直流偏置引起的启动瞬态
+            self._zi = self._steady_state(chunk[:, 0].astype(np.float64))
+        forward, self._zi = sosfilt(self.sos, chunk, axis=1, zi=self._zi)
+        forward = forward.astype(np.float32)
+
+        if not self.zero_phase:
+            self.output.append(forward)
+            self.n_samples += n
+            return
 
-        # 2. 工频陷波器 (50Hz)
-        self.b_notch, self.a_notch = iirnotch(50, 30, fs)
+        self.forward.append(forward)
+        # 反向平滑：对所有未输出的前向结果反向滤波，末尾 lag 个只用来让瞬态衰减，其余输出
+        self._pending = min(self._pending + n, self.forward.capacity)
+        n_ready = self._pending - self.lag
+        if n_ready <= 0:
+            return
+        span = self.forward.latest(self._pending)
+        self._pending = self.lag
+        pad = min(self._padlen, span.shape[1] - 1)
+        tail = 2.0 * span[:, -1:] - span[:, -2:-pad - 2:-1]
+        reversed_span = np.concatenate((tail[:, ::-1], span[:, ::-1]), axis=1)
+        backward, _ = sosfilt(self.sos, reversed_span, axis=1, zi=self._steady_state(reversed_span[:, 0]))
+        self.output.append(backward[:, :pad - 1:-1][:, :n_ready].astype(np.float32))
+        self.n_samples += n_ready
 
-    def apply_filter(self, data):
-        """
-        对数据窗口进行零相位滤波。
-        data shape: (Channels, Length)
-        """
-        # 1. 去除工频
-        data = filtfilt(self.b_notch, self.a_notch, data, axis=1)
-        # 2. 低通提取 EOG
-        filtered_data = filtfilt(self.b, self.a, data, axis=1)
-        return filtered_data
+    def latest(self, k):
+        """最近 k 个已滤波样本的视图 (零相位模式下整体延迟 lag 个样本)"""
+        return self.output.latest(k)
 
 
 class ModelController(QObject):
     prediction_ready = pyqtSignal(str)
+    # (EVENT_ONSET / EVENT_OFFSET, 250Hz 输入流中的样本序号)
+    event_detected = pyqtSignal(str, int)
 
     def __init__(self):
         super().__init__()
 
-        # 缓冲区存储的是已经降采样到 250Hz 的数据
-        self.data_buffer = collections.deque(maxlen=MAX_BUFFER_SIZE)
-
-        # 信号处理器 (固定为模型采样率 250Hz)
-        self.dsp = SignalProcessor(fs=TARGET_SAMPLE_RATE)
-
-        self.model = None
+        # 滑动方差事件检测 (在未滤波的 250Hz 双极数据 [H_EOG, V_EOG] 上)
+        self.detector = RunningVarianceDetector(len(EOG_DERIVED_CHANNELS), TARGET_SAMPLE_RATE)
+        self._next_attempt = None  # 当前事件下一次尝试分类的样本序号，None 表示不需要分类
+        self._fresh_from = 0  # 窗口只使用从该样本序号开始的数据 (上次决策的事件之后)
+        self._await_offset = False  # 上次决策的事件尚未结束，结束时把 _fresh_from 推到事件结束处
+        self.early_decision = EARLY_DECISION
+        self._early_streak = (None, 0)  # (部分窗口上连续超过阈值的类别, 连续次数)
+
+        # 连续模式状态 (窗口位置以 dsp 的输出样本计)
+        self.continuous_hop = CONTINUOUS_HOP_SAMPLES
+        self._next_window_end = PREDICTION_WINDOW_SAMPLES
+        self._votes = collections.deque(maxlen=VOTE_WINDOWS)
+
+        # 流式信号处理器 (固定为模型采样率 250Hz)，数据到达时即完成滤波
+        self.dsp = SignalProcessor(fs=TARGET_SAMPLE_RATE, num_channels=len(EOG_DERIVED_CHANNELS),
+                                   capacity=MAX_BUFFER_SIZE)
+
+        self.model = None  # 推理后端: (n, 2, 250) float32 -> (n, num_classes) logits
+        self.cascade = None  # 级联第一级 (CASCADE_MODEL_PATH 不存在时每个窗口都运行网络)
         self.device = None
         self.is_active = False
 
-        # 采样率适配
-        self.input_sample_rate = 1000  # 默认硬件采样率，会被 set_input_sample_rate 更新
-        self.downsample_step = 4  # 1000 / 250 = 4
-
         # 状态控制
         self.threshold = CONFIDENCE_THRESHOLD
         self.last_prediction_time = 0
@@ -125,16 +210,12 @@ class ModelController(QObject):
         except Exception as e:
             print(f"Warning setting channel names: {e}")
 
-    @pyqtSlot(int)
-    def set_input_sample_rate(self, rate):
-        """核心适配：当硬件采样率改变时，计算新的降采样步长"""
-        if rate <= 0: return
-        self.input_sample_rate = rate
-        # 计算步长，例如 1000 / 250 = 4.0 -> 4
-        # 如果硬件是 250Hz，步长为 1
-        self.downsample_step = int(max(1, round(rate / TARGET_SAMPLE_RATE)))
-        print(
-            f"ModelController: Input fs={rate}Hz. Downsample step set to {self.downsample_step} (Target {TARGET_SAMPLE_RATE}Hz)")
+    def derived_channels(self):
+        """[(名称, plus 通道索引, minus 通道索引)]，有通道未找到时返回 None"""
+        if any(v == -1 for v in self.channel_indices.values()):
+            return None
+        return [(name, self.channel_indices[plus], self.channel_indices[minus])
+                for name, plus, minus in EOG_DERIVED_CHANNELS]
 
     @pyqtSlot(bool)
     def set_active(self, is_active):
@@ -142,101 +223,154 @@ class ModelController(QObject):
             self._load_model()
 
         if is_active:
-            self.data_buffer.clear()
+            self.detector.reset()
+            self.dsp.reset()
+            self._next_attempt = None
+            self._fresh_from = 0
+            self._await_offset = False
+            self._early_streak = (None, 0)
+            self._next_window_end = PREDICTION_WINDOW_SAMPLES
+            self._votes.clear()
             self.last_prediction_time = 0
             self.last_valid_action = None
             self.last_valid_time = 0
 
+        elif self.is_active and self.cascade is not None and self.cascade.n_windows:
+            c = self.cascade
+            print(f"Cascade: {c.n_windows} windows, {c.n_rejected / c.n_windows:.0%} rejected, "
+                  f"{c.n_resolved / c.n_windows:.0%} resolved by stage one")
+
         self.is_active = is_active
         print(f"Model Controller active: {self.is_active}")
 
-    @pyqtSlot(np.ndarray)
-    def process_data_chunk(self, filtered_chunk):
+    @pyqtSlot(int)
+    def set_continuous_hop(self, hop_samples):
+        """0: 事件触发模式；> 0: 连续模式，每 hop_samples 个样本 (250Hz) 对一个窗口打分"""
+        self.continuous_hop = min(max(0, int(hop_samples)), self.dsp.output.capacity - PREDICTION_WINDOW_SAMPLES)
+        self._next_window_end = max(self.dsp.n_samples + self.continuous_hop, PREDICTION_WINDOW_SAMPLES)
+        self._votes.clear()
+        print(f"Model Controller hop: {self.continuous_hop} samples" if self.continuous_hop
+              else "Model Controller: event-triggered mode")
+
+    @pyqtSlot(bool)
+    def set_early_decision(self, enabled):
+        """True: 上一次决策后对不完整的新窗口提前分类；False: 等满一个完整的新窗口"""
+        self.early_decision = bool(enabled)
+        print(f"Model Controller early decision: {self.early_decision}")
+
+    @pyqtSlot(str, np.ndarray)
+    def process_tap_data(self, tap_name, eog_chunk):
         """
         处理输入数据块。
         Args:
-            filtered_chunk: 来自 DataProcessor 的数据，已经过初步滤波，采样率为 input_sample_rate
+            tap_name: DataProcessor 的多速率输出名称，只处理 EOG_TAP_NAME
+            eog_chunk: (2, n) 已经抗混叠降采样到 250Hz 的双极数据 [H_EOG, V_EOG]
         """
+        if tap_name != EOG_TAP_NAME: return
         if not self.is_active or self.model is None: return
-        # 检查通道索引是否有效
-        if any(v == -1 for v in self.channel_indices.values()): return
-
-        # --- 1. 降采样适配 (Hardware Fs -> 250Hz) ---
-        # 使用切片进行高效降采样
-        downsampled_chunk = filtered_chunk[:, ::self.downsample_step]
-
-        if downsampled_chunk.shape[1] == 0: return
-
-        # --- 2. 提取 EOG 4通道 ---
-        eog_chunk = downsampled_chunk[[
-                                          self.channel_indices['up'],
-                                          self.channel_indices['down'],
-                                          self.channel_indices['left'],
-                                          self.channel_indices['right']
-                                      ], :]
+        if eog_chunk.shape[1] == 0: return
+
+        # --- 3. 流式滤波 + 事件检测 ---
+        self.dsp.process(eog_chunk)
+        for event in self.detector.update(eog_chunk):
+            self.event_detected.emit(event.kind, event.sample_index)
+            if event.kind == EVENT_ONSET:
+                self._next_attempt = event.sample_index
+                self._early_streak = (None, 0)
+            elif self._await_offset:
+                # 已决策的事件结束：它的余下部分不再进入之后的窗口
+                self._fresh_from = max(self._fresh_from, event.sample_index)
+                self._await_offset = False
+            elif self._next_attempt is not None:
+                # 事件结束时还没有结果：最后再试一次
+                self._next_attempt = min(self._next_attempt, self.detector.n_samples)
+
+        if self.continuous_hop:
+            self._score_continuous()
+            return
 
-        # --- 3. 存入缓冲区 ---
-        # deque 存储转置后的数据 (N, 4) 方便 extend
-        self.data_buffer.extend(eog_chunk.T)
+        # --- 4. 只在事件期间按间隔尝试分类，静息期不做推理 ---
+        n = self.detector.n_samples
+        # 可用的新数据长度 (滤波输出比输入晚 dsp.lag 个样本)
+        fresh = n - self.dsp.lag - self._fresh_from
+        min_fresh = EARLY_DECISION_MIN_SAMPLES if self.early_decision else PREDICTION_WINDOW_SAMPLES
+        if self._next_attempt is None or n < self._next_attempt or fresh < min_fresh:
+            return
+        if (time.time() - self.last_prediction_time) <= COOLDOWN_PERIOD:
+            return
+        if self._classify_window(min(fresh, PREDICTION_WINDOW_SAMPLES)):
+            self._next_attempt = None
+            self._fresh_from = n
+            self._await_offset = self.detector.active
+            self._early_streak = (None, 0)
+        elif self.detector.active:
+            self._next_attempt = n + EVENT_RETRY_SAMPLES
+        else:
+            self._next_attempt = None
+
+    def _classify_window(self, length=PREDICTION_WINDOW_SAMPLES):
+        """对最新 length 个样本的滤波窗口分类；做出决策 (发出或抑制了动作) 时返回 True"""
+        # 1-3. 已滤好的窗口直接取视图 (零相位模式下窗口末端比最新样本晚 SMOOTHER_LAG_SAMPLES)
+        # 4. H-EOG / V-EOG 已由空间滤波级派生 (滤波是线性的，先差分后滤波结果相同)
+        clean_window = self.dsp.latest(length)
+        if clean_window.shape[1] < PREDICTION_WINDOW_SAMPLES:
+            # 提前决策的部分窗口：左侧补齐为静息 (第一个样本的值)，再整体做 Z-Score
+            clean_window = np.pad(clean_window, ((0, 0), (PREDICTION_WINDOW_SAMPLES - clean_window.shape[1], 0)),
+                                  mode='edge')
+
+        # 5-6. Z-Score 归一化后执行预测
+        probabilities = self._infer(clean_window[None])[0]
+        prediction_index = int(np.argmax(probabilities))
+        label, confidence = CLASS_LABELS[prediction_index], float(probabilities[prediction_index])
+        if length < PREDICTION_WINDOW_SAMPLES:
+            # 部分窗口只有在连续几个增长的窗口给出同一个 (超过阈值的) 类别时才决策
+            if confidence < self.threshold or label == 'fixation':
+                self._early_streak = (None, 0)
+                return False
+            streak = self._early_streak[1] + 1 if self._early_streak[0] == label else 1
+            self._early_streak = (label, streak)
+            if streak < EARLY_DECISION_CONFIRM_WINDOWS:
+                return False
+        return self._decide(label, confidence)
+
+    def _score_continuous(self):
+        """连续模式：对所有到期的重叠窗口一次批量推理，逐个窗口按时间顺序投票"""
+        n_out = self.dsp.n_samples
+        if n_out < self._next_window_end:
+            return
+        hop = self.continuous_hop
+        if (time.time() - self.last_prediction_time) <= COOLDOWN_PERIOD:
+            # 冷却期内不推理，到期的窗口直接跳过
+            self._next_window_end += ((n_out - self._next_window_end) // hop + 1) * hop
+            return
 
-        # --- 4. 检查冷却时间 ---
-        current_time = time.time()
-        if (current_time - self.last_prediction_time) > COOLDOWN_PERIOD:
-            self._detect_and_classify_event()
-
-    def _detect_and_classify_event(self):
-        # 我们需要的总长度 = 模型输入长度 + 2 * 边缘填充长度
-        required_samples = PREDICTION_WINDOW_SAMPLES + (2 * FILTER_PADDING)
-
-        if len(self.data_buffer) < required_samples: return
-
-        # 1. 能量粗筛 (只检查最近的 ENERGY_WINDOW_SAMPLES 个点)
-        # 注意：这里是在降采样后的 250Hz 数据上检查
-        recent_data = np.array(list(self.data_buffer)[-ENERGY_WINDOW_SAMPLES:])
-        # 计算4个通道的标准差最大值
-        energy = np.max(np.std(recent_data, axis=0))
-
-        if energy > EVENT_TRIGGER_THRESHOLD:
-            # 取出足够长的数据用于滤波
-            # 转置为 (Channels, Length) -> (4, N)
-            full_buffer_array = np.array(self.data_buffer).T
-
-            # 截取最后 required_samples 个点
-            raw_window_padded = full_buffer_array[:, -required_samples:]
-
-            # 2. 信号滤波 (零相位低通)
-            # 在较长的数据上滤波，以消除 filtfilt 的边缘效应
-            clean_window_padded = self.dsp.apply_filter(raw_window_padded)
-
-            # 3. 切除边缘，提取纯净的中间段
-            # 取 [padding : -padding]，长度正好是 PREDICTION_WINDOW_SAMPLES (250)
-            clean_window = clean_window_padded[:, FILTER_PADDING:-FILTER_PADDING]
-
-            # 双重检查形状
-            if clean_window.shape[1] != PREDICTION_WINDOW_SAMPLES:
-                return
-
-            # 4. 差分计算 (构建 H-EOG 和 V-EOG)
-            # 索引对应: 0:up, 1:down, 2:left, 3:right
-            # V_EOG = UP - DOWN
-            v_eog = clean_window[0, :] - clean_window[1, :]
-            # H_EOG = RIGHT - LEFT (通常定义为 Right-Left，也可能是 Left-Right，视模型训练而定)
-            # 根据你的原代码: h_eog = right - left (原代码索引 3 - 2, 对应 right - left)
-            h_eog = clean_window[3, :] - clean_window[2, :]
-
-            input_signal = np.vstack([h_eog, v_eog])
-
-            # 5. Z-Score 归一化 (逐通道)
-            for ch in range(2):
-                std_val = np.std(input_signal[ch, :])
-                mean_val = np.mean(input_signal[ch, :])
-                if std_val > 1e-6:
-                    input_signal[ch, :] = (input_signal[ch, :] - mean_val) / std_val
-                else:
-                    input_signal[ch, :] = input_signal[ch, :] - mean_val
-
-            # 6. 执行预测
-            self._predict(input_signal)
+        ends = np.arange(self._next_window_end, n_out + 1, hop)
+        # 积压过多 (或超出缓冲区) 时只保留最近的窗口
+        oldest = n_out - self.dsp.output.capacity + PREDICTION_WINDOW_SAMPLES
+        ends = ends[ends >= oldest][-CONTINUOUS_MAX_BATCH:]
+        self._next_window_end = int(ends[-1]) + hop
+        span = self.dsp.latest(n_out - int(ends[0]) + PREDICTION_WINDOW_SAMPLES)
+        # (2, n_windows, 250) 的滑动窗口视图 -> (n_windows, 2, 250)
+        windows = np.lib.stride_tricks.sliding_window_view(span, PREDICTION_WINDOW_SAMPLES, axis=1)
+        windows = windows[:, ends - ends[0]].transpose(1, 0, 2)
+
+        for probabilities in self._infer(windows):
+            self._votes.append(probabilities)
+            if self._vote():
+                # 决策后的窗口需完全由新数据构成，防止同一个动作重复触发
+                self._votes.clear()
+                self._next_window_end = max(self._next_window_end, n_out + PREDICTION_WINDOW_SAMPLES)
+                break
+
+    def _vote(self):
+        """最近 VOTE_WINDOWS 个窗口中多数胜出的类别，用其平均置信度决策"""
+        votes = np.array(self._votes)
+        labels = np.argmax(votes, axis=1)
+        counts = np.bincount(labels, minlength=len(CLASS_LABELS))
+        winner = int(np.argmax(counts))
+        if counts[winner] < VOTE_MIN_WINDOWS:
+            return False
+        return self._decide(CLASS_LABELS[winner], float(votes[labels == winner, winner].mean()))
 
     def _load_model(self):
         if not os.path.exists(MODEL_PATH):
@@ -246,32 +380,55 @@ class ModelController(QObject):
             self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
             if RSCA_Net is None: return
 
-            self.model = RSCA_Net(in_channels=2, num_classes=len(CLASS_LABELS))
-            checkpoint = torch.load(MODEL_PATH, map_location=self.device)
-            self.model.load_state_dict(checkpoint)
-            self.model.to(self.device)
-            self.model.eval()
-            print(f"Info: Loaded model successfully on {self.device}.")
+            self.model = load_backend(lambda: RSCA_Net(in_channels=2, num_classes=len(CLASS_LABELS)),
+                                      MODEL_PATH, (1, len(EOG_DERIVED_CHANNELS), PREDICTION_WINDOW_SAMPLES),
+                                      self.device, INFERENCE_BACKEND_ORDER)
+            print(f"Info: Loaded model successfully on {self.device} ({self.model.name}).")
         except Exception as e:
             print(f"Error loading model: {e}")
             self.model = None
+            return
 
-    def _predict(self, input_signal):
-        # 转为 Tensor: (1, 2, 250)
-        data_tensor = torch.from_numpy(input_signal).unsqueeze(0).float().to(self.device)
-
-        with torch.no_grad():
-            outputs = self.model(data_tensor)
-            probabilities = F.softmax(outputs, dim=1)
-            max_prob, predicted_idx = torch.max(probabilities, 1)
-
-            confidence = max_prob.item()
-            prediction_index = predicted_idx.item()
-            predicted_label = CLASS_LABELS[prediction_index]
+        if os.path.exists(CASCADE_MODEL_PATH):
+            try:
+                self.cascade = CascadeStageOne.load(CASCADE_MODEL_PATH, CLASS_LABELS, MODEL_PATH)
+                print(f"Info: Cascade stage one loaded (reject P(fixation) >= {self.cascade.reject_threshold}).")
+            except Exception as e:
+                print(f"Warning: cascade stage one not loaded, running the network on every window: {e}")
+                self.cascade = None
 
+    def _infer(self, windows):
+        """
+        (n, 2, 250) 已滤波的窗口 -> (n, num_classes) 概率。
+        有级联第一级时先用手工特征分流：被拒绝 / 直接给出结果的窗口采用第一级的概率，只有其余窗口运行网络。
+        """
+        windows = np.asarray(windows, dtype=np.float64)
+        if self.cascade is None:
+            return self._infer_network(windows)
+
+        probabilities = self.cascade.predict_proba(windows)
+        rejected, resolved = self.cascade.route(probabilities)
+        ambiguous = ~(rejected | resolved)
+        if ambiguous.any():
+            probabilities[ambiguous] = self._infer_network(windows[ambiguous])
+        return probabilities
+
+    def _infer_network(self, windows):
+        """RSCA_Net 推理，整批一次前向"""
+        # Z-Score 归一化 (逐窗口、逐通道)
+        mean = windows.mean(axis=2, keepdims=True)
+        std = windows.std(axis=2, keepdims=True)
+        windows = np.where(std > 1e-6, (windows - mean) / np.maximum(std, 1e-6), windows - mean)
+
+        logits = self.model(windows.astype(np.float32)).astype(np.float64)
+        probabilities = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return probabilities / probabilities.sum(axis=1, keepdims=True)
+
+    def _decide(self, predicted_label, confidence):
+        """对分类结果做阈值过滤和反向抑制；做出决策 (发出或抑制了动作) 时返回 True"""
         # 阈值过滤
-        if confidence < self.threshold: return
-        if predicted_label == 'fixation': return
+        if confidence < self.threshold: return False
+        if predicted_label == 'fixation': return False
 
         final_prediction = predicted_label.upper()
         current_time = time.time()
@@ -287,10 +444,9 @@ class ModelController(QObject):
             self.prediction_ready.emit(final_prediction)
             print(f">>> ACTION: {final_prediction} (UNLOCKING Lock)")
 
-            # 立即清空缓冲区，防止重复触发
+            # 本次事件结束，之后的窗口需完全由新数据构成，防止重复触发
             self.last_prediction_time = current_time
-            self.data_buffer.clear()
-            return
+            return True
 
         # 2. 检查是否为反向动作 (回弹)
         is_opposite = False
@@ -302,9 +458,8 @@ class ModelController(QObject):
         # 3. 执行抑制
         if is_opposite and (current_time - self.last_valid_time) < REBOUND_SUPPRESSION_TIME:
             print(f"Ignored Rebound: {final_prediction} (Too soon after {self.last_valid_action})")
-            # 即使抑制了，也建议稍微清一下缓冲，防止连续误判
-            self.data_buffer.clear()
-            return
+            # 即使抑制了，也结束本次事件，防止连续误判
+            return True
 
         # 4. 通过验证，发送结果
         self.prediction_ready.emit(final_prediction)
@@ -314,7 +469,6 @@ class ModelController(QObject):
         self.last_valid_time = current_time
         self.last_prediction_time = current_time
 
-        # 预测成功后清空缓冲区，等待下一次新的眼动开始
-        self.data_buffer.clear()
-
-        print(f">>> ACTION: {final_prediction} (Conf: {confidence:.2f})")
\ No newline at end of file
+        print(f">>> ACTION: {final_prediction} (Conf: {confidence:.2f})")
+        # 预测成功后等待下一次新的眼动开始
+        return True
\ No newline at end of file
@@ -0,0 +1,142 @@
+# File: processing/event_detector.py
+
+import collections
+import numpy as np
+
+from .ring_buffer import SampleRing
+
+# --- 配置参数 ---
+DETECTOR_WINDOW_SAMPLES = 50  # 滑动方差窗口 (200 ms @ 250Hz)
+DETECTOR_ONSET_FACTOR = 4.0  # 起始阈值 = 基线标准差的倍数
+DETECTOR_OFFSET_RATIO = 0.6  # 结束阈值 = 起始阈值 * 该比例 (滞回)
+DETECTOR_MIN_THRESHOLD = 10.0  # 自适应阈值的上下限 (uV)
+DETECTOR_MAX_THRESHOLD = 80.0
+DETECTOR_INITIAL_THRESHOLD = 20.0  # 基线估计完成之前使用的固定阈值
+DETECTOR_BASELINE_SECONDS = 10.0  # 基线方差的指数平滑时间常数
+DETECTOR_WARMUP_SECONDS = 2.0  # 基线估计所需的最短静息数据
+DETECTOR_RESYNC_SAMPLES = 10000  # 每隔这么多样本精确重算一次窗口和，消除累积舍入误差
+
+EVENT_ONSET = 'onset'
+EVENT_OFFSET = 'offset'
+
+# kind: EVENT_ONSET / EVENT_OFFSET; sample_index: 自 reset() 以来的样本序号 (事件发生的那个样本)
+DetectorEvent = collections.namedtuple('DetectorEvent', ['kind', 'sample_index'])
+
+
+class RunningVarianceDetector:
+    """
+    滑动窗口方差事件检测器。
+    窗口内的一阶/二阶和随样本递推 (加入新样本、减去离开窗口的样本)，每个样本 O(1)，
+    按数据块向量化计算块内每个样本时刻的窗口方差，从而得到精确到样本的起止位置。
+    任一通道的标准差超过起始阈值即为事件开始，所有通道都低于结束阈值 (更低，滞回) 才结束。
+    阈值跟随静息期 (非事件期间) 的基线标准差自适应，限制在 [MIN, MAX] 之间。
+    """
+
+    def __init__(self, num_channels, sampling_rate, window=DETECTOR_WINDOW_SAMPLES):
+        self.num_channels = int(num_channels)
+        self.window = int(window)
+        self._baseline_alpha = 1.0 / (DETECTOR_BASELINE_SECONDS * sampling_rate)
+        self._warmup_samples = int(DETECTOR_WARMUP_SECONDS * sampling_rate)
+        self._history = SampleRing(self.num_channels, self.window, dtype=np.float64)
+        self.reset()
+
+    def reset(self):
+        self._history.clear()
+        self._sum = np.zeros(self.num_channels)
+        self._sum_sq = np.zeros(self.num_channels)
+        self.n_samples = 0
+        self.active = False
+        self.baseline_var = None  # 每通道的基线方差
+        self._baseline_samples = 0
+        self._since_resync = 0
+
+    @property
+    def onset_threshold(self):
+        """每通道的起始阈值 (标准差, uV)"""
+        if self.baseline_var is None or self._baseline_samples < self._warmup_samples:
+            return np.full(self.num_channels, DETECTOR_INITIAL_THRESHOLD)
+        return np.clip(DETECTOR_ONSET_FACTOR * np.sqrt(self.baseline_var),
+                       DETECTOR_MIN_THRESHOLD, DETECTOR_MAX_THRESHOLD)
+
+    def update(self, block):
+        """block: (num_channels, n) 新数据 -> 本块内发生的 [DetectorEvent]"""
+        n = block.shape[1]
+        if n == 0:
+            return []
+        if n > self.window:
+            # 离开窗口的样本必须还在历史里，超长的块分段处理
+            events = []
+            for start in range(0, n, self.window):
+                events.extend(self.update(block[:, start:start + self.window]))
+            return events
+
+        x = block.astype(np.float64)
+        # 离开窗口的样本：第 j 个新样本挤出的是历史中的第 (h - window + j) 个 (窗口未满时为 0)
+        history = self._history.latest(self.window)
+        offset = history.shape[1] - self.window
+        leaving = np.zeros_like(x)
+        first = max(0, -offset)
+        if first < n:
+            leaving[:, first:] = history[:, offset + first:offset + n]
+        self._history.append(x)
+
+        # 块内每个样本时刻的窗口和 (一阶、二阶一起累加)
+        delta = np.concatenate((x - leaving, x * x - leaving * leaving), axis=0)
+        totals = np.cumsum(delta, axis=1)
+        totals += np.concatenate((self._sum, self._sum_sq))[:, None]
+        sums, sums_sq = totals[:self.num_channels], totals[self.num_channels:]
+        self._sum, self._sum_sq = sums[:, -1].copy(), sums_sq[:, -1].copy()
+        self._since_resync += n
+        if self._since_resync >= DETECTOR_RESYNC_SAMPLES:
+            window = self._history.latest(self.window)
+            self._sum, self._sum_sq = window.sum(axis=1), (window * window).sum(axis=1)
+            self._since_resync = 0
+
+        count = np.minimum(np.arange(self.n_samples + 1, self.n_samples + n + 1), self.window)
+        mean = sums / count
+        var = np.maximum(sums_sq / count - mean * mean, 0.0)
+
+        # 窗口未满之前不检测
+        first_valid = min(n, max(0, self.window - self.n_samples - 1))
+        events, idle = self._scan(np.sqrt(var), first_valid)
+        self._update_baseline(var[:, first_valid:][:, idle])
+        self.n_samples += n
+        return events
+
+    def _scan(self, std, first_valid):
+        """
+        在块内依次寻找状态翻转的位置 (滞回：起始看任一通道，结束看所有通道)。
+        返回 (事件列表, 从 first_valid 开始每个样本是否处于静息期)
+        """
+        onset = self.onset_threshold[:, None]
+        above_on = np.any(std > onset, axis=0)
+        below_off = np.all(std < DETECTOR_OFFSET_RATIO * onset, axis=0)
+        n = std.shape[1]
+        idle = np.empty(n - first_valid, dtype=bool)
+        events = []
+        i = first_valid
+        while i < n:
+            flags = below_off if self.active else above_on
+            hits = np.flatnonzero(flags[i:])
+            stop = n if len(hits) == 0 else i + int(hits[0])
+            idle[i - first_valid:stop - first_valid] = not self.active
+            if stop == n:
+                break
+            self.active = not self.active
+            idle[stop - first_valid] = not self.active
+            events.append(DetectorEvent(EVENT_ONSET if self.active else EVENT_OFFSET, self.n_samples + stop))
+            i = stop + 1
+        return events, idle
+
+    def _update_baseline(self, idle_var):
+        """只用静息期 (非事件) 的窗口方差更新基线"""
+        m = idle_var.shape[1]
+        if m == 0:
+            return
+        block_var = idle_var.mean(axis=1)
+        if self.baseline_var is None:
+            self.baseline_var = block_var
+        else:
+            alpha = 1.0 - (1.0 - self._baseline_alpha) ** m
+            self.baseline_var = self.baseline_var + alpha * (block_var - self.baseline_var)
+        self._baseline_samples += m
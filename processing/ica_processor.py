@@ -1,24 +1,254 @@
 # File: processing/ica_processor.py
 
+import os
+import json
+import collections
+import time
+import hashlib
+import multiprocessing
+from multiprocessing import shared_memory
 import numpy as np
+import scipy.signal
+import scipy.stats
 from PyQt6.QtCore import QObject, pyqtSignal, pyqtSlot
 
+from .asr import ArtifactSubspaceReconstruction
+
 try:
-    from mne.preprocessing import ICA
+    import mne
+    from mne.preprocessing import ICA, read_ica
     from mne import create_info
     from mne.io import RawArray
 except ImportError:
     print("Error: MNE-Python is not installed. Please install it using 'pip install mne'")
-    ICA, create_info, RawArray = None, None, None
+    mne, ICA, read_ica, create_info, RawArray = None, None, None, None, None
+
+# 训练时视为 EOG 的通道 (不参与 ICA 分解，用于识别眼电成分)
+ICA_EOG_CHANNELS = (0, 1)
+
+# 清理矩阵与 MNE ica.apply() 结果的最大允许相对误差
+PROJECTOR_TOLERANCE = 1e-5
+
+# --- 训练参数 ---
+ICA_METHODS = ('picard', 'fastica')
+ICA_DEFAULT_METHOD = 'picard'  # picard 收敛快得多，结果与 infomax/fastica 等价
+ICA_N_STARTS = 4  # 多个随机初值并行拟合，取分离效果最好的一个
+ICA_MAX_ITER = 500
+ICA_TARGET_FREQ = 200  # ICA 不需要高采样率，降采样后训练
+ICA_N_COMPONENTS = 0.99  # 保留解释 99% 方差的主成分，矩阵病态时自动减少成分数
+ICA_POOL_WORKERS = max(1, min(ICA_N_STARTS, (os.cpu_count() or 2) - 1))
+ICA_POLL_INTERVAL = 0.1  # 等待子进程时检查取消请求的间隔 (秒)
+
+# --- 成分浏览器的预计算数据 ---
+ICA_PREVIEW_BINS = 1000  # 时域预览的 min/max 包络段数 (每段两个点)
+ICA_PSD_MAX_FREQ = 120.0  # PSD 只保留到该频率 (脑电和 EOG 主要能量分布区)
+
+# 随训练结果一起发给 UI 的成分摘要，UI 侧不再做任何计算
+# times: (2 * bins,) 预览的时间轴; previews: (n, 2 * bins) 峰值保持的 min/max 包络
+# freqs: (f,); log_psd: (n, f) log10 功率谱; kurtosis: (n,) 超额峰度; eog_correlation: (n,) 与 EOG 通道的最大 |r|
+ComponentSummary = collections.namedtuple(
+    'ComponentSummary', ['times', 'previews', 'freqs', 'log_psd', 'kurtosis', 'eog_correlation'])
+
+# --- 磁盘缓存 ---
+ICA_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".exgmp", "ica_cache")
+ICA_CACHE_MAX_FILES = 20
+ICA_CACHE_VERSION = 1  # 训练流程变化时递增，使旧缓存失效
+
+
+class ICAProjector:
+    """
+    由拟合好的 MNE ICA 直接计算实时清理矩阵，不再经过 RawArray + ica.apply() 的往返。
+    与 ica.apply() 的数学过程一致：预白化 -> PCA -> 反混合 -> 去除成分 -> 混合 -> 逆 PCA -> 还原尺度，
+    整体是一个 (n, n) 线性变换 (PCA 均值带来的常数偏移对高通后的实时数据可以忽略，不包含在内)。
+    矩阵按去除的成分集合缓存，切换/更改去除成分时无需重新计算。
+    """
+
+    def __init__(self, ica, channel_indices):
+        self.ica = ica
+        # ica.ch_names 在实时数据中的行号 (训练时 EOG 通道不参与 ICA)
+        self.channel_indices = np.asarray(channel_indices, dtype=np.int64)
+        self._cache = {}
+
+        n_components = ica.n_components_
+        n_pca = self._n_pca_components()
+        pca = ica.pca_components_[:n_pca]
+
+        unmixing = np.eye(n_pca)
+        unmixing[:n_components, :n_components] = ica.unmixing_matrix_
+        self._unmixing = unmixing @ pca
+
+        mixing = np.eye(n_pca)
+        mixing[:n_components, :n_components] = ica.mixing_matrix_
+        self._mixing = pca.T @ mixing
+
+        if ica.noise_cov is None:
+            # 标准化预白化：逐通道缩放
+            self._whitener = np.diag(1.0 / ica.pre_whitener_.ravel())
+            self._dewhitener = np.diag(ica.pre_whitener_.ravel())
+        else:
+            self._whitener = ica.pre_whitener_
+            self._dewhitener = np.linalg.pinv(ica.pre_whitener_, rcond=1e-14)
+
+    @property
+    def n_components(self):
+        return self.ica.n_components_
+
+    def _n_pca_components(self):
+        """与 MNE 的默认行为一致：保留全部 PCA 成分 (或按解释方差比例选择)"""
+        ica = self.ica
+        n = ica.n_pca_components
+        if isinstance(n, float):
+            cvar = np.cumsum(np.asarray(ica.pca_explained_variance_, dtype=np.float64))
+            cvar /= cvar[-1]
+            return int(min((cvar <= n).sum() + 1, len(cvar)))
+        if n is None:
+            n = getattr(ica, '_max_pca_components', None) or ica.pca_components_.shape[0]
+        return max(int(n), ica.n_components_)
+
+    def matrix(self, exclude):
+        """去除 exclude 成分后的 (n, n) float32 清理矩阵"""
+        key = tuple(sorted(set(int(i) for i in exclude)))
+        if key not in self._cache:
+            n_pca = self._unmixing.shape[0]
+            keep = np.concatenate((np.setdiff1d(np.arange(self.n_components), key),
+                                   np.arange(self.n_components, n_pca)))
+            projection = self._mixing[:, keep] @ self._unmixing[keep, :]
+            self._cache[key] = (self._dewhitener @ projection @ self._whitener).astype(np.float32)
+        return self._cache[key]
+
+    def validate(self, exclude, n_samples=1000):
+        """
+        与 MNE ica.apply() 的结果对比，返回最大相对误差。
+        MNE 的结果包含 PCA 均值带来的常数偏移，用 apply(x) - apply(0) 取出线性部分再比较。
+        """
+        rng = np.random.default_rng(0)
+        n = len(self.ica.ch_names)
+        data = rng.standard_normal((n, n_samples)) * self.ica.pre_whitener_.reshape(-1, 1)
+
+        def mne_apply(x):
+            raw = RawArray(x, self.ica.info, verbose=False)
+            return self.ica.apply(raw, exclude=list(exclude), verbose=False).get_data()
+
+        expected = mne_apply(data) - mne_apply(np.zeros_like(data))
+        actual = self.matrix(exclude).astype(np.float64) @ data
+        return float(np.max(np.abs(actual - expected)) / max(np.max(np.abs(expected)), 1e-30))
+
+
+def _build_raw(calibration_data, sampling_rate):
+    """校准数据 -> 预处理后的 MNE Raw (EOG 通道标记为 eog，降采样 + 1Hz 高通)"""
+    n_channels = calibration_data.shape[0]
+    ch_names = [f'CH {i + 1}' for i in range(n_channels)]
+    ch_types = ['eeg'] * n_channels
+
+    # 前两个通道为 EOG
+    for idx, name in zip(ICA_EOG_CHANNELS, ('EOG_V', 'EOG_H')):
+        ch_types[idx] = 'eog'
+        ch_names[idx] = name
+
+    info = create_info(ch_names=ch_names, sfreq=sampling_rate, ch_types=ch_types)
+    # 转换为 Volts
+    raw = RawArray(calibration_data * 1e-6, info, verbose=False)
+
+    # 降采样：200Hz 足够捕捉眨眼和伪迹，同时规避高频噪音导致的矩阵不稳定
+    if sampling_rate > ICA_TARGET_FREQ:
+        raw.resample(ICA_TARGET_FREQ, npad="auto", verbose=False)
+
+    # 1Hz 高通是 ICA 的标配，去漂移
+    raw.filter(l_freq=1.0, h_freq=None, verbose=False)
+    return raw, ch_names
+
+
+def _fit_worker(shm_name, shape, dtype, sampling_rate, method, seed):
+    """
+    在子进程中拟合一次 ICA (不占用主进程的 GIL)。
+    校准数据通过共享内存传入；返回 (seed, ica, 分离质量)，质量为各源信号超额峰度绝对值的均值。
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        data = np.ndarray(shape, dtype=dtype, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+
+    raw, _ = _build_raw(data, sampling_rate)
+    ica = ICA(n_components=ICA_N_COMPONENTS, method=method, max_iter=ICA_MAX_ITER, random_state=seed)
+    ica.fit(raw, verbose=False)
+    sources = ica.get_sources(raw).get_data()
+    score = float(np.mean(np.abs(scipy.stats.kurtosis(sources, axis=1))))
+    return seed, ica, score
+
+
+def summarize_components(sources, eog, sfreq):
+    """sources: (n, samples) ICA 源信号; eog: (k, samples) EOG 通道 -> ComponentSummary"""
+    n, n_samples = sources.shape
+
+    # 1. 峰值保持的降采样预览
+    bin_size = max(1, n_samples // ICA_PREVIEW_BINS)
+    n_bins = n_samples // bin_size
+    binned = sources[:, :n_bins * bin_size].reshape(n, n_bins, bin_size)
+    previews = np.empty((n, 2 * n_bins), dtype=np.float32)
+    previews[:, 0::2] = binned.min(axis=2)
+    previews[:, 1::2] = binned.max(axis=2)
+    times = (np.repeat(np.arange(n_bins), 2) * bin_size + bin_size / 2.0) / sfreq
+
+    # 2. 所有成分一次性计算 PSD
+    freqs, psd = scipy.signal.welch(sources, fs=sfreq, nperseg=min(n_samples, int(sfreq * 2)), axis=-1)
+    # 去掉 DC 和奈奎斯特频点 (去趋势后偏低，会压扁纵轴)
+    keep = (freqs > 0) & (freqs <= ICA_PSD_MAX_FREQ) & (freqs < 0.5 * sfreq)
+    log_psd = np.log10(np.maximum(psd[:, keep], 1e-30)).astype(np.float32)
+
+    # 3. 统计量
+    kurtosis = scipy.stats.kurtosis(sources, axis=1)
+    eog_correlation = np.zeros(n)
+    if len(eog):
+        src = sources - sources.mean(axis=1, keepdims=True)
+        ref = eog - eog.mean(axis=1, keepdims=True)
+        norm = np.outer(np.linalg.norm(src, axis=1), np.linalg.norm(ref, axis=1))
+        eog_correlation = (np.abs(src @ ref.T) / np.maximum(norm, 1e-30)).max(axis=1)
+
+    return ComponentSummary(times.astype(np.float32), previews, freqs[keep].astype(np.float32), log_psd,
+                            kurtosis.astype(np.float32), eog_correlation.astype(np.float32))
 
 
 class ICAProcessor(QObject):
     """
-    使用 MNE-Python 的 ICA 在后台线程中训练模型。
-    【修复版】：增加了降采样和自适应成分数量，解决 4000Hz 下的协方差矩阵病态问题。
+    ICA 训练调度 (运行在后台 QThread)。
+    拟合在独立的进程池中进行：校准数据放入共享内存，多个随机初值并行拟合，取分离质量最好的一个；
+    主进程只做轻量的后处理，绘图不会因 GIL 被长时间占用而卡顿。
+    拟合结果按 (通道配置, 校准数据哈希, 训练参数) 缓存到磁盘，相同的校准数据再次训练时直接读取。
     """
-    training_finished = pyqtSignal(object, np.ndarray, list)
+    # (ICAProjector, ComponentSummary, 建议去除的成分)
+    training_finished = pyqtSignal(object, object, list)
     training_failed = pyqtSignal(str)
+    training_cancelled = pyqtSignal()
+    # (已完成的拟合数, 总拟合数)
+    training_progress = pyqtSignal(int, int)
+    # 校准好的 ArtifactSubspaceReconstruction
+    asr_calibrated = pyqtSignal(object)
+    asr_calibration_failed = pyqtSignal(str)
+
+    def __init__(self):
+        super().__init__()
+        self.method = ICA_DEFAULT_METHOD
+        self.n_starts = ICA_N_STARTS
+        self._pool = None
+        self._cancel_requested = False
+
+    @pyqtSlot(str)
+    def set_method(self, method):
+        if method not in ICA_METHODS:
+            print(f"Warning: Unknown ICA method '{method}'.")
+            return
+        self.method = method
+
+    def cancel(self):
+        """取消正在进行的训练。训练期间本线程的事件循环被占用，需从其它线程直接调用"""
+        self._cancel_requested = True
+
+    def shutdown(self):
+        """关闭进程池 (程序退出时调用)"""
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
 
     @pyqtSlot(np.ndarray, int)
     def train(self, calibration_data, sampling_rate):
@@ -37,51 +267,23 @@ class ICAProcessor(QObject):
                 f"Error: At least 3 channels required (2 EOG + EEG). Got {n_channels}.")
             return
 
+        self._cancel_requested = False
         try:
-            # --- 1. 定义通道配置 ---
-            ch_names = [f'CH {i + 1}' for i in range(n_channels)]
-            ch_types = ['eeg'] * n_channels
-
-            # 硬编码前两个为 EOG
-            ch_types[0] = 'eog';
-            ch_names[0] = 'EOG_V'
-            ch_types[1] = 'eog';
-            ch_names[1] = 'EOG_H'
-
-            # --- 2. 创建 Raw 对象 ---
-            info = create_info(ch_names=ch_names, sfreq=sampling_rate, ch_types=ch_types)
-            # 转换为 Volts
-            raw = RawArray(calibration_data * 1e-6, info)
-
-            # --- [关键修复 1] 降采样 ---
-            # ICA 不需要 4000Hz 的精度，200Hz 足够捕捉眨眼和伪迹
-            # 这能极大提高计算速度，并规避高频噪音导致的矩阵不稳定
-            TARGET_ICA_FREQ = 200
-            if sampling_rate > TARGET_ICA_FREQ:
-                print(f"Info: Resampling data from {sampling_rate}Hz to {TARGET_ICA_FREQ}Hz for ICA stability...")
-                raw.resample(TARGET_ICA_FREQ, npad="auto")
-
-            # --- 3. 预处理滤波 ---
-            # 1Hz 高通是 ICA 的标配，去漂移
-            raw.filter(l_freq=1.0, h_freq=None, verbose=False)
-
-            # --- [关键修复 2] 自适应成分数量 ---
-            # 不要硬编码 n_components = n_eeg_channels。
-            # 使用 float (0.99) 让算法保留解释 99% 方差的主成分。
-            # 如果矩阵病态，它会自动减少成分数量（例如从 6 降到 5），从而避免崩溃。
-
-            print("Info: Fitting ICA using extended-infomax (or fastica)...")
-            ica = ICA(
-                n_components=0.99,  # <--- 这里的改动解决了 RuntimeWarning
-                method='fastica',  # fastica 通常比 picard 更稳健
-                max_iter=500,  # 增加最大迭代次数
-                random_state=97
-            )
-
-            # 训练 (仅使用 EEG 通道，剔除 EOG)
-            ica.fit(raw, verbose=True)
-
-            # --- 4. 自动检测 EOG 伪迹 ---
+            calibration_data = np.ascontiguousarray(calibration_data, dtype=np.float32)
+
+            # --- 1. 读取缓存或在进程池中拟合 ---
+            cache_path = self._cache_path(calibration_data, sampling_rate)
+            ica = self._load_cached(cache_path)
+            if ica is None:
+                ica = self._fit_parallel(calibration_data, sampling_rate)
+                if ica is None:
+                    print("ICAProcessor: Training cancelled.")
+                    self.training_cancelled.emit()
+                    return
+                self._save_cached(ica, cache_path)
+
+            # --- 2. 自动检测 EOG 伪迹 ---
+            raw, ch_names = _build_raw(calibration_data, sampling_rate)
             print("Info: Detecting EOG artifacts...")
             # threshold 3.0 是经验值，如果觉得太敏感可以调高到 4.0
             suggested_bad_indices, scores = ica.find_bads_eog(raw, threshold=3.0, verbose=False)
@@ -90,13 +292,116 @@ class ICAProcessor(QObject):
             suggested_bad_indices = [int(x) for x in suggested_bad_indices]
             print(f"Info: MNE suggested artifacts indices: {suggested_bad_indices}")
 
-            # --- 5. 获取源数据用于绘图 ---
+            # --- 3. 成分预览、PSD 和统计量都在这里算好，对话框只负责绘制 ---
             sources = ica.get_sources(raw).get_data()
+            summary = summarize_components(sources, raw.get_data(picks='eog'), raw.info['sfreq'])
+
+            # --- 4. 直接计算实时清理矩阵，并与 MNE 的结果核对 ---
+            projector = ICAProjector(ica, [ch_names.index(name) for name in ica.ch_names])
+            error = projector.validate(suggested_bad_indices)
+            if error > PROJECTOR_TOLERANCE:
+                print(f"Warning: ICA projector deviates from MNE apply (relative error {error:.2e}).")
+            else:
+                print(f"Info: ICA projector matches MNE apply (relative error {error:.2e}).")
 
             print(f"ICAProcessor: Training finished. Decomposed into {sources.shape[0]} components.")
-            self.training_finished.emit(ica, sources, suggested_bad_indices)
+            self.training_finished.emit(projector, summary, suggested_bad_indices)
 
         except Exception as e:
             import traceback
             traceback.print_exc()
-            self.training_failed.emit(f"ICA Training Error: {str(e)}")
\ No newline at end of file
+            self.training_failed.emit(f"ICA Training Error: {str(e)}")
+
+    def _fit_parallel(self, calibration_data, sampling_rate):
+        """多个随机初值在进程池中并行拟合，返回质量最好的 ICA；被取消时返回 None"""
+        print(f"Info: Fitting ICA ({self.method}, {self.n_starts} starts, {ICA_POOL_WORKERS} processes)...")
+        t_start = time.perf_counter()
+        shm = shared_memory.SharedMemory(create=True, size=calibration_data.nbytes)
+        try:
+            np.ndarray(calibration_data.shape, dtype=calibration_data.dtype, buffer=shm.buf)[:] = calibration_data
+            if self._pool is None:
+                self._pool = multiprocessing.get_context('spawn').Pool(ICA_POOL_WORKERS)
+            args = (shm.name, calibration_data.shape, calibration_data.dtype.str, sampling_rate, self.method)
+            pending = [self._pool.apply_async(_fit_worker, args + (97 + i,)) for i in range(self.n_starts)]
+
+            results = []
+            self.training_progress.emit(0, len(pending))
+            while pending:
+                if self._cancel_requested:
+                    # 正在运行的拟合无法中断，直接终止进程池，下次训练时重建
+                    self.shutdown()
+                    return None
+                pending[0].wait(ICA_POLL_INTERVAL)
+                done = [r for r in pending if r.ready()]
+                if done:
+                    results.extend(r.get() for r in done)
+                    pending = [r for r in pending if r not in done]
+                    self.training_progress.emit(len(results), len(results) + len(pending))
+        finally:
+            shm.close()
+            shm.unlink()
+
+        seed, ica, score = max(results, key=lambda r: r[2])
+        print(f"Info: ICA starts (seed: score) "
+              f"{', '.join(f'{r[0]}: {r[2]:.2f}' for r in sorted(results, key=lambda r: r[0]))}; "
+              f"using seed {seed}. {time.perf_counter() - t_start:.1f}s")
+        return ica
+
+    # --- 磁盘缓存 ---
+    def _cache_path(self, calibration_data, sampling_rate):
+        """缓存键：通道配置 + 训练参数 + 校准数据的哈希"""
+        config = {
+            'version': ICA_CACHE_VERSION,
+            'mne': mne.__version__,
+            'shape': list(calibration_data.shape),
+            'eog_channels': list(ICA_EOG_CHANNELS),
+            'sampling_rate': int(sampling_rate),
+            'target_freq': ICA_TARGET_FREQ,
+            'n_components': ICA_N_COMPONENTS,
+            'method': self.method,
+            'n_starts': self.n_starts,
+            'max_iter': ICA_MAX_ITER,
+        }
+        digest = hashlib.sha1(json.dumps(config, sort_keys=True).encode())
+        digest.update(calibration_data.tobytes())
+        return os.path.join(ICA_CACHE_DIR, f"{digest.hexdigest()}-ica.fif")
+
+    def _load_cached(self, path):
+        if not os.path.exists(path):
+            return None
+        try:
+            ica = read_ica(path, verbose=False)
+            print(f"Info: Loaded cached ICA model {os.path.basename(path)}.")
+            return ica
+        except Exception as e:
+            print(f"Warning: Failed to read cached ICA model: {e}")
+            return None
+
+    def _save_cached(self, ica, path):
+        try:
+            os.makedirs(ICA_CACHE_DIR, exist_ok=True)
+            ica.save(path, overwrite=True, verbose=False)
+            # 只保留最近的 ICA_CACHE_MAX_FILES 个模型
+            files = [os.path.join(ICA_CACHE_DIR, f) for f in os.listdir(ICA_CACHE_DIR) if f.endswith('-ica.fif')]
+            for old in sorted(files, key=os.path.getmtime)[:-ICA_CACHE_MAX_FILES]:
+                os.remove(old)
+        except Exception as e:
+            print(f"Warning: Failed to cache ICA model: {e}")
+
+    @pyqtSlot(np.ndarray, int)
+    def calibrate_asr(self, calibration_data, sampling_rate):
+        """
+        ASR 校准：比 ICA 轻得多 (无迭代，几次特征分解)，不需要人工挑选成分。
+        与 ICA 一致，EOG 通道不参与，保留给眼动模型。
+        """
+        n_channels, n_samples = calibration_data.shape
+        print(f"ICAProcessor: ASR calibration on {n_samples} samples @ {sampling_rate}Hz.")
+        eeg = [c for c in range(n_channels) if c not in ICA_EOG_CHANNELS]
+        try:
+            asr = ArtifactSubspaceReconstruction(eeg, sampling_rate)
+            asr.calibrate(calibration_data)
+        except Exception as e:
+            self.asr_calibration_failed.emit(f"ASR Calibration Error: {str(e)}")
+            return
+        print(f"ICAProcessor: ASR calibrated on {len(eeg)} channels.")
+        self.asr_calibrated.emit(asr)
@@ -0,0 +1,305 @@
+# File: processing/inference_backend.py
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+import warnings
+import numpy as np
+import torch
+
+# --- 可选依赖 ---
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
+# --- 配置参数 ---
+INFERENCE_BACKENDS = ('onnxruntime_int8', 'onnxruntime', 'torchscript', 'compile', 'eager')
+# 默认按顺序尝试，失败或与 eager 输出不一致时退到下一个
+# onnxruntime_int8 需要事先用 benchmarks/quantize_int8.py 生成量化模型 (不存在时跳过)
+# torch.compile 首次编译需要数秒且依赖 C++ 编译器，不在默认列表中
+DEFAULT_BACKEND_ORDER = ('onnxruntime_int8', 'onnxruntime', 'torchscript', 'eager')
+BACKEND_TOLERANCE = 1e-3  # 与 eager 输出 (logits) 的最大允许偏差 (相对于 logits 幅度)
+BACKEND_WARMUP_RUNS = 10  # 加载后预热的次数，避免首个真实窗口承担初始化开销，后一半用于测量延迟
+ONNX_OPSET = 17
+
+# CPU 推理配置：低端平板上推理与采集/处理线程共享少量核心，固定线程数，不让推理占满所有核心
+# 注意 torch.set_num_threads 对整个进程生效 (本程序中只有眼动模型使用 PyTorch)
+CPU_INFERENCE_THREADS = 1
+INFERENCE_LATENCY_BUDGET_MS = 5.0  # 预热测得的单窗口延迟超过该值时给出警告
+
+# int8 量化 (ONNX Runtime 静态量化，QDQ 格式，权重逐通道 int8，激活 uint8，百分位校准)
+INT8_MODEL_SUFFIX = '.int8.onnx'  # 量化模型与 checkpoint 放在一起: models/xxx.pth -> models/xxx.int8.onnx
+INT8_CALIBRATION_WINDOWS = 200
+
+# 导出的模型缓存，与 ICA 缓存放在同一目录下
+MODEL_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".exgmp", "model_cache")
+MODEL_CACHE_MAX_FILES = 10
+MODEL_CACHE_VERSION = 2  # 导出流程变化时递增，使旧缓存失效
+
+
+class EagerBackend:
+    """普通 PyTorch 模型。所有后端都接受 (n, C, L) float32 的 numpy 数组，返回 (n, num_classes) 的 logits"""
+    name = 'eager'
+
+    def __init__(self, model, device):
+        self.model = model
+        self.device = device
+
+    def __call__(self, batch):
+        with torch.inference_mode():
+            x = torch.from_numpy(np.ascontiguousarray(batch, dtype=np.float32)).to(self.device)
+            return self.model(x).float().cpu().numpy()
+
+
+class TorchScriptBackend(EagerBackend):
+    """trace + freeze 的 TorchScript 模块 (常量折叠、去掉 Python 调度开销)"""
+    name = 'torchscript'
+
+    @staticmethod
+    def export(model, example, path):
+        # 新版 PyTorch 对 torch.jit 给出弃用警告，功能不受影响
+        with torch.no_grad(), warnings.catch_warnings():
+            warnings.simplefilter('ignore', FutureWarning)
+            traced = torch.jit.trace(model, example)
+            frozen = torch.jit.freeze(traced)
+            torch.jit.save(frozen, path)
+
+    @classmethod
+    def load(cls, path, device, threads=CPU_INFERENCE_THREADS):
+        # PyTorch 的线程数是进程级设置，由 configure_cpu_threads() 统一配置
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', FutureWarning)
+            module = torch.jit.load(path, map_location=device)
+        module.eval()
+        return cls(module, device)
+
+
+class CompiledBackend(EagerBackend):
+    """torch.compile (inductor)。编译产物由 inductor 自己的磁盘缓存保存在 MODEL_CACHE_DIR 下"""
+    name = 'compile'
+
+    @classmethod
+    def build(cls, model, device):
+        os.environ.setdefault('TORCHINDUCTOR_CACHE_DIR', os.path.join(MODEL_CACHE_DIR, 'inductor'))
+        return cls(torch.compile(model), device)
+
+
+def configure_cpu_threads(threads=CPU_INFERENCE_THREADS):
+    """固定 PyTorch 的算子内线程数；算子间并行只能在第一次并行运算之前设置，之后的调用忽略"""
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass
+
+
+class OnnxRuntimeBackend:
+    """导出为 ONNX，用 ONNX Runtime 推理 (图优化 + 算子融合，不经过 PyTorch 调度)"""
+    name = 'onnxruntime'
+
+    def __init__(self, session):
+        self.session = session
+        self.input_name = session.get_inputs()[0].name
+
+    def __call__(self, batch):
+        return self.session.run(None, {self.input_name: np.ascontiguousarray(batch, dtype=np.float32)})[0]
+
+    @staticmethod
+    def export(model, example, path):
+        with torch.no_grad():
+            # dynamo=False: 使用 TorchScript 导出器，不依赖 onnxscript
+            torch.onnx.export(model, (example,), path, input_names=['input'], output_names=['logits'],
+                              dynamic_axes={'input': {0: 'batch'}, 'logits': {0: 'batch'}},
+                              opset_version=ONNX_OPSET, dynamo=False)
+
+    @classmethod
+    def load(cls, path, device, threads=CPU_INFERENCE_THREADS):
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # 固定线程数，单窗口推理不需要算子间并行；空闲时线程不自旋等待，不占用采集线程的 CPU
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.add_session_config_entry('session.intra_op.allow_spinning', '0')
+        providers = ['CPUExecutionProvider']
+        if device.type == 'cuda' and 'CUDAExecutionProvider' in ort.get_available_providers():
+            providers.insert(0, 'CUDAExecutionProvider')
+        return cls(ort.InferenceSession(path, options, providers=providers))
+
+
+class OnnxRuntimeInt8Backend(OnnxRuntimeBackend):
+    """
+    int8 量化的 ONNX 模型。量化需要校准数据，离线完成 (benchmarks/quantize_int8.py)，并在那里核对精度；
+    模型元数据中记录了来源 checkpoint 的哈希，checkpoint 更新后旧的量化模型不再使用。
+    """
+    name = 'onnxruntime_int8'
+
+    @classmethod
+    def load(cls, path, device, threads=CPU_INFERENCE_THREADS, checkpoint_sha1=None):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"no quantized model at {path}")
+        backend = super().load(path, device, threads)
+        source = backend.session.get_modelmeta().custom_metadata_map.get('checkpoint_sha1')
+        if checkpoint_sha1 is not None and source != checkpoint_sha1:
+            raise RuntimeError("quantized model was built from a different checkpoint")
+        return backend
+
+    @staticmethod
+    def quantize(model, checkpoint_path, calibration, path):
+        """model: 已加载权重的 eval 模型；calibration: (n, C, L) float32 真实输入窗口"""
+        import onnx
+        from onnxruntime.quantization import (quantize_static, CalibrationDataReader, CalibrationMethod,
+                                              QuantFormat, QuantType)
+        from onnxruntime.quantization.shape_inference import quant_pre_process
+
+        class WindowReader(CalibrationDataReader):
+            def __init__(self):
+                self.windows = iter(calibration[:, None])
+
+            def get_next(self):
+                window = next(self.windows, None)
+                return None if window is None else {'input': window}
+
+        with tempfile.TemporaryDirectory() as tmp:
+            fp32_path = os.path.join(tmp, 'fp32.onnx')
+            prepared_path = os.path.join(tmp, 'fp32_prepared.onnx')
+            OnnxRuntimeBackend.export(model, torch.from_numpy(calibration[:1]), fp32_path)
+            quant_pre_process(fp32_path, prepared_path)
+            quantize_static(prepared_path, path, WindowReader(), quant_format=QuantFormat.QDQ, per_channel=True,
+                            activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8,
+                            calibrate_method=CalibrationMethod.Percentile)
+
+        quantized = onnx.load(path)
+        onnx.helper.set_model_props(quantized, {'checkpoint_sha1': _file_sha1(checkpoint_path)})
+        onnx.save(quantized, path)
+
+
+def int8_model_path(checkpoint_path):
+    return os.path.splitext(checkpoint_path)[0] + INT8_MODEL_SUFFIX
+
+
+def _file_sha1(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        digest.update(f.read())
+    return digest.hexdigest()
+
+
+# 可导出为文件的后端: 名称 -> (类, 缓存文件后缀)
+_EXPORTED_BACKENDS = {
+    'onnxruntime': (OnnxRuntimeBackend, '.onnx'),
+    'torchscript': (TorchScriptBackend, '.ts.pt'),
+}
+
+
+def _cache_path(checkpoint_path, backend, input_shape, device):
+    """缓存键：checkpoint 内容 + 后端 + 输入形状 + 运行库版本"""
+    config = {
+        'version': MODEL_CACHE_VERSION,
+        'backend': backend,
+        'torch': torch.__version__,
+        'onnxruntime': ort.__version__ if ort is not None else None,
+        'input_shape': list(input_shape[1:]),
+        'device': device.type,
+    }
+    config['checkpoint'] = _file_sha1(checkpoint_path)
+    digest = hashlib.sha1(json.dumps(config, sort_keys=True).encode())
+    return os.path.join(MODEL_CACHE_DIR, digest.hexdigest() + _EXPORTED_BACKENDS[backend][1])
+
+
+def _prune_cache():
+    files = [os.path.join(MODEL_CACHE_DIR, f) for f in os.listdir(MODEL_CACHE_DIR)
+             if f.endswith(tuple(suffix for _, suffix in _EXPORTED_BACKENDS.values()))]
+    for old in sorted(files, key=os.path.getmtime)[:-MODEL_CACHE_MAX_FILES]:
+        os.remove(old)
+
+
+def _matches(backend, reference, example):
+    """后端输出与 eager 的 logits 一致 (导出/编译不改变模型的含义)"""
+    out = backend(example.numpy())
+    scale = max(1.0, float(np.abs(reference).max()))
+    return out.shape == reference.shape and float(np.abs(out - reference).max()) <= BACKEND_TOLERANCE * scale
+
+
+def load_backend(model_factory, checkpoint_path, input_shape, device=None, backends=DEFAULT_BACKEND_ORDER,
+                 threads=CPU_INFERENCE_THREADS):
+    """
+    按 backends 的顺序加载第一个可用的推理后端，最后总能退回 eager。
+    model_factory(): 返回未加载权重的模型；input_shape: (1, C, L) 单个窗口的形状。
+    已导出的后端命中缓存时直接加载文件，不需要构造 PyTorch 模型。
+    返回的后端带有 latency_ms 属性 (预热时测得的单窗口延迟)。
+    """
+    device = device or torch.device('cpu')
+    configure_cpu_threads(threads)
+    model, reference = None, None
+    example = torch.zeros(input_shape)
+    example[..., ::7] = 1.0  # 非平凡输入，用于核对输出
+
+    def eager_model():
+        nonlocal model, reference
+        if model is None:
+            model = model_factory()
+            model.load_state_dict(torch.load(checkpoint_path, map_location=device))
+            model.to(device)
+            model.eval()
+            reference = EagerBackend(model, device)(example.numpy())
+            # 推理专用结构 (BN 折叠等)，数值不一致时保留原模型
+            if hasattr(model, 'for_inference'):
+                fused = model.for_inference()
+                if _matches(EagerBackend(fused, device), reference, example):
+                    model = fused
+                else:
+                    print("Warning: Inference-optimized model differs from checkpoint, using original.")
+        return model
+
+    for name in tuple(backends) + ('eager',):
+        t_start = time.perf_counter()
+        try:
+            if name == 'eager':
+                backend = EagerBackend(eager_model(), device)
+            elif name == 'onnxruntime_int8':
+                if ort is None:
+                    continue
+                backend = OnnxRuntimeInt8Backend.load(int8_model_path(checkpoint_path), device, threads,
+                                                      _file_sha1(checkpoint_path))
+            elif name == 'compile':
+                backend = CompiledBackend.build(eager_model(), device)
+                if not _matches(backend, reference, example):
+                    raise RuntimeError("output differs from eager model")
+            elif name in _EXPORTED_BACKENDS:
+                if name == 'onnxruntime' and ort is None:
+                    continue
+                backend_class = _EXPORTED_BACKENDS[name][0]
+                path = _cache_path(checkpoint_path, name, input_shape, device)
+                if not os.path.exists(path):
+                    os.makedirs(MODEL_CACHE_DIR, exist_ok=True)
+                    backend_class.export(eager_model(), example.to(device), path + '.tmp')
+                    os.replace(path + '.tmp', path)
+                    _prune_cache()
+                backend = backend_class.load(path, device, threads)
+                if reference is not None and not _matches(backend, reference, example):
+                    os.remove(path)
+                    raise RuntimeError("output differs from eager model")
+            else:
+                print(f"Warning: Unknown inference backend '{name}'.")
+                continue
+
+            load_ms = (time.perf_counter() - t_start) * 1000
+            latencies = []
+            for _ in range(BACKEND_WARMUP_RUNS):
+                t_run = time.perf_counter()
+                backend(example.numpy())
+                latencies.append(time.perf_counter() - t_run)
+            backend.latency_ms = float(np.median(latencies[BACKEND_WARMUP_RUNS // 2:])) * 1000
+            print(f"Info: Inference backend '{name}' ready in {load_ms:.0f} ms, "
+                  f"{backend.latency_ms:.2f} ms/window ({threads} thread(s)).")
+            if backend.latency_ms > INFERENCE_LATENCY_BUDGET_MS:
+                print(f"Warning: Inference latency above {INFERENCE_LATENCY_BUDGET_MS:g} ms budget.")
+            return backend
+        except Exception as e:
+            print(f"Warning: Inference backend '{name}' unavailable, falling back: {e}")
+            if name == 'eager':
+                raise
@@ -0,0 +1,120 @@
+# File: processing/load_governor.py
+
+import time
+from PyQt6.QtCore import QObject, pyqtSignal, pyqtSlot, QTimer
+
+from .data_processor import FFT_UPDATE_RATE, PROCESSING_INTERVAL_MS
+
+# --- 配置参数 ---
+GOVERNOR_INTERVAL_MS = 500  # 评估周期
+LOAD_EMA_ALPHA = 0.2  # 耗时统计的平滑系数
+
+HIGH_UI_LOAD = 0.5  # 单帧绘制耗时占帧间隔的比例
+LOW_UI_LOAD = 0.25
+HIGH_UI_LAG_MS = 40  # UI 事件循环的延迟 (定时器迟到的时间)
+LOW_UI_LAG_MS = 10
+HIGH_PROC_LOAD = 0.5  # 处理线程的占用率
+LOW_PROC_LOAD = 0.2
+
+STEP_UP_TICKS = 2  # 连续 N 次过载才降级 (1 s)
+STEP_DOWN_TICKS = 6  # 连续 N 次空闲才恢复 (3 s)
+
+# 降级档位，按顺序依次舍弃：先降绘图帧率，再降 FFT 刷新率，最后暂停频带功率
+# (绘图间隔 ms, FFT 刷新率 Hz, 频带功率开关, 描述)
+LOAD_LEVELS = [
+    (16, FFT_UPDATE_RATE, True, "Normal"),
+    (33, FFT_UPDATE_RATE, True, "Plot 30 FPS"),
+    (50, FFT_UPDATE_RATE, True, "Plot 20 FPS"),
+    (50, 2, True, "Plot 20 FPS, FFT 2 Hz"),
+    (50, 1, True, "Plot 20 FPS, FFT 1 Hz"),
+    (50, 1, False, "Plot 20 FPS, FFT 1 Hz, Band Power paused"),
+]
+
+
+class LoadGovernor(QObject):
+    """
+    自适应帧率 / 降级调度 (运行在 UI 线程)。
+    周期性读取绘图耗时、UI 事件循环延迟和处理线程耗时，过载时按 LOAD_LEVELS 逐档舍弃显示相关的工作，
+    负载回落后再逐档恢复。
+    数据接收、滤波、录制和模型推理不受影响，这里只调节"看"的部分。
+    """
+    plot_interval_changed = pyqtSignal(int)
+    fft_rate_changed = pyqtSignal(float)
+    band_power_enabled_changed = pyqtSignal(bool)
+    state_changed = pyqtSignal(int, str)
+
+    def __init__(self, time_domain_widget, data_processor, parent=None):
+        super().__init__(parent)
+        self.time_domain_widget = time_domain_widget
+        self.data_processor = data_processor
+
+        self.level = 0
+        self.ui_lag_ms = 0.0
+        self._high_ticks = 0
+        self._low_ticks = 0
+        self._last_tick = None
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(GOVERNOR_INTERVAL_MS)
+        self.timer.timeout.connect(self._evaluate)
+
+    @pyqtSlot()
+    def start(self):
+        self._last_tick = time.perf_counter()
+        self.ui_lag_ms = 0.0
+        self._high_ticks = self._low_ticks = 0
+        self.timer.start()
+
+    @pyqtSlot()
+    def stop(self):
+        self.timer.stop()
+        self._set_level(0)
+
+    def _evaluate(self):
+        now = time.perf_counter()
+        lag = max(0.0, (now - self._last_tick) * 1000 - GOVERNOR_INTERVAL_MS)
+        self._last_tick = now
+        self.ui_lag_ms += LOAD_EMA_ALPHA * (lag - self.ui_lag_ms)
+
+        render_ms = self.time_domain_widget.render_cost_ms
+        fft_rate = LOAD_LEVELS[self.level][1]
+        # 处理线程占用率 = 每个处理周期的耗时 + 每秒 FFT 的耗时
+        proc_load = (self.data_processor.processing_cost_ms / PROCESSING_INTERVAL_MS +
+                     self.data_processor.fft_cost_ms * fft_rate / 1000.0)
+
+        ui_load = render_ms / LOAD_LEVELS[self.level][0]
+        overloaded = ui_load > HIGH_UI_LOAD or self.ui_lag_ms > HIGH_UI_LAG_MS or proc_load > HIGH_PROC_LOAD
+
+        # 恢复时按上一档的帧间隔评估，避免刚恢复又立刻降级
+        idle = False
+        if self.level > 0:
+            prev_interval, prev_fft_rate = LOAD_LEVELS[self.level - 1][:2]
+            prev_proc_load = (self.data_processor.processing_cost_ms / PROCESSING_INTERVAL_MS +
+                              self.data_processor.fft_cost_ms * prev_fft_rate / 1000.0)
+            idle = (render_ms / prev_interval < LOW_UI_LOAD and self.ui_lag_ms < LOW_UI_LAG_MS
+                    and prev_proc_load < LOW_PROC_LOAD)
+
+        self._high_ticks = self._high_ticks + 1 if overloaded else 0
+        self._low_ticks = self._low_ticks + 1 if idle else 0
+
+        if self._high_ticks >= STEP_UP_TICKS and self.level < len(LOAD_LEVELS) - 1:
+            self._set_level(self.level + 1)
+        elif self._low_ticks >= STEP_DOWN_TICKS and self.level > 0:
+            self._set_level(self.level - 1)
+
+    def _set_level(self, level):
+        old_interval, old_fft_rate, old_band_power, _ = LOAD_LEVELS[self.level]
+        interval, fft_rate, band_power, description = LOAD_LEVELS[level]
+        changed = level != self.level
+        self.level = level
+        self._high_ticks = self._low_ticks = 0
+
+        if interval != old_interval:
+            self.plot_interval_changed.emit(interval)
+        if fft_rate != old_fft_rate:
+            self.fft_rate_changed.emit(float(fft_rate))
+        if band_power != old_band_power:
+            self.band_power_enabled_changed.emit(band_power)
+        if changed:
+            print(f"LoadGovernor: level {level} ({description})")
+            self.state_changed.emit(level, description)
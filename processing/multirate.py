@@ -0,0 +1,70 @@
+# File: processing/multirate.py
+
+import collections
+import numpy as np
+import scipy.signal as signal
+
+# --- 配置参数 ---
+TAPS_PER_PHASE = 16  # 每个多相分支的抽头数，总长度 = TAPS_PER_PHASE * factor + 1
+PASSBAND_RATIO = 0.8  # 截止频率占输出奈奎斯特频率的比例
+KAISER_BETA = 8.0  # Kaiser 窗参数 (约 80 dB 阻带衰减)
+
+
+class PolyphaseDecimator:
+    """
+    有状态的抗混叠 FIR 整数倍抽取器。
+    只在保留下来的输出位置计算卷积 (多相实现)，每个输出点的计算量为 numtaps，
+    与不抽取的 FIR 相比节省 factor 倍。
+    跨数据块保存输入尾部和抽取相位，块边界处相位连续，结果与一次性处理整段数据一致。
+    """
+
+    def __init__(self, in_rate, out_rate, num_channels):
+        self.in_rate = float(in_rate)
+        self.factor = max(1, int(round(self.in_rate / float(out_rate))))
+        self.out_rate = self.in_rate / self.factor
+
+        if self.factor > 1:
+            numtaps = TAPS_PER_PHASE * self.factor + 1
+            cutoff = PASSBAND_RATIO * 0.5 * self.out_rate
+            taps = signal.firwin(numtaps, cutoff, window=('kaiser', KAISER_BETA), fs=self.in_rate)
+            # 反转后与滑动窗口直接做点积
+            self._kernel = taps[::-1].astype(np.float32)
+        else:
+            self._kernel = np.ones(1, dtype=np.float32)
+        self.reset(num_channels)
+
+    @property
+    def delay_seconds(self):
+        """线性相位 FIR 的群延迟"""
+        return (len(self._kernel) - 1) / 2.0 / self.in_rate
+
+    def reset(self, num_channels):
+        self.num_channels = int(num_channels)
+        self._history = np.zeros((self.num_channels, len(self._kernel) - 1), dtype=np.float32)
+        self._phase = 0  # 下一个输出样本在本块中的偏移
+
+    def process(self, chunk):
+        """chunk: (num_channels, n) 输入采样率的数据 -> (num_channels, m) 输出采样率的数据"""
+        if self.factor == 1:
+            return chunk
+        n = chunk.shape[1]
+        x = np.concatenate((self._history, chunk.astype(np.float32, copy=False)), axis=1)
+        self._history = x[:, n:]
+
+        if self._phase >= n:
+            self._phase -= n
+            return np.empty((self.num_channels, 0), dtype=np.float32)
+
+        # windows[:, k] 对应以第 k 个新样本结尾的 numtaps 长度窗口，只取抽取位置
+        windows = np.lib.stride_tricks.sliding_window_view(x, len(self._kernel), axis=1)
+        out = windows[:, self._phase::self.factor] @ self._kernel
+
+        n_out = out.shape[1]
+        self._phase = self._phase + n_out * self.factor - n
+        return out
+
+
+# 一个命名的多速率输出
+# channels: 请求的通道 (索引或派生通道名); rows: 对应空间滤波输出中的行号，输出按此顺序排列
+# decimator: 该输出的 PolyphaseDecimator
+MultirateTap = collections.namedtuple('MultirateTap', ['channels', 'rows', 'decimator'])
@@ -0,0 +1,139 @@
+# File: processing/plot_buffers.py
+
+import collections
+import numpy as np
+
+# 一次发布的绘图快照
+# version: 单调递增的序号，UI 据此判断是否有新数据
+# data: (n_channels, capacity) 按时间顺序排好的只读数组 (最新样本在最右侧)
+# total_samples: 自上次重置以来累计写入的样本数
+PlotSnapshot = collections.namedtuple('PlotSnapshot', ['version', 'data', 'total_samples'])
+
+
+class SnapshotRing:
+    """
+    版本化的三缓冲绘图快照。
+    - 生产者 (处理线程) 把新数据接到最旧的缓冲区 (既不是当前快照、也不是上一个快照) 上，
+      得到一份线性化的完整窗口，然后通过一次属性赋值把 (version, data, total) 整体发布出去。
+    - 消费者 (UI 线程) 直接读取 snapshot 属性，不加锁、不拷贝。
+      拿到的 data 在之后的两次发布之前保持不变：即使刚取到快照生产者就发布了新数据，
+      读者仍有一个完整的发布间隔用来读完它；只有第三次发布才会复用这块内存。
+      跨越多个 UI 帧保存数据的消费者必须自行拷贝。
+    单生产者使用；多个写入方需要在外部串行化。
+    """
+
+    def __init__(self, num_channels, capacity, dtype=np.float32):
+        self.capacity = int(capacity)
+        self.dtype = dtype
+        self._version = 0
+        self.reset(num_channels)
+
+    def reset(self, num_channels):
+        """重新分配缓冲区 (通道数变化 / 清空)，并发布一个全零快照"""
+        self.num_channels = int(num_channels)
+        self._buffers = [np.zeros((self.num_channels, self.capacity), dtype=self.dtype) for _ in range(3)]
+        self._front = 0
+        self._publish(self._buffers[0], 0)
+
+    def _publish(self, data, total_samples):
+        data.flags.writeable = False
+        self._version += 1
+        # 单次属性赋值在 CPython 中是原子的，读者总能拿到自洽的三元组
+        self.snapshot = PlotSnapshot(self._version, data, total_samples)
+
+    def write(self, chunk):
+        """追加 (n_channels, n) 的新数据并发布新快照"""
+        n = chunk.shape[1]
+        if n == 0:
+            return
+
+        front = self._buffers[self._front]
+        # 轮转写入：下一个缓冲区是两次发布之前的快照，当前和上一个快照都不会被改写
+        back_index = (self._front + 1) % len(self._buffers)
+        back = self._buffers[back_index]
+        back.flags.writeable = True
+
+        if n >= self.capacity:
+            back[:] = chunk[:, -self.capacity:]
+        else:
+            back[:, :-n] = front[:, n:]
+            back[:, -n:] = chunk
+
+        self._front = back_index
+        self._publish(back, self.snapshot.total_samples + n)
+
+
+# 绘图金字塔的一层
+# ring: 该层的 SnapshotRing
+# decimation: 相对绘图采样率 (sampling_rate / downsample_factor) 的抽取倍数
+# envelope: True 表示每个桶存 (min, max) 两个交错的点
+PlotLevel = collections.namedtuple('PlotLevel', ['ring', 'decimation', 'envelope'])
+
+
+class MinMaxDecimator:
+    """按固定因子把 (lo, hi) 流归并成桶的 min/max，不足一个桶的尾部留到下一次"""
+
+    def __init__(self, factor):
+        self.factor = int(factor)
+        self.reset()
+
+    def reset(self):
+        self._lo_tail = None
+        self._hi_tail = None
+
+    def process(self, lo, hi):
+        if self._lo_tail is not None:
+            lo = np.concatenate((self._lo_tail, lo), axis=1)
+            hi = np.concatenate((self._hi_tail, hi), axis=1)
+
+        n_full = (lo.shape[1] // self.factor) * self.factor
+        self._lo_tail = lo[:, n_full:].copy()
+        self._hi_tail = hi[:, n_full:].copy()
+        if n_full == 0:
+            return None
+
+        n_ch = lo.shape[0]
+        out_lo = lo[:, :n_full].reshape(n_ch, -1, self.factor).min(axis=2)
+        out_hi = hi[:, :n_full].reshape(n_ch, -1, self.factor).max(axis=2)
+        return out_lo, out_hi
+
+
+class PlotPyramid:
+    """
+    多分辨率绘图缓冲。
+    第 0 层是原来的降采样绘图流，其余各层在它的基础上再抽取 10×、100× ...，
+    每个桶保留 min/max，长时间窗口下尖峰不会丢失。
+    每一层都是一个 SnapshotRing，UI 按时间窗口挑选点数合适的那一层。
+    """
+
+    def __init__(self, num_channels, downsample_factor, level_factors, capacity):
+        self.downsample_factor = int(downsample_factor)
+        self.levels = [PlotLevel(SnapshotRing(num_channels, capacity), int(f), i > 0)
+                       for i, f in enumerate(level_factors)]
+        # 第 1 层直接从原始采样率的数据取 min/max，之后每层从上一层归并
+        self._decimators = []
+        for i in range(1, len(self.levels)):
+            if i == 1:
+                factor = self.levels[1].decimation * self.downsample_factor
+            else:
+                factor = self.levels[i].decimation // self.levels[i - 1].decimation
+            self._decimators.append(MinMaxDecimator(factor))
+
+    def reset(self, num_channels):
+        for level in self.levels:
+            level.ring.reset(num_channels)
+        for decimator in self._decimators:
+            decimator.reset()
+
+    def write(self, chunk):
+        """chunk: (n_channels, n) 原始采样率的数据"""
+        self.levels[0].ring.write(chunk[:, ::self.downsample_factor])
+
+        lo, hi = chunk, chunk
+        for level, decimator in zip(self.levels[1:], self._decimators):
+            result = decimator.process(lo, hi)
+            if result is None:
+                break
+            lo, hi = result
+            # 交错存放: min0, max0, min1, max1, ...
+            level.ring.write(np.stack((lo, hi), axis=2).reshape(lo.shape[0], -1))
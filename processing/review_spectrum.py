@@ -0,0 +1,95 @@
+# File: processing/review_spectrum.py
+
+import collections
+import numpy as np
+import scipy.signal as signal
+from PyQt6.QtCore import QObject, pyqtSignal, pyqtSlot
+
+# --- 常量定义 ---
+SEGMENT_SECONDS = 2.0  # Welch 默认分段长度 (秒)
+MAX_SPECTRUM_BINS = 2049  # 送往频域面板的最大频点数 (nperseg <= 4096)
+MIN_SEGMENT_SAMPLES = 16  # 选区过短时的最小分段长度
+CACHE_SIZE = 64  # LRU 缓存条目数
+
+
+class ReviewSpectrumWorker(QObject):
+    """
+    回放模式的频谱服务 (运行在独立 QThread 中)。
+    对选定时间范围计算 Welch 平均谱，结果按 (file, range, nperseg) 缓存。
+    输出的频点数有上限，频域面板不再需要绘制整段录音的百万级 rfft 频点。
+    """
+    spectrum_ready = pyqtSignal(dict)
+
+    def __init__(self):
+        super().__init__()
+        self._file_key = None
+        self._data = None
+        self._sampling_rate = 1000.0
+        self._cache = collections.OrderedDict()
+
+        # 由 UI 线程直接写入 (int 赋值是原子的)，用于丢弃过期请求
+        self.latest_request_id = 0
+
+    @pyqtSlot(str, object, float)
+    def set_source(self, file_key, data, sampling_rate):
+        """绑定当前回放的数据 (只保存引用，不拷贝)"""
+        self._file_key = file_key
+        self._data = data
+        self._sampling_rate = float(sampling_rate)
+
+    @pyqtSlot(int, float, float, int)
+    def compute(self, request_id, t_start, t_end, nperseg):
+        """
+        计算 [t_start, t_end] 秒范围内的 Welch 幅度谱。
+        nperseg <= 0 时使用默认的 SEGMENT_SECONDS 分段。
+        """
+        # 拖动/缩放时会排队很多请求，只处理最新的那一个
+        if request_id != self.latest_request_id or self._data is None:
+            return
+
+        fs = self._sampling_rate
+        n_total = self._data.shape[1]
+
+        if nperseg <= 0:
+            nperseg = int(fs * SEGMENT_SECONDS)
+        nperseg = int(min(nperseg, 2 * (MAX_SPECTRUM_BINS - 1)))
+
+        start = max(0, int(t_start * fs))
+        end = min(n_total, int(np.ceil(t_end * fs)))
+        nperseg = max(MIN_SEGMENT_SAMPLES, min(nperseg, end - start))
+        if end - start < nperseg:
+            return
+
+        # 范围对齐到半个分段 (Welch 步长)，平移少量像素时可以直接命中缓存
+        hop = max(1, nperseg // 2)
+        length = max(nperseg, ((end - start) // hop) * hop)
+        start = (start // hop) * hop
+        end = min(n_total, start + length)
+        start = end - length
+
+        key = (self._file_key, start, end, nperseg)
+        result = self._cache.get(key)
+        if result is not None:
+            self._cache.move_to_end(key)
+        else:
+            freqs, power = signal.welch(self._data[:, start:end], fs=fs, window='hann',
+                                        nperseg=nperseg, noverlap=hop, detrend='constant',
+                                        scaling='spectrum', axis=1)
+            # 功率谱开方 -> 各频点 RMS 幅度 (µV)，与实时 FFT 面板的幅度单位保持一致
+            mags = np.sqrt(power, dtype=np.float32)
+            result = {
+                'freqs': freqs.astype(np.float32),
+                'mags': mags,
+                't_start': start / fs,
+                't_end': end / fs,
+                'nperseg': nperseg,
+            }
+            self._cache[key] = result
+            if len(self._cache) > CACHE_SIZE:
+                self._cache.popitem(last=False)
+
+        self.spectrum_ready.emit(dict(result, request_id=request_id))
+
+    @pyqtSlot()
+    def clear_cache(self):
+        self._cache.clear()
@@ -0,0 +1,55 @@
+# File: processing/ring_buffer.py
+
+import numpy as np
+
+
+class SampleRing:
+    """
+    预分配的多通道环形缓冲区 (单线程使用)。
+    每个样本同时写入 pos 和 pos + capacity 两处 (镜像存储，内存为 2 倍容量)，
+    因此任意不超过容量的最近 k 个样本在内存中总是连续的：latest(k) 直接返回视图，O(1)，不拷贝。
+    返回的视图在下一次 append() 之后可能被覆盖，需要长期保存的调用方必须自行拷贝。
+    """
+
+    def __init__(self, num_channels, capacity, dtype=np.float32):
+        self.capacity = int(capacity)
+        self.dtype = dtype
+        self.reset(num_channels)
+
+    def reset(self, num_channels):
+        self.num_channels = int(num_channels)
+        self._data = np.zeros((self.num_channels, 2 * self.capacity), dtype=self.dtype)
+        self.clear()
+
+    def clear(self):
+        self._pos = 0  # 下一个样本的写入位置 [0, capacity)
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, chunk):
+        """追加 (num_channels, n) 的新数据；超出容量时只保留最新的 capacity 个样本"""
+        n = chunk.shape[1]
+        if n == 0:
+            return
+        if n > self.capacity:
+            chunk = chunk[:, -self.capacity:]
+            n = self.capacity
+
+        # 分两段写入 (可能跨越末尾)，每段同时写主副本和镜像
+        first = min(n, self.capacity - self._pos)
+        for start, src in ((self._pos, chunk[:, :first]), (0, chunk[:, first:])):
+            m = src.shape[1]
+            if m:
+                self._data[:, start:start + m] = src
+                self._data[:, start + self.capacity:start + self.capacity + m] = src
+
+        self._pos = (self._pos + n) % self.capacity
+        self._count = min(self.capacity, self._count + n)
+
+    def latest(self, k):
+        """最近 k 个样本的 (num_channels, k) 连续视图 (按时间顺序)；k 超过已有样本数时返回全部"""
+        k = min(int(k), self._count)
+        end = self._pos + self.capacity
+        return self._data[:, end - k:end]
@@ -1,5 +1,6 @@
 # In processing/rsca_model.py
 
+import copy
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
@@ -119,4 +120,115 @@ class RSCA_Net(nn.Module):
         x = self.avgpool(x)
         x = torch.flatten(x, 1)
         x = self.fc(x)
-        return x
\ No newline at end of file
+        return x
+
+    def for_inference(self):
+        """
+        返回数值等价的推理专用模型 (eval 模式下的运行统计量)：
+        BatchNorm 折叠进前面的卷积，SCConv 中对长度 1 的插值换成广播，HRSC_Block 不再 torch.cat。
+        """
+        return RSCA_NetInference(self)
+
+
+# -------------------------------------------------------------------
+# 推理专用版本 (由训练好的模型转换，只用于 eval)
+# -------------------------------------------------------------------
+def _bn_scale_shift(bn):
+    """eval 模式的 BatchNorm 等价于逐通道的 y = scale * x + shift"""
+    scale = bn.weight / torch.sqrt(bn.running_var + bn.eps)
+    return scale, bn.bias - bn.running_mean * scale
+
+
+def _fold_conv_bn(conv, bn):
+    """Conv1d + BatchNorm1d -> 带偏置的 Conv1d"""
+    scale, shift = _bn_scale_shift(bn)
+    fused = nn.Conv1d(conv.in_channels, conv.out_channels, conv.kernel_size, conv.stride, conv.padding,
+                      conv.dilation, conv.groups, bias=True)
+    fused.weight.copy_(conv.weight * scale[:, None, None])
+    bias = conv.bias if conv.bias is not None else torch.zeros_like(shift)
+    fused.bias.copy_(bias * scale + shift)
+    return fused
+
+
+class _SCConvInference(nn.Module):
+    """
+    SCConv 的推理版本：AdaptiveAvgPool1d(1) 后线性插值回原长度只是把均值广播到每个点，直接用广播相加。
+    (两个半边的卷积合并成 groups=2 的卷积在 CPU 上反而慢 2 倍以上，保持两次卷积)
+    """
+
+    def __init__(self, scconv):
+        super().__init__()
+        self.half = scconv.half_in_channels
+        self.conv_k3, self.conv_k1 = scconv.conv_k3, scconv.conv_k1
+
+    def forward(self, x):
+        x1, x2 = x[:, :self.half], x[:, self.half:]
+        attn = torch.sigmoid(x1 + x1.mean(dim=2, keepdim=True))
+        return torch.cat((self.conv_k3(x1 * attn), self.conv_k1(x2)), dim=1)
+
+
+class _HRSCBlockInference(nn.Module):
+    """
+    HRSC_Block 的推理版本：BN 的缩放/平移折叠进 shortcut 卷积，
+    各尺度的输出直接乘 BN 缩放后累加到 shortcut 输出的对应通道段上 (代替 cat + add + BN)。
+    各尺度卷积之间传递的是未缩放的输出 (SCConv 的注意力是非线性的，缩放不能折叠进下一级)。
+    """
+
+    def __init__(self, block):
+        super().__init__()
+        self.width = block.width
+        scale, shift = _bn_scale_shift(block.bn)
+        self.convs = nn.ModuleList([_SCConvInference(c) if isinstance(c, SCConv) else c for c in block.convs])
+        self.register_buffer('scale', scale[:, None].clone())
+        self.shortcut = None
+        if isinstance(block.shortcut, nn.Conv1d):
+            self.shortcut = _fold_conv_bn(block.shortcut, block.bn)
+        else:
+            self.register_buffer('shift', shift[:, None].clone())
+
+    def forward(self, x):
+        out = self.shortcut(x) if self.shortcut is not None else torch.addcmul(self.shift, x, self.scale)
+        sp = x
+        for i, conv in enumerate(self.convs):
+            sp = conv(sp)
+            lo, hi = i * self.width, (i + 1) * self.width
+            out[:, lo:hi].addcmul_(sp, self.scale[lo:hi])
+        return torch.relu(out)
+
+
+class _MSCAInference(nn.Module):
+    """MSCA 的推理版本：两个分支中的 BN 折叠进第一个 1x1 卷积"""
+
+    def __init__(self, msca):
+        super().__init__()
+        g, l = msca.global_branch, msca.local_branch
+        self.global_reduce, self.global_expand = _fold_conv_bn(g[1], g[2]), g[4]
+        self.local_reduce, self.local_expand = _fold_conv_bn(l[0], l[1]), l[3]
+
+    def forward(self, x):
+        g_w = self.global_expand(torch.relu(self.global_reduce(x.mean(dim=2, keepdim=True))))
+        l_w = self.local_expand(torch.relu(self.local_reduce(x)))
+        return x * torch.sigmoid(l_w + g_w)
+
+
+class RSCA_NetInference(nn.Module):
+    """RSCA_Net.for_inference() 的结果，权重从训练模型拷贝 (之后两者互不影响)"""
+
+    def __init__(self, net):
+        super().__init__()
+        net = copy.deepcopy(net)
+        with torch.no_grad():
+            conv, bn, _, pool = net.stem
+            self.stem = nn.Sequential(_fold_conv_bn(conv, bn), nn.ReLU(inplace=True), pool)
+            self.blocks = nn.Sequential(_HRSCBlockInference(net.hrsc_block1), _HRSCBlockInference(net.hrsc_block2),
+                                        _HRSCBlockInference(net.hrsc_block3))
+            self.msca = _MSCAInference(net.msca)
+            self.fc = net.fc
+        self.to(next(net.parameters()).device)
+        self.eval()
+        for p in self.parameters():
+            p.requires_grad_(False)
+
+    def forward(self, x):
+        x = self.msca(self.blocks(self.stem(x)))
+        return self.fc(x.mean(dim=2))
@@ -0,0 +1,163 @@
+# File: processing/spatial_filter.py
+
+import collections
+import numpy as np
+
+# --- 重参考方式 ---
+REFERENCE_NONE = 'none'
+REFERENCE_CAR = 'car'  # 共平均参考
+REFERENCE_LINKED_MASTOIDS = 'linked_mastoids'  # 双侧乳突平均参考
+REFERENCE_CUSTOM = 'custom'  # 自定义导联矩阵
+
+# 识别乳突 / 耳垂参考电极的通道名
+MASTOID_NAMES = ('M1', 'M2', 'A1', 'A2', 'TP9', 'TP10')
+
+# 派生通道 (双极导联): name = 通道 plus - 通道 minus
+DerivedChannel = collections.namedtuple('DerivedChannel', ['name', 'plus', 'minus'])
+
+
+class SpatialFilter:
+    """
+    融合的空间滤波级：ICA 清理 -> 重参考 -> 派生双极通道。
+    三步都是线性的，预先合成一个 (n_channels + n_derived, n_channels) 的矩阵，
+    每个数据块只做一次矩阵乘法；前 n_channels 行是处理后的原通道，其后是派生通道。
+    ICA 放在重参考之前，与校准数据 (未重参考的滤波数据) 保持一致。
+    配置变化时重新合成矩阵并整体替换，处理线程读取时无需加锁。
+    """
+
+    def __init__(self, num_channels):
+        self.reference = REFERENCE_NONE
+        self.reference_channels = None  # 乳突参考的通道索引
+        self.custom_montage = None
+        self.ica_matrix = None  # 作用于 ica_indices 通道的清理矩阵
+        self.ica_indices = None
+        self.ica_enabled = False
+        self.derived = []
+        self.reset(num_channels)
+
+    def reset(self, num_channels):
+        """通道数变化后，与通道数相关的配置全部失效"""
+        self.num_channels = int(num_channels)
+        self.reference = REFERENCE_NONE
+        self.reference_channels = None
+        self.custom_montage = None
+        self.ica_matrix = None
+        self.ica_indices = None
+        self.derived = [d for d in self.derived if max(d.plus, d.minus) < self.num_channels]
+        self._rebuild()
+
+    # --- 配置 ---
+    def set_reference(self, mode, channels=None, montage=None):
+        """
+        mode: REFERENCE_* 之一
+        channels: REFERENCE_LINKED_MASTOIDS 时的两个参考通道
+        montage: REFERENCE_CUSTOM 时的 (n_channels, n_channels) 导联矩阵
+        """
+        if mode == REFERENCE_LINKED_MASTOIDS:
+            if channels is None or len(channels) != 2:
+                raise ValueError("Linked mastoids reference needs exactly two channels.")
+            self.reference_channels = [int(c) for c in channels]
+        elif mode == REFERENCE_CUSTOM:
+            montage = np.asarray(montage, dtype=np.float64)
+            if montage.shape != (self.num_channels, self.num_channels):
+                raise ValueError(f"Custom montage must be {self.num_channels}x{self.num_channels}.")
+            self.custom_montage = montage
+        elif mode not in (REFERENCE_NONE, REFERENCE_CAR):
+            raise ValueError(f"Unknown reference mode: {mode}")
+        self.reference = mode
+        self._rebuild()
+
+    def set_ica(self, matrix, indices):
+        """matrix: (k, k) 清理矩阵，作用于 indices 指定的 k 个通道；None 表示清除"""
+        if matrix is None:
+            self.ica_matrix, self.ica_indices = None, None
+        else:
+            indices = np.asarray(indices, dtype=np.int64)
+            if matrix.shape != (len(indices), len(indices)):
+                raise ValueError(f"ICA matrix shape {matrix.shape} does not match {len(indices)} channels.")
+            self.ica_matrix, self.ica_indices = np.asarray(matrix, dtype=np.float64), indices
+        self._rebuild()
+
+    def set_ica_enabled(self, enabled):
+        self.ica_enabled = bool(enabled)
+        self._rebuild()
+
+    def set_derived(self, name, plus, minus):
+        """添加或替换一个派生通道"""
+        if not (0 <= plus < self.num_channels and 0 <= minus < self.num_channels):
+            raise ValueError(f"Derived channel '{name}' refers to missing channels ({plus}, {minus}).")
+        derived = [d for d in self.derived if d.name != name]
+        derived.append(DerivedChannel(name, int(plus), int(minus)))
+        self.derived = derived
+        self._rebuild()
+
+    def remove_derived(self, name):
+        self.derived = [d for d in self.derived if d.name != name]
+        self._rebuild()
+
+    # --- 查询 ---
+    @property
+    def mixes_channels(self):
+        """True 表示输出的原通道依赖其它通道 (需要全部通道都经过时域滤波)"""
+        return self.reference != REFERENCE_NONE or self._ica_active
+
+    @property
+    def _ica_active(self):
+        return self.ica_enabled and self.ica_matrix is not None
+
+    def derived_index(self, name):
+        """派生通道在输出中的行号；不存在时返回 None"""
+        for i, d in enumerate(self.derived):
+            if d.name == name:
+                return self.num_channels + i
+        return None
+
+    def source_channels(self, row):
+        """输出第 row 行依赖的原始通道 (用于通道订阅)"""
+        if row < self.num_channels:
+            return [row]
+        d = self.derived[row - self.num_channels]
+        return [d.plus, d.minus]
+
+    # --- 矩阵合成 ---
+    def reference_matrix(self):
+        n = self.num_channels
+        if self.reference == REFERENCE_CAR:
+            return np.eye(n) - np.full((n, n), 1.0 / n)
+        if self.reference == REFERENCE_LINKED_MASTOIDS:
+            m = np.eye(n)
+            m[:, self.reference_channels] -= 0.5
+            return m
+        if self.reference == REFERENCE_CUSTOM:
+            return self.custom_montage
+        return np.eye(n)
+
+    def _rebuild(self):
+        n = self.num_channels
+        if not self.mixes_channels and not self.derived:
+            # 恒等变换，apply() 直接返回输入
+            self.matrix = None
+            return
+
+        cleaning = np.eye(n)
+        if self._ica_active:
+            cleaning[np.ix_(self.ica_indices, self.ica_indices)] = self.ica_matrix
+        spatial = self.reference_matrix() @ cleaning
+
+        derivation = np.zeros((len(self.derived), n))
+        for i, d in enumerate(self.derived):
+            derivation[i, d.plus] += 1.0
+            derivation[i, d.minus] -= 1.0
+
+        # 单次属性赋值，处理线程总能拿到完整的矩阵
+        self.matrix = np.ascontiguousarray(np.vstack((spatial, derivation @ spatial)), dtype=np.float32)
+
+    def apply(self, chunk):
+        """chunk: (n_channels, n) -> (n_channels + n_derived, n)"""
+        matrix = self.matrix
+        if matrix is None or matrix.shape[1] != chunk.shape[0]:
+            return chunk
+        # 一次 GEMM 直接写入新的输出数组 (录制缓冲和排队的信号会持有它，不能复用)
+        out = np.empty((matrix.shape[0], chunk.shape[1]), dtype=np.float32)
+        np.matmul(matrix, chunk, out=out)
+        return out
@@ -13,7 +13,9 @@ import sys
 # 导入所有模块
 from networking.data_receiver import DataReceiver
 from networking.device_discovery import DeviceDiscoveryWorker
-from processing.data_processor import DataProcessor
+from processing.data_processor import (DataProcessor, FFT_UPDATE_RATE, CONSUMER_PLOTS, CONSUMER_FFT,
+                                       CONSUMER_BAND_POWER, CALIBRATION_ASR)
+from processing.load_governor import LoadGovernor
 from ui.widgets.time_domain_widget import TimeDomainWidget
 from ui.widgets.frequency_domain_widget import FrequencyDomainWidget
 from .widgets.review_dialog import ReviewDialog
@@ -24,9 +26,11 @@ from .widgets.connection_panel import ConnectionPanel
 from networking.serial_receiver import SerialDataReceiver
 from ui.widgets.guidance_overlay import GuidanceOverlay
 from .widgets.tools_panel import ToolsPanel
-from processing.eog_model_controller import ModelController
+from processing.eog_model_controller import ModelController, TARGET_SAMPLE_RATE, EOG_TAP_NAME
+from processing.event_detector import EVENT_ONSET
 from ui.widgets.eye_typing_widget import EyeTypingWidget
 from processing.ica_processor import ICAProcessor
+from processing.online_ica import OnlineICAWorker
 from .widgets.ica_component_dialog import ICAComponentDialog
 from .widgets.header_bar import HeaderStatusWidget
 from ui.widgets.recording_panel import RecordingPanel
@@ -98,19 +102,13 @@ class FileLoader(QObject):
                     'labels': [str(item) for item in flat_labels]
                 }
 
-            n_samples = data.shape[1]
-            # 计算 FFT 用于预览
-            windowed_data = data * np.hanning(n_samples)
-            magnitudes = np.abs(np.fft.rfft(windowed_data, axis=1)) / n_samples
-            frequencies = np.fft.rfftfreq(n_samples, 1.0 / sampling_rate)
-
+            # 频谱不在这里计算：由 ReviewDialog 的后台 Welch 服务按可见范围计算
             result = {
                 'data': data,
                 'sampling_rate': sampling_rate,
-                'freqs': frequencies,
-                'mags': magnitudes,
                 'markers': clean_markers,
                 'filename': filename.split('/')[-1],
+                'filepath': filename,
                 'channels': channel_names
             }
             self.load_finished.emit(result)
@@ -123,6 +121,14 @@ class MainWindow(QMainWindow):
     sample_rate_changed = pyqtSignal(int)
     frames_per_packet_changed = pyqtSignal(int)
     num_channels_changed = pyqtSignal(int)
+    # 消费者订阅 -> DataProcessor (名称, 通道列表或 None, 速率)
+    subscription_requested = pyqtSignal(str, object, float)
+    unsubscription_requested = pyqtSignal(str)
+    # 多速率输出 -> DataProcessor (名称, 通道列表, 输出速率)
+    tap_open_requested = pyqtSignal(str, list, float)
+    tap_close_requested = pyqtSignal(str)
+    # 派生双极通道 -> DataProcessor (名称, plus, minus)
+    derived_channel_requested = pyqtSignal(str, int, int)
 
     def __init__(self):
         super().__init__()
@@ -167,11 +173,16 @@ class MainWindow(QMainWindow):
         self.is_shutting_down = False
         self.current_connection_message = "Disconnected"
 
-        # 4. 连接信号
+        # 4. 自适应降级调度 (依赖时域控件和 DataProcessor)
+        self.load_governor = LoadGovernor(self.time_domain_widget, self.data_processor, self)
+
+        # 5. 连接信号，并声明初始的绘图订阅 (频谱 / 频带功率在控件显示时订阅)
         self.setup_connections()
+        self._on_visible_channels_changed(self.time_domain_widget.visible_channels())
 
-        # 5. 启动持久线程
+        # 6. 启动持久线程
         self.ica_thread.start()
+        self.online_ica_thread.start()
         self.eog_model_controller_thread.start()
 
         self.update_ui_on_connection(False)
@@ -309,6 +320,11 @@ class MainWindow(QMainWindow):
         self.ica_processor = ICAProcessor()
         self.ica_processor.moveToThread(self.ica_thread)
 
+        # Online ICA Thread
+        self.online_ica_thread = QThread()
+        self.online_ica_worker = OnlineICAWorker()
+        self.online_ica_worker.moveToThread(self.online_ica_thread)
+
         # Model Controller Thread
         self.eog_model_controller_thread = QThread()
         self.eog_model_controller = ModelController()
@@ -325,6 +341,9 @@ class MainWindow(QMainWindow):
         self.display_filter_panel.filter_settings_changed.connect(self.data_processor.update_filter_settings)
         self.display_filter_panel.notch_filter_changed.connect(self.data_processor.update_notch_filter)
         self.display_filter_panel.vert_scale_changed.connect(self.time_domain_widget.set_vertical_scale)
+        self.display_filter_panel.vert_scale_changed.connect(self.data_processor.set_vertical_scale)
+        self.display_filter_panel.render_mode_changed.connect(self.time_domain_widget.set_render_mode)
+        self.display_filter_panel.sweep_mode_changed.connect(self.time_domain_widget.set_sweep_mode)
 
         self.channel_settings_panel.channel_visibility_changed.connect(self.time_domain_widget.toggle_visibility)
         self.channel_settings_panel.channel_name_changed.connect(self.time_domain_widget.update_channel_name)
@@ -337,27 +356,60 @@ class MainWindow(QMainWindow):
         self.data_processor.stats_ready.connect(self.header_bar.update_stats)
         self.data_processor.marker_added_live.connect(self.time_domain_widget.show_live_marker)
         self.data_processor.band_power_ready.connect(self.band_power_widget.update_plot)
-        self.data_processor.filtered_data_ready.connect(self.eog_model_controller.process_data_chunk)
+        self.data_processor.autoscale_ranges_ready.connect(self.time_domain_widget.apply_autoscale_ranges)
+        self.data_processor.tap_data_ready.connect(self.eog_model_controller.process_tap_data)
+        # 眼动事件检测 -> 时域图上闪烁提示 (只在眼动打字模式下有事件)
+        self.eog_model_controller.event_detected.connect(self._on_eog_event_detected)
         self.data_processor.calibration_data_ready.connect(self._on_calibration_data_ready)
+        self.data_processor.calibration_failed.connect(self._on_calibration_failed)
 
         # Settings Signals -> Processor & Widgets
         self.sample_rate_changed.connect(self.data_processor.set_sample_rate)
         self.sample_rate_changed.connect(self.time_domain_widget.set_sample_rate)
-        self.sample_rate_changed.connect(self.eog_model_controller.set_input_sample_rate)
 
         self.num_channels_changed.connect(self.channel_settings_panel.reconfigure_channels)
         self.num_channels_changed.connect(self.time_domain_widget.reconfigure_channels)
         self.num_channels_changed.connect(self.freq_domain_widget.reconfigure_channels)
         self.num_channels_changed.connect(self.data_processor.set_num_channels)
 
+        # Consumers -> Processor: 只计算当前有人看 / 有人用的数据
+        self.subscription_requested.connect(self.data_processor.subscribe)
+        self.unsubscription_requested.connect(self.data_processor.unsubscribe)
+        self.tap_open_requested.connect(self.data_processor.open_tap)
+        self.tap_close_requested.connect(self.data_processor.close_tap)
+        self.derived_channel_requested.connect(self.data_processor.set_derived_channel)
+        self.display_filter_panel.reference_changed.connect(self.data_processor.set_reference)
+        self.time_domain_widget.visible_channels_changed.connect(self._on_visible_channels_changed)
+        self.freq_domain_widget.visibility_changed.connect(
+            lambda visible: self._set_subscribed(CONSUMER_FFT, visible, FFT_UPDATE_RATE))
+        self.band_power_widget.visibility_changed.connect(
+            lambda visible: self._set_subscribed(CONSUMER_BAND_POWER, visible, FFT_UPDATE_RATE))
+
         # Tools -> Controllers
         self.tools_panel.eog_acquisition_triggered.connect(self.acquisition_controller.start)
         self.tools_panel.ica_toggle_changed.connect(self.data_processor.toggle_ica)
         self.tools_panel.ica_calibration_triggered.connect(self.data_processor.start_ica_calibration)
+        self.tools_panel.asr_calibration_triggered.connect(self.data_processor.start_asr_calibration)
+        self.tools_panel.asr_toggle_changed.connect(self.data_processor.toggle_asr)
 
         # ICA & Model
         self.ica_processor.training_finished.connect(self._on_ica_training_finished)
         self.ica_processor.training_failed.connect(self._on_ica_training_failed)
+        self.ica_processor.training_cancelled.connect(self._on_ica_training_cancelled)
+        self.ica_processor.training_progress.connect(self.tools_panel.set_training_progress)
+        self.tools_panel.ica_method_changed.connect(self.ica_processor.set_method)
+        # 训练期间 ICA 线程的事件循环被占用，取消请求直接设置标志
+        self.tools_panel.ica_training_cancel_requested.connect(self.ica_processor.cancel,
+                                                               Qt.ConnectionType.DirectConnection)
+        self.ica_processor.asr_calibrated.connect(self.data_processor.set_asr_model)
+        self.ica_processor.asr_calibrated.connect(self.tools_panel.set_asr_calibration_finished)
+        self.ica_processor.asr_calibration_failed.connect(self._on_asr_calibration_failed)
+
+        # Online ICA: DataProcessor -> Worker -> DataProcessor (矩阵整体替换)
+        self.tools_panel.online_ica_toggled.connect(self._on_online_ica_toggled)
+        self.data_processor.ica_input_ready.connect(self.online_ica_worker.process_chunk)
+        self.online_ica_worker.cleaning_matrix_ready.connect(self.data_processor.set_online_ica_matrix)
+        self.online_ica_worker.status_changed.connect(self.tools_panel.update_online_ica_status)
 
         # Acquisition Controller
         self.acquisition_controller.started.connect(self._on_acquisition_started)
@@ -366,6 +418,23 @@ class MainWindow(QMainWindow):
         self.acquisition_controller.stop_recording_signal.connect(self.data_processor.stop_recording)
         self.acquisition_controller.add_marker_signal.connect(self.data_processor.add_marker)
 
+        # Load Governor: 过载时依次降低绘图帧率 / FFT 刷新率 / 暂停频带功率
+        self.load_governor.plot_interval_changed.connect(self.time_domain_widget.set_frame_interval)
+        self.load_governor.fft_rate_changed.connect(self.data_processor.set_fft_rate)
+        self.load_governor.band_power_enabled_changed.connect(self.data_processor.set_band_power_enabled)
+        self.load_governor.state_changed.connect(self.header_bar.update_load_state)
+
+    @pyqtSlot(list)
+    def _on_visible_channels_changed(self, channels):
+        plot_rate = self.data_processor.sampling_rate / self.data_processor.downsample_factor
+        self.subscription_requested.emit(CONSUMER_PLOTS, channels, plot_rate)
+
+    def _set_subscribed(self, name, subscribed, rate, channels=None):
+        if subscribed:
+            self.subscription_requested.emit(name, channels, float(rate))
+        else:
+            self.unsubscription_requested.emit(name)
+
     @pyqtSlot(int)
     def _on_num_channels_changed(self, num_channels):
         print(f"MainWindow: Detected channel count change to {num_channels}. Broadcasting...")
@@ -550,10 +619,12 @@ class MainWindow(QMainWindow):
             self.processor_thread.start()
 
         self.time_domain_widget.start_updates()
+        self.load_governor.start()
 
     def stop_session(self, blocking=False):
         """停止所有会话活动"""
         self.time_domain_widget.stop_updates()
+        self.load_governor.stop()
         if self.is_session_running:
             print("Stopping session...")
 
@@ -701,10 +772,17 @@ class MainWindow(QMainWindow):
         if self.data_processor:
             self.data_processor.stop()
 
+        if self.review_dialog:
+            self.review_dialog.shutdown()
+
+        # 中止正在进行的 ICA 训练，ICA 线程才能及时退出
+        self.ica_processor.cancel()
+
         # 4. 退出所有持久线程
         threads_to_wait = [
             self.processor_thread,
             self.ica_thread,
+            self.online_ica_thread,
             self.eog_model_controller_thread
         ]
 
@@ -713,6 +791,7 @@ class MainWindow(QMainWindow):
                 t.quit()
                 t.wait(1000)  # 等待最多 1 秒
 
+        self.ica_processor.shutdown()
         print("All threads stopped. Closing.")
         event.accept()
 
@@ -739,11 +818,23 @@ class MainWindow(QMainWindow):
         self.eog_model_controller.set_channel_names(current_names)
 
         self.eog_model_controller.prediction_ready.connect(self.eye_typing_dialog.on_prediction_received)
-        self.eog_model_controller.set_active(True)
+        self.eye_typing_dialog.set_early_decision_checked(self.eog_model_controller.early_decision)
+        self.eye_typing_dialog.early_decision_toggled.connect(self._on_early_decision_toggled)
+        # 模型在控制器线程中加载 (首次需要导出/编译)，不阻塞 UI
+        QMetaObject.invokeMethod(self.eog_model_controller, "set_active",
+                                 Qt.ConnectionType.QueuedConnection, Q_ARG(bool, True))
+        # 模型只需要 H/V 两个双极 EOG 通道，由 DataProcessor 派生并抗混叠降采样到 250Hz
+        derived = self.eog_model_controller.derived_channels()
+        if derived is not None:
+            for name, plus, minus in derived:
+                self.derived_channel_requested.emit(name, plus, minus)
+            self.tap_open_requested.emit(EOG_TAP_NAME, [name for name, _, _ in derived], float(TARGET_SAMPLE_RATE))
 
         self.eye_typing_dialog.exec()
 
-        self.eog_model_controller.set_active(False)
+        self.tap_close_requested.emit(EOG_TAP_NAME)
+        QMetaObject.invokeMethod(self.eog_model_controller, "set_active",
+                                 Qt.ConnectionType.QueuedConnection, Q_ARG(bool, False))
         try:
             self.eog_model_controller.prediction_ready.disconnect(self.eye_typing_dialog.on_prediction_received)
         except TypeError:
@@ -752,23 +843,39 @@ class MainWindow(QMainWindow):
         self.eye_typing_dialog.deleteLater()
         self.eye_typing_dialog = None
 
-    @pyqtSlot(np.ndarray)
-    def _on_calibration_data_ready(self, data):
-        self.tools_panel.set_training_state()
+    @pyqtSlot(str, np.ndarray)
+    def _on_calibration_data_ready(self, target, data):
         current_sample_rate = self.data_processor.sampling_rate
+        if target == CALIBRATION_ASR:
+            QMetaObject.invokeMethod(self.ica_processor, "calibrate_asr",
+                                     Qt.ConnectionType.QueuedConnection,
+                                     Q_ARG(np.ndarray, data),
+                                     Q_ARG(int, current_sample_rate))
+            return
+        self.tools_panel.set_training_state()
         QMetaObject.invokeMethod(self.ica_processor, "train",
                                  Qt.ConnectionType.QueuedConnection,
                                  Q_ARG(np.ndarray, data),
                                  Q_ARG(int, current_sample_rate))
 
-    @pyqtSlot(object, np.ndarray, list)
-    def _on_ica_training_finished(self, ica_model, components, suggested_indices):
+    @pyqtSlot(bool)
+    def _on_online_ica_toggled(self, enabled):
+        if enabled:
+            QMetaObject.invokeMethod(self.online_ica_worker, "start",
+                                     Qt.ConnectionType.QueuedConnection,
+                                     Q_ARG(int, self.data_processor.num_channels),
+                                     Q_ARG(int, self.data_processor.sampling_rate))
+        else:
+            QMetaObject.invokeMethod(self.online_ica_worker, "stop", Qt.ConnectionType.QueuedConnection)
+        QMetaObject.invokeMethod(self.data_processor, "set_online_ica_active",
+                                 Qt.ConnectionType.QueuedConnection, Q_ARG(bool, enabled))
+
+    @pyqtSlot(object, object, list)
+    def _on_ica_training_finished(self, ica_model, summary, suggested_indices):
         print("MainWindow: ICA training finished. Launching selector.")
-        current_sample_rate = self.data_processor.sampling_rate
 
         dialog = ICAComponentDialog(
-            components_data=components,
-            sampling_rate=current_sample_rate,
+            summary=summary,
             parent=self,
             suggested_indices=suggested_indices
         )
@@ -782,11 +889,37 @@ class MainWindow(QMainWindow):
 
         dialog.deleteLater()
 
+    @pyqtSlot(bool)
+    def _on_early_decision_toggled(self, enabled):
+        QMetaObject.invokeMethod(self.eog_model_controller, "set_early_decision",
+                                 Qt.ConnectionType.QueuedConnection, Q_ARG(bool, enabled))
+
+    @pyqtSlot(str, int)
+    def _on_eog_event_detected(self, kind, sample_index):
+        if kind == EVENT_ONSET:
+            self.time_domain_widget.show_live_marker()
+
     @pyqtSlot(str)
     def _on_ica_training_failed(self, error_message):
         QMessageBox.critical(self, "ICA Training Error", error_message)
         self.tools_panel.update_status(self.is_session_running)
 
+    @pyqtSlot(str)
+    def _on_asr_calibration_failed(self, error_message):
+        QMessageBox.critical(self, "ASR Calibration Error", error_message)
+        self.tools_panel.update_status(self.is_session_running)
+
+    @pyqtSlot(str, str)
+    def _on_calibration_failed(self, target, error_message):
+        if target == CALIBRATION_ASR:
+            self._on_asr_calibration_failed(error_message)
+        else:
+            self._on_ica_training_failed(error_message)
+
+    @pyqtSlot()
+    def _on_ica_training_cancelled(self):
+        self.tools_panel.update_status(self.is_session_running)
+
     @pyqtSlot(str)
     def on_wifi_connected_send_commands(self, message):
         print("Wi-Fi connected. Sending configuration commands...")
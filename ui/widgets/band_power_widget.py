@@ -2,7 +2,7 @@
 
 import pyqtgraph as pg
 import numpy as np
-from PyQt6.QtCore import pyqtSlot
+from PyQt6.QtCore import pyqtSlot, pyqtSignal
 
 BAND_COLORS = {
     'Delta': "#007BFF", 'Theta': "#28A745", 'Alpha': "#FD7E14", 'Beta': "#DC3545", 'Gamma': "#6F42C1"
@@ -11,6 +11,9 @@ BAND_NAMES = list(BAND_COLORS.keys())
 
 
 class BandPowerWidget(pg.GraphicsLayoutWidget):
+    # 显示/隐藏时通知 MainWindow 订阅或取消订阅后端的计算
+    visibility_changed = pyqtSignal(bool)
+
     def __init__(self, parent=None):
         super().__init__(parent)
 
@@ -59,4 +62,12 @@ class BandPowerWidget(pg.GraphicsLayoutWidget):
         self.bar_graph.setOpts(height=safe_powers)
 
     def clear_plots(self):
-        self.bar_graph.setOpts(height=np.zeros(len(BAND_NAMES), dtype=np.float32))
\ No newline at end of file
+        self.bar_graph.setOpts(height=np.zeros(len(BAND_NAMES), dtype=np.float32))
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.visibility_changed.emit(True)
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.visibility_changed.emit(False)
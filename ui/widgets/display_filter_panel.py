@@ -23,6 +23,12 @@ class DisplayFilterPanel(QWidget):
     notch_filter_changed = pyqtSignal(bool, float)
     # 信号：发送 Y 轴缩放值 (0 = Auto, 其他值为固定的 +/- uV)
     vert_scale_changed = pyqtSignal(int)
+    # 信号：时域波形的排布方式 ('classic' / 'stacked')
+    render_mode_changed = pyqtSignal(str)
+    # 信号：实时波形是否使用扫描 (Sweep) 模式
+    sweep_mode_changed = pyqtSignal(bool)
+    # 信号：重参考方式 ('none' / 'car' / 'linked_mastoids')
+    reference_changed = pyqtSignal(str)
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -124,7 +130,8 @@ class DisplayFilterPanel(QWidget):
 
         # 1. Time Window
         self.duration_spinbox = QSpinBox()
-        self.duration_spinbox.setRange(2, 60)
+        # 长窗口由绘图金字塔的 min/max 层提供，最长 30 分钟
+        self.duration_spinbox.setRange(2, 1800)
         self.duration_spinbox.setValue(5)
         self.duration_spinbox.setSuffix(" s")
         self._config_spinbox(self.duration_spinbox)
@@ -141,7 +148,28 @@ class DisplayFilterPanel(QWidget):
         self.scale_combo.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Fixed)
         self._add_row(grid_layout, 1, "Vert Scale:", self.scale_combo)
 
-        # 3. High-pass
+        # 3. Layout (每通道独立视图 / 单视图堆叠，通道多时堆叠更流畅)
+        self.layout_combo = QComboBox()
+        self.layout_combo.addItem("Per-channel", "classic")
+        self.layout_combo.addItem("Stacked", "stacked")
+        self.layout_combo.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Fixed)
+        self._add_row(grid_layout, 2, "Layout:", self.layout_combo)
+
+        # 4. Live Mode (滚动 / 示波器式扫描，扫描模式每帧只重画新数据，适合长窗口)
+        self.live_mode_combo = QComboBox()
+        self.live_mode_combo.addItems(["Scroll", "Sweep"])
+        self.live_mode_combo.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Fixed)
+        self._add_row(grid_layout, 3, "Live Mode:", self.live_mode_combo)
+
+        # 5. Reference (重参考，在空间滤波级与 ICA 合成为一次矩阵乘法)
+        self.reference_combo = QComboBox()
+        self.reference_combo.addItem("None", "none")
+        self.reference_combo.addItem("Common Average", "car")
+        self.reference_combo.addItem("Linked Mastoids", "linked_mastoids")
+        self.reference_combo.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Fixed)
+        self._add_row(grid_layout, 4, "Reference:", self.reference_combo)
+
+        # 6. High-pass
         self.hp_spinbox = QDoubleSpinBox()
         self.hp_spinbox.setRange(0.0, 100.0)
         self.hp_spinbox.setValue(0.5)
@@ -149,9 +177,9 @@ class DisplayFilterPanel(QWidget):
         self.hp_spinbox.setSingleStep(0.1)
         self.hp_spinbox.setDecimals(2)
         self._config_spinbox(self.hp_spinbox)
-        self._add_row(grid_layout, 2, "High-pass:", self.hp_spinbox)
+        self._add_row(grid_layout, 5, "High-pass:", self.hp_spinbox)
 
-        # 4. Low-pass
+        # 7. Low-pass
         self.lp_spinbox = QDoubleSpinBox()
         self.lp_spinbox.setRange(10.0, 1000.0)
         self.lp_spinbox.setValue(100.0)
@@ -159,7 +187,7 @@ class DisplayFilterPanel(QWidget):
         self.lp_spinbox.setSingleStep(5.0)
         self.lp_spinbox.setDecimals(1)
         self._config_spinbox(self.lp_spinbox)
-        self._add_row(grid_layout, 3, "Low-pass:", self.lp_spinbox)
+        self._add_row(grid_layout, 6, "Low-pass:", self.lp_spinbox)
 
         main_layout.addLayout(grid_layout)
 
@@ -228,7 +256,7 @@ class DisplayFilterPanel(QWidget):
 
     def sizeHint(self):
         # 稍微增加一点高度以容纳新的一行
-        return QSize(280, 300)
+        return QSize(280, 430)
 
     def _on_apply_settings(self):
         duration = self.duration_spinbox.value()
@@ -260,6 +288,10 @@ class DisplayFilterPanel(QWidget):
         self.vert_scale_changed.emit(scale_val)
         # ---------------------------
 
+        self.render_mode_changed.emit(self.layout_combo.currentData())
+        self.sweep_mode_changed.emit(self.live_mode_combo.currentText() == "Sweep")
+        self.reference_changed.emit(self.reference_combo.currentData())
+
         notch_enabled = self.notch_checkbox.isChecked()
         freq_text = self.notch_freq_combo.currentText()
         notch_freq = float(freq_text.split()[0])
@@ -4,7 +4,7 @@ import sys
 from PyQt6.QtWidgets import (QDialog, QWidget, QVBoxLayout, QHBoxLayout, QGridLayout,
                              QPushButton, QLineEdit, QLabel, QFrame, QGraphicsDropShadowEffect,
                              QSizePolicy, QApplication)
-from PyQt6.QtCore import Qt, QSize, QPoint
+from PyQt6.QtCore import Qt, QSize, QPoint, pyqtSignal
 from PyQt6.QtGui import QColor, QFont
 
 # --- 核心数据结构 (保持不变) ---
@@ -139,6 +139,9 @@ class CruxButton(QPushButton):
 
 
 class EyeTypingWidget(QDialog):
+    # 提前决策开关 (更快地识别连续的命令，但误判更多)
+    early_decision_toggled = pyqtSignal(bool)
+
     def __init__(self, parent=None):
         super().__init__(parent)
         # 1. 设置无边框和透明背景
@@ -216,10 +219,32 @@ class EyeTypingWidget(QDialog):
         """)
         btn_close.clicked.connect(self.close)
 
+        # 提前决策开关
+        self.btn_fast = QPushButton("⚡")
+        self.btn_fast.setCheckable(True)
+        self.btn_fast.setFixedSize(36, 36)
+        self.btn_fast.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.btn_fast.setToolTip("Early decision: recognize back-to-back commands faster (more mistakes)")
+        self.btn_fast.setStyleSheet(f"""
+            QPushButton {{
+                color: #B0BEC5;
+                font-size: 18px;
+                border: none;
+                background: transparent;
+                border-radius: 18px;
+            }}
+            QPushButton:checked {{
+                color: {COLORS['accent']};
+                background-color: #FFF8E1;
+            }}
+        """)
+        self.btn_fast.toggled.connect(self.early_decision_toggled)
+
         top.addWidget(lbl_icon)
         top.addWidget(lbl_title)
         top.addWidget(lbl_version)
         top.addStretch()
+        top.addWidget(self.btn_fast)
         top.addWidget(btn_close)
 
         layout.addLayout(top)
@@ -284,6 +309,12 @@ class EyeTypingWidget(QDialog):
 
     # ... (on_prediction_received, _handle_home, _handle_group 逻辑保持不变) ...
 
+    def set_early_decision_checked(self, checked):
+        """同步开关状态 (不发出 early_decision_toggled)"""
+        self.btn_fast.blockSignals(True)
+        self.btn_fast.setChecked(checked)
+        self.btn_fast.blockSignals(False)
+
     def on_prediction_received(self, cmd):
         cmd = cmd.upper()
         if self.current_state == self.STATE_HOME:
@@ -1,7 +1,7 @@
 # File: ui/widgets/frequency_domain_widget.py
 
 import pyqtgraph as pg
-from PyQt6.QtCore import pyqtSlot
+from PyQt6.QtCore import pyqtSlot, pyqtSignal
 import numpy as np
 
 PLOT_COLORS = [
@@ -11,6 +11,9 @@ PLOT_COLORS = [
 
 
 class FrequencyDomainWidget(pg.GraphicsLayoutWidget):
+    # 显示/隐藏时通知 MainWindow 订阅或取消订阅后端的计算
+    visibility_changed = pyqtSignal(bool)
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.num_channels = 8
@@ -113,4 +116,12 @@ class FrequencyDomainWidget(pg.GraphicsLayoutWidget):
     def clear_plots(self):
         empty = np.array([], dtype=np.float32)
         for curve in self.curves:
-            curve.setData(empty, empty)
\ No newline at end of file
+            curve.setData(empty, empty)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.visibility_changed.emit(True)
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.visibility_changed.emit(False)
@@ -29,9 +29,10 @@ class HeaderStatusWidget(QWidget):
         self.status_lbl = QLabel("Status: Disconnected")
         self.pps_lbl = QLabel("PPS: 0.0")
         self.kbs_lbl = QLabel("Rate: 0.0 KB/s")
+        self.load_lbl = QLabel("Load: Normal")
 
         # 【优化3】设置标签内部文字垂直居中，防止字体自身基线偏移
-        for lbl in [self.status_lbl, self.pps_lbl, self.kbs_lbl]:
+        for lbl in [self.status_lbl, self.pps_lbl, self.kbs_lbl, self.load_lbl]:
             lbl.setAlignment(Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignLeft)
 
         # 字体样式
@@ -39,6 +40,7 @@ class HeaderStatusWidget(QWidget):
         self.status_lbl.setStyleSheet(status_style)
         self.pps_lbl.setStyleSheet(status_style)
         self.kbs_lbl.setStyleSheet(status_style)
+        self.load_lbl.setStyleSheet(status_style)
 
         # --- 布局排列 ---
         layout.addWidget(self.status_lbl)
@@ -51,6 +53,10 @@ class HeaderStatusWidget(QWidget):
         layout.addWidget(self._create_separator())
         layout.addWidget(self.kbs_lbl)
 
+        # 添加分割线
+        layout.addWidget(self._create_separator())
+        layout.addWidget(self.load_lbl)
+
     def _create_separator(self):
         """创建垂直分割线，并固定高度以防撑乱布局"""
         line = QFrame()
@@ -98,6 +104,16 @@ class HeaderStatusWidget(QWidget):
 
             self.last_stat_time = current_time
 
+    @pyqtSlot(int, str)
+    def update_load_state(self, level, description):
+        """显示 LoadGovernor 的降级状态"""
+        self.load_lbl.setText(f"Load: {description}")
+        if level == 0:
+            self.load_lbl.setStyleSheet("font-size: 9pt; color: #555;")
+        else:
+            # 橙色: 正在降级运行
+            self.load_lbl.setStyleSheet("font-size: 9pt; color: #E65100; font-weight: bold;")
+
     def sizeHint(self):
         """建议尺寸，确保在某些系统下能获得足够的高度"""
         return QSize(400, 30)
\ No newline at end of file
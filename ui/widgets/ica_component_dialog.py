@@ -1,24 +1,197 @@
 # File: ui/widgets/ica_component_dialog.py
 
+import collections
 import numpy as np
 import pyqtgraph as pg
-from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QWidget, QScrollArea, QGridLayout,
-                             QCheckBox, QDialogButtonBox, QLabel)
-from PyQt6.QtCore import Qt
-from scipy import signal
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QDialogButtonBox, QLabel, QListView,
+                             QStyledItemDelegate, QStyle, QStyleOptionButton, QApplication,
+                             QAbstractItemView)
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex, QRectF, QRect, QSize, QEvent
+from PyQt6.QtGui import QPen, QColor, QBrush, QTransform
+
+ROW_HEIGHT = 150
+LABEL_WIDTH = 150
+PLOT_MARGIN = 8
+PATH_CACHE_SIZE = 128  # 缓存的曲线路径数 (按行)
+
+TIME_COLOR = '#1976D2'
+PSD_COLOR = '#388E3C'
+SUGGESTED_COLOR = '#D32F2F'
+
+
+class ComponentListModel(QAbstractListModel):
+    """每行一个 ICA 成分；勾选状态即是否去除"""
+
+    def __init__(self, summary, suggested_indices, parent=None):
+        super().__init__(parent)
+        self.summary = summary
+        self.suggested = set(suggested_indices)
+        self.checked = [i in self.suggested for i in range(len(summary.kurtosis))]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.checked)
+
+    def flags(self, index):
+        return Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsUserCheckable
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        if role == Qt.ItemDataRole.DisplayRole:
+            return f"IC {row}"
+        if role == Qt.ItemDataRole.CheckStateRole:
+            return Qt.CheckState.Checked if self.checked[row] else Qt.CheckState.Unchecked
+        return None
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if role != Qt.ItemDataRole.CheckStateRole or not index.isValid():
+            return False
+        self.checked[index.row()] = Qt.CheckState(value) == Qt.CheckState.Checked
+        self.dataChanged.emit(index, index, [role])
+        return True
+
+
+class ComponentDelegate(QStyledItemDelegate):
+    """
+    直接用 QPainter 绘制一行：勾选框 + 统计量 | 时域预览 | PSD。
+    QListView 只对滚动到可见区域的行调用 paint()，曲线路径按行缓存，滚动时不重复构造。
+    """
+
+    def __init__(self, summary, parent=None):
+        super().__init__(parent)
+        self.summary = summary
+        self._paths = collections.OrderedDict()
+        self._time_range = (float(summary.times[0]), float(summary.times[-1])) if len(summary.times) else (0.0, 1.0)
+        self._freq_range = (float(summary.freqs[0]), float(summary.freqs[-1])) if len(summary.freqs) else (0.0, 1.0)
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), ROW_HEIGHT)
+
+    # --- 几何 ---
+    def _check_rect(self, rect):
+        size = QApplication.style().pixelMetric(QStyle.PixelMetric.PM_IndicatorWidth)
+        return QRect(rect.left() + PLOT_MARGIN, rect.top() + PLOT_MARGIN, size, size)
+
+    def _plot_rects(self, rect):
+        inner = rect.adjusted(LABEL_WIDTH, PLOT_MARGIN, -PLOT_MARGIN, -PLOT_MARGIN)
+        time_width = int(inner.width() * 0.72)
+        time_rect = QRectF(inner.left(), inner.top(), time_width - PLOT_MARGIN, inner.height())
+        psd_rect = QRectF(inner.left() + time_width, inner.top(), inner.width() - time_width, inner.height())
+        return time_rect, psd_rect
+
+    def _path(self, kind, row):
+        """归一化到单位方框的曲线路径 (x, y 都在 [0, 1])，绘制时再用变换映射到实际区域"""
+        key = (kind, row)
+        path = self._paths.get(key)
+        if path is not None:
+            self._paths.move_to_end(key)
+            return path
+
+        if kind == 'time':
+            x, y = self.summary.times, self.summary.previews[row]
+            x_range = self._time_range
+        else:
+            x, y = self.summary.freqs, self.summary.log_psd[row]
+            x_range = self._freq_range
+        lo, hi = float(np.min(y)), float(np.max(y))
+        x = (x - x_range[0]) / max(x_range[1] - x_range[0], 1e-12)
+        y = 1.0 - (y - lo) / max(hi - lo, 1e-12)
+        path = pg.arrayToQPath(x.astype(np.float64), y.astype(np.float64))
+
+        self._paths[key] = path
+        if len(self._paths) > PATH_CACHE_SIZE:
+            self._paths.popitem(last=False)
+        return path
+
+    # --- 绘制 ---
+    def paint(self, painter, option, index):
+        row = index.row()
+        rect = option.rect
+        suggested = row in index.model().suggested
+        painter.save()
+
+        if option.state & QStyle.StateFlag.State_Selected:
+            painter.fillRect(rect, QColor('#E3F2FD'))
+        painter.setPen(QPen(QColor('#E0E0E0')))
+        painter.drawLine(rect.bottomLeft(), rect.bottomRight())
+
+        # 1. 勾选框 + 文字
+        check = QStyleOptionButton()
+        check.rect = self._check_rect(rect)
+        check.state = QStyle.StateFlag.State_Enabled
+        checked = index.data(Qt.ItemDataRole.CheckStateRole) == Qt.CheckState.Checked
+        check.state |= QStyle.StateFlag.State_On if checked else QStyle.StateFlag.State_Off
+        QApplication.style().drawPrimitive(QStyle.PrimitiveElement.PE_IndicatorCheckBox, check, painter)
+
+        font = painter.font()
+        font.setBold(suggested)
+        painter.setFont(font)
+        painter.setPen(QColor(SUGGESTED_COLOR if suggested else '#202124'))
+        text_left = check.rect.right() + PLOT_MARGIN
+        title = f"IC {row}" + ("  (Artifact?)" if suggested else "")
+        painter.drawText(QRect(text_left, rect.top() + PLOT_MARGIN - 2, LABEL_WIDTH, 20),
+                         Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter, title)
+        font.setBold(False)
+        painter.setFont(font)
+        painter.setPen(QColor('#5F6368'))
+        stats = (f"Kurtosis: {self.summary.kurtosis[row]:.1f}\n"
+                 f"EOG |r|: {self.summary.eog_correlation[row]:.2f}")
+        painter.drawText(QRect(rect.left() + PLOT_MARGIN, rect.top() + 36, LABEL_WIDTH - PLOT_MARGIN, 40),
+                         Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignTop, stats)
+
+        # 2. 时域预览和 PSD
+        time_rect, psd_rect = self._plot_rects(rect)
+        for kind, area, color in (('time', time_rect, TIME_COLOR), ('psd', psd_rect, PSD_COLOR)):
+            painter.setPen(QPen(QColor('#EEEEEE')))
+            painter.setBrush(QBrush(QColor('#FAFAFA')))
+            painter.drawRect(area)
+            painter.save()
+            painter.setClipRect(area)
+            transform = QTransform()
+            transform.translate(area.left(), area.top())
+            transform.scale(area.width(), area.height())
+            painter.setTransform(transform, True)
+            pen = QPen(QColor(color))
+            pen.setCosmetic(True)  # 线宽不随缩放变化
+            painter.setPen(pen)
+            painter.setBrush(Qt.BrushStyle.NoBrush)
+            painter.drawPath(self._path(kind, row))
+            painter.restore()
+
+        painter.setPen(QColor('#9E9E9E'))
+        painter.drawText(time_rect.adjusted(4, 2, -4, -2), Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignBottom,
+                         f"{self._time_range[1]:.0f} s")
+        painter.drawText(psd_rect.adjusted(4, 2, -4, -2), Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignBottom,
+                         f"PSD (log), {self._freq_range[1]:.0f} Hz")
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        # 点击左侧标签区域切换勾选
+        if event.type() == QEvent.Type.MouseButtonRelease:
+            if event.position().x() < option.rect.left() + LABEL_WIDTH:
+                checked = index.data(Qt.ItemDataRole.CheckStateRole) == Qt.CheckState.Checked
+                new_state = Qt.CheckState.Unchecked if checked else Qt.CheckState.Checked
+                return model.setData(index, new_state.value, Qt.ItemDataRole.CheckStateRole)
+        elif event.type() == QEvent.Type.KeyPress and event.key() == Qt.Key.Key_Space:
+            checked = index.data(Qt.ItemDataRole.CheckStateRole) == Qt.CheckState.Checked
+            new_state = Qt.CheckState.Unchecked if checked else Qt.CheckState.Checked
+            return model.setData(index, new_state.value, Qt.ItemDataRole.CheckStateRole)
+        return False
 
 
 class ICAComponentDialog(QDialog):
-    def __init__(self, components_data, sampling_rate, parent=None, suggested_indices=None):
+    """
+    ICA 成分选择对话框。
+    所有预览、PSD 和统计量由 ICAProcessor 在后台算好 (ComponentSummary)，
+    这里只用虚拟化的列表绘制可见的行，成分再多、校准再长也能立即打开。
+    """
+
+    def __init__(self, summary, parent=None, suggested_indices=None):
         super().__init__(parent)
         self.setWindowTitle("Select Artifact Components to Remove")
         self.resize(1400, 800)  # 稍微调大默认尺寸
 
-        self.components = components_data
-        self.sampling_rate = sampling_rate
-        self.suggested_indices = suggested_indices or []
-        self.checkboxes = []
-
         main_layout = QVBoxLayout(self)
 
         # 顶部提示语
@@ -27,23 +200,15 @@ class ICAComponentDialog(QDialog):
         hint_label.setStyleSheet("font-size: 12px; color: #555; margin-bottom: 10px;")
         main_layout.addWidget(hint_label)
 
-        # 创建一个带滚动条的区域
-        scroll_area = QScrollArea(self)
-        scroll_area.setWidgetResizable(True)
-
-        scroll_content = QWidget()
-        self.plot_layout = QGridLayout(scroll_content)
-        self.plot_layout.setSpacing(15)
-        # 设置列比例：Checkbox(0) 最小，Time(1) 宽，Freq(2) 中等
-        self.plot_layout.setColumnStretch(0, 0)
-        self.plot_layout.setColumnStretch(1, 3)
-        self.plot_layout.setColumnStretch(2, 1)
-
-        scroll_area.setWidget(scroll_content)
-        main_layout.addWidget(scroll_area)
-
-        # 为每个成分创建图表
-        self._create_component_plots()
+        self.model = ComponentListModel(summary, suggested_indices or [], self)
+        self.list_view = QListView(self)
+        self.list_view.setModel(self.model)
+        self.list_view.setItemDelegate(ComponentDelegate(summary, self.list_view))
+        # 所有行等高，QListView 无需逐行询问尺寸
+        self.list_view.setUniformItemSizes(True)
+        self.list_view.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+        self.list_view.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        main_layout.addWidget(self.list_view)
 
         # OK 和 Cancel 按钮
         button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
@@ -51,74 +216,6 @@ class ICAComponentDialog(QDialog):
         button_box.rejected.connect(self.reject)
         main_layout.addWidget(button_box)
 
-    def _create_component_plots(self):
-        num_components, num_samples = self.components.shape
-        time_vector = np.arange(num_samples) / self.sampling_rate
-
-        linked_time_plot_view = None
-
-        for i in range(num_components):
-            # --- 0. Checkbox 设置 ---
-            checkbox = QCheckBox(f"IC {i}")
-
-            # 视觉强调建议的伪迹
-            if i in self.suggested_indices:
-                checkbox.setChecked(True)
-                checkbox.setText(f"IC {i}\n(Artifact?)")
-                # 红色粗体，醒目提示
-                checkbox.setStyleSheet("QCheckBox { color: #D32F2F; font-weight: bold; }")
-            else:
-                checkbox.setText(f"IC {i}")
-
-            # --- 1. 时域图 (Time Domain) ---
-            time_plot = pg.PlotWidget()
-            time_plot.setMinimumHeight(180)
-            # 【关键优化】开启自动降采样，大幅提升渲染性能
-            time_plot.setDownsampling(auto=True, mode='peak')
-            time_plot.setClipToView(True)
-            # 禁用菜单以提升性能
-            time_plot.setMenuEnabled(False)
-
-            time_plot.plot(time_vector, self.components[i], pen=pg.mkPen(color='#1976D2', width=1))
-            time_plot.setLabel('left', 'Amp', units='au')  # ICA源是任意单位(arbitrary units)
-            time_plot.setLabel('bottom', 'Time', units='s')
-            time_plot.showGrid(x=True, y=True, alpha=0.2)
-
-            # 仅允许X轴鼠标缩放，锁定Y轴（因为幅度并不重要，看波形形状即可）
-            time_plot.setMouseEnabled(x=True, y=False)
-
-            # 链接所有时域图的X轴，拖动一个，全部跟着动
-            if linked_time_plot_view is None:
-                linked_time_plot_view = time_plot.getViewBox()
-            else:
-                time_plot.setXLink(linked_time_plot_view)
-
-            # --- 2. 频域图 (PSD) ---
-            psd_plot = pg.PlotWidget()
-            psd_plot.setMinimumHeight(180)
-            psd_plot.setMenuEnabled(False)
-
-            # 计算 PSD
-            freqs, psd = signal.welch(self.components[i], fs=self.sampling_rate, nperseg=self.sampling_rate * 2)
-
-            psd_plot.plot(freqs, psd, pen=pg.mkPen(color='#388E3C', width=1), fillLevel=-140, brush=(56, 142, 60, 50))
-            psd_plot.setLabel('bottom', 'Freq', units='Hz')
-            psd_plot.setLogMode(x=False, y=True)
-            psd_plot.showGrid(x=True, y=True, alpha=0.3)
-
-            # 【关键优化】限制显示范围到 0-120Hz，这是脑电和EOG主要能量分布区
-            psd_plot.setXRange(0, 120)
-
-            # 眨眼通常表现为低频极高能量，通过限制范围能看清楚低频部分
-
-            # --- 3. 布局添加 ---
-            # Checkbox 居中对齐
-            self.plot_layout.addWidget(checkbox, i, 0, Qt.AlignmentFlag.AlignCenter)
-            self.plot_layout.addWidget(time_plot, i, 1)
-            self.plot_layout.addWidget(psd_plot, i, 2)
-
-            self.checkboxes.append(checkbox)
-
     def get_selected_indices(self):
         """返回被勾选的成分的索引列表"""
-        return [i for i, checkbox in enumerate(self.checkboxes) if checkbox.isChecked()]
\ No newline at end of file
+        return [i for i, checked in enumerate(self.model.checked) if checked]
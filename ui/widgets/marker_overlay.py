@@ -0,0 +1,123 @@
+# File: ui/widgets/marker_overlay.py
+
+import numpy as np
+import pyqtgraph as pg
+from PyQt6.QtCore import Qt, QRectF, QLineF, QPointF
+from PyQt6.QtGui import QFontMetrics, QColor
+
+LABEL_GAP_PX = 6  # 相邻标签之间的最小像素间距
+
+
+class MarkerOverlayItem(pg.GraphicsObject):
+    """
+    批量绘制 Marker 的图元：一个 PlotItem 只需要一个实例。
+    - 所有 Marker 保存在排序好的时间戳数组里，绘制时用 searchsorted 裁剪到可见范围。
+    - 同一像素列上的多条竖线只画一次。
+    - 标签从左到右排布，放不下的直接跳过，而不是叠在一起。
+    另外支持一组临时的 "live" 竖线 (实时模式下打点时的闪烁提示)。
+    """
+
+    def __init__(self, pen=None, label_color='#D32F2F', live_pen=None):
+        super().__init__()
+        self.pen = pen if pen is not None else pg.mkPen('r', style=Qt.PenStyle.DashLine, width=1)
+        self.live_pen = live_pen if live_pen is not None else pg.mkPen('g', style=Qt.PenStyle.DashLine, width=2)
+        self.label_color = QColor(label_color)
+        self.show_labels = True
+
+        self._positions = np.empty(0, dtype=np.float64)
+        self._labels = []
+        self._live_positions = np.empty(0, dtype=np.float64)
+
+        # 画在曲线之上
+        self.setZValue(10)
+
+    # --- 数据接口 ---
+    def set_markers(self, positions, labels=None):
+        positions = np.asarray(positions, dtype=np.float64).ravel()
+        if labels is not None:
+            # 标签与时间戳数量不一致时按较短的一方截断 (与 zip 相同)，缺失的标签为空字符串
+            labels = ['' if label is None else str(label) for label in labels]
+            n = min(len(positions), len(labels))
+            positions, labels = positions[:n], labels[:n]
+        order = np.argsort(positions, kind='stable')
+        self._positions = positions[order]
+        self._labels = [] if labels is None else [labels[i] for i in order]
+        self.update()
+
+    def set_live_markers(self, positions):
+        self._live_positions = np.sort(np.asarray(positions, dtype=np.float64).ravel())
+        self.update()
+
+    def clear(self):
+        self._positions = np.empty(0, dtype=np.float64)
+        self._labels = []
+        self._live_positions = np.empty(0, dtype=np.float64)
+        self.update()
+
+    # --- QGraphicsItem 接口 ---
+    def boundingRect(self):
+        # 竖线贯穿整个可见区域，因此外接矩形就是当前视野
+        view_rect = self.viewRect()
+        return QRectF() if view_rect is None else view_rect
+
+    def viewRangeChanged(self):
+        self.prepareGeometryChange()
+        self.update()
+
+    def paint(self, painter, *args):
+        view_rect = self.viewRect()
+        if view_rect is None:
+            return
+        px = self.pixelWidth()
+        if px <= 0:
+            return
+
+        x_min, x_max = view_rect.left(), view_rect.right()
+        y_top, y_bottom = view_rect.top(), view_rect.bottom()
+
+        # 1. 静态 Marker
+        lo = np.searchsorted(self._positions, x_min, side='left')
+        hi = np.searchsorted(self._positions, x_max, side='right')
+        if hi > lo:
+            visible = self._positions[lo:hi]
+            keep = self._first_per_pixel(visible, x_min, px)
+            painter.setPen(self.pen)
+            painter.drawLines([QLineF(x, y_top, x, y_bottom) for x in visible[keep]])
+
+            if self.show_labels and self._labels:
+                # ViewBox 的 y 轴向上，rect.bottom() 才是视觉上的顶部
+                self._paint_labels(painter, lo + np.flatnonzero(keep), y_bottom)
+
+        # 2. 临时 Marker
+        if len(self._live_positions):
+            painter.setPen(self.live_pen)
+            painter.drawLines([QLineF(x, y_top, x, y_bottom) for x in self._live_positions])
+
+    @staticmethod
+    def _first_per_pixel(positions, x_min, px):
+        """同一像素列只保留第一条线"""
+        columns = np.floor((positions - x_min) / px).astype(np.int64)
+        keep = np.ones(len(columns), dtype=bool)
+        keep[1:] = np.diff(columns) != 0
+        return keep
+
+    def _paint_labels(self, painter, indices, y_upper):
+        # 在设备坐标下写字，避免文字被数据坐标系缩放
+        transform = painter.transform()
+        metrics = QFontMetrics(painter.font())
+        text_y = transform.map(QPointF(0, y_upper)).y() + metrics.ascent() + 2
+
+        painter.save()
+        painter.resetTransform()
+        painter.setPen(self.label_color)
+
+        next_free_x = -np.inf
+        for i in indices:
+            text = self._labels[i]
+            x_dev = transform.map(QPointF(self._positions[i], y_upper)).x() + 3
+            if x_dev < next_free_x:
+                continue
+            painter.drawText(QPointF(x_dev, text_y), text)
+            next_free_x = x_dev + metrics.horizontalAdvance(text) + LABEL_GAP_PX
+
+        painter.restore()
@@ -99,14 +99,21 @@
 
 # File: ui/widgets/review_dialog.py
 
-from PyQt6.QtWidgets import QDialog, QVBoxLayout, QSplitter, QWidget
-from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import QDialog, QVBoxLayout, QSplitter, QWidget, QCheckBox
+from PyQt6.QtCore import Qt, QThread, QTimer, pyqtSignal
 from PyQt6.QtGui import QGuiApplication, QIcon
 from .time_domain_widget import TimeDomainWidget
 from .frequency_domain_widget import FrequencyDomainWidget
+from processing.review_spectrum import ReviewSpectrumWorker
+
+SPECTRUM_DEBOUNCE_MS = 150  # 平移/缩放结束后多久再请求频谱
 
 
 class ReviewDialog(QDialog):
+    # 发往频谱工作线程的请求 (跨线程，自动排队)
+    spectrum_source_changed = pyqtSignal(str, object, float)
+    spectrum_requested = pyqtSignal(int, float, float, int)
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle("File Review")
@@ -151,6 +158,34 @@ class ReviewDialog(QDialog):
 
         layout.addWidget(self.splitter)
 
+        # 频谱范围选择：默认跟随可见窗口，勾选后跟随底部时间轴上的选区
+        self.selection_checkbox = QCheckBox("Spectrum of selected range (drag the region on the time axis)")
+        self.selection_checkbox.setStyleSheet("font-size: 12px; color: #555; margin: 4px 8px;")
+        self.selection_checkbox.toggled.connect(self._on_selection_mode_toggled)
+        layout.addWidget(self.selection_checkbox)
+
+        # --- 后台频谱服务 ---
+        self._spectrum_request_id = 0
+        self._spectrum_range = None
+        self._channel_names = None
+        self._first_spectrum = True
+
+        self.spectrum_thread = QThread()
+        self.spectrum_worker = ReviewSpectrumWorker()
+        self.spectrum_worker.moveToThread(self.spectrum_thread)
+        self.spectrum_source_changed.connect(self.spectrum_worker.set_source)
+        self.spectrum_requested.connect(self.spectrum_worker.compute)
+        self.spectrum_worker.spectrum_ready.connect(self._on_spectrum_ready)
+        self.spectrum_thread.start()
+
+        self.spectrum_debounce_timer = QTimer(self)
+        self.spectrum_debounce_timer.setSingleShot(True)
+        self.spectrum_debounce_timer.setInterval(SPECTRUM_DEBOUNCE_MS)
+        self.spectrum_debounce_timer.timeout.connect(self._request_spectrum)
+
+        self.time_domain_widget.x_range_changed.connect(self._on_visible_range_changed)
+        self.time_domain_widget.selection_changed.connect(self._on_selected_range_changed)
+
     def _resize_to_screen(self):
         """屏幕自适应：占据屏幕 85% 大小并居中"""
         screen = QGuiApplication.primaryScreen()
@@ -181,6 +216,7 @@ class ReviewDialog(QDialog):
 
         channel_names = result_dict.get('channels')
         sampling_rate = result_dict.get('sampling_rate', 1000)
+        self._channel_names = channel_names
 
         # --- 1. 时域数据显示 ---
         self.time_domain_widget.display_static_data(
@@ -190,34 +226,71 @@ class ReviewDialog(QDialog):
             channel_names
         )
 
-        # --- 2. 频域数据显示 (核心修复) ---
-        freqs = result_dict['freqs']
-        mags = result_dict['mags']
+        # --- 2. 频域数据显示 ---
+        # 频谱由后台 Welch 服务按需计算 (先算全文件，之后跟随可见窗口/选区)
+        self._first_spectrum = True
+        self.frequency_domain_widget.clear_plots()
+        n_samples = result_dict['data'].shape[1]
+        file_key = f"{result_dict.get('filepath', result_dict.get('filename', ''))}:{n_samples}"
+        self.spectrum_source_changed.emit(file_key, result_dict['data'], float(sampling_rate))
+        duration = n_samples / sampling_rate
+        self._spectrum_range = (0.0, duration)
+        self._request_spectrum()
 
-        self.frequency_domain_widget.display_static_fft(
-            freqs,
-            mags,
-            channel_names
-        )
+        # --- 3. 更新窗口标题 ---
+        filename = result_dict.get('filename', 'Unknown File')
+        self.setWindowTitle(f"Reviewing: {filename}  |  Fs: {sampling_rate}Hz  |  Channels: {len(channel_names)}")
 
-        # 【核心修复逻辑】
-        # 获取频域图内部的 PlotItem 对象
-        fft_plot_item = self.frequency_domain_widget.plot
+        self.show()
 
-        # A. 解锁鼠标交互：回放模式下，允许用户缩放 X 轴和 Y 轴查看细节
-        fft_plot_item.getViewBox().setMouseEnabled(x=True, y=True)
+    # --- 频谱服务 ---
+    def _on_visible_range_changed(self, t_start, t_end):
+        if self.selection_checkbox.isChecked():
+            return
+        self._spectrum_range = (t_start, t_end)
+        self.spectrum_debounce_timer.start()
 
-        # B. 强制自动缩放：确保所有数据都在视野内
-        fft_plot_item.autoRange()
+    def _on_selected_range_changed(self, t_start, t_end):
+        if not self.selection_checkbox.isChecked():
+            return
+        self._spectrum_range = (t_start, t_end)
+        self.spectrum_debounce_timer.start()
 
-        # C. (可选) 优化初始视角：
-        # 虽然 autoRange 会显示全貌，但 EEG 高频通常没多少信息。
-        # 我们可以将初始视角设定在 0-100Hz (最常用的脑电频段)，但允许用户由缩放查看更多。
-        # 如果你想看完整的 FFT (0 - 采样率/2)，请注释掉下面这行 setXRange。
-        fft_plot_item.setXRange(0, 100)
+    def _on_selection_mode_toggled(self, checked):
+        self.time_domain_widget.set_selection_enabled(checked)
+        if not checked:
+            self._spectrum_range = self.time_domain_widget.visible_time_range()
+            self.spectrum_debounce_timer.start()
 
-        # --- 3. 更新窗口标题 ---
-        filename = result_dict.get('filename', 'Unknown File')
-        self.setWindowTitle(f"Reviewing: {filename}  |  Fs: {sampling_rate}Hz  |  Channels: {len(channel_names)}")
+    def _request_spectrum(self):
+        if self._spectrum_range is None:
+            return
+        self._spectrum_request_id += 1
+        # 直接写入 worker 的属性，让排队中的旧请求在 worker 端直接被丢弃
+        self.spectrum_worker.latest_request_id = self._spectrum_request_id
+        t_start, t_end = self._spectrum_range
+        self.spectrum_requested.emit(self._spectrum_request_id, t_start, t_end, 0)
+
+    def _on_spectrum_ready(self, result):
+        if result.get('request_id') != self._spectrum_request_id:
+            return
+
+        freqs, mags = result['freqs'], result['mags']
+        widget = self.frequency_domain_widget
+        widget.plot.setTitle(f"Welch Spectrum  {result['t_start']:.1f} - {result['t_end']:.1f} s")
+
+        if self._first_spectrum:
+            self._first_spectrum = False
+            widget.display_static_fft(freqs, mags, self._channel_names)
+            # 回放模式下允许缩放两个轴；初始视角设在最常用的 0-100Hz
+            widget.plot.getViewBox().setMouseEnabled(x=True, y=True)
+            widget.plot.setXRange(0, min(100, float(freqs[-1])))
+        else:
+            widget.update_realtime_fft(freqs, mags, force=True)
 
-        self.show()
\ No newline at end of file
+    def shutdown(self):
+        """主窗口退出时调用，停止频谱工作线程"""
+        self.spectrum_debounce_timer.stop()
+        if self.spectrum_thread.isRunning():
+            self.spectrum_thread.quit()
+            self.spectrum_thread.wait(1000)
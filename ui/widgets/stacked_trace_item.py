@@ -0,0 +1,158 @@
+# File: ui/widgets/stacked_trace_item.py
+
+import numpy as np
+import pyqtgraph as pg
+from PyQt6.QtCore import QRectF
+
+
+class StackedTraceItem(pg.GraphicsObject):
+    """
+    多通道堆叠波形图元：所有通道画在同一个 ViewBox 里，按 offset + gain 上下排布。
+    - 每帧先裁剪到可见的时间范围，再按视图的像素宽度对每个通道做 min/max 抽取 (每个像素列两个点)，
+      顶点数目与通道数 x 像素宽度成正比，与采样率和窗口长度无关。
+    - 所有通道的顶点写在一块连续的 (通道数, 点数 + 1) 缓冲区里，每行末尾一个 NaN 断开相邻通道，
+      整块缓冲区一次生成路径 (connect='finite')；画笔相同的通道在缓冲区里相邻，共用一条路径 (每种颜色一次 drawPath)。
+    """
+
+    def __init__(self, pens=None):
+        super().__init__()
+        self.pens = pens or []
+        self._x = np.empty((0, 0), dtype=np.float64)
+        self._y = np.empty((0, 0), dtype=np.float64)
+        self._paths = []  # [(pen, QPainterPath)]
+        self._source = None  # 最近一次 set_data 的 (x, y, rows)，视图范围变化时按新的范围重新抽取
+        self._built_for = None  # 最近一次抽取所用的 (可见范围, 像素宽度)
+        self._bounds = QRectF()
+
+        self.offsets = np.empty(0, dtype=np.float64)
+        self.gains = np.empty(0, dtype=np.float64)
+
+    def set_pens(self, pens):
+        self.pens = list(pens)
+        self.update()
+
+    def set_layout(self, offsets, gains):
+        """offsets/gains 长度等于通道数；y_plot = offset + gain * y"""
+        self.offsets = np.asarray(offsets, dtype=np.float64)
+        self.gains = np.asarray(gains, dtype=np.float64)
+
+    def _visible_columns(self, x):
+        """-> (可见范围内的样本区间 [lo, hi), 视图的像素宽度)；不在视图中时取全部"""
+        view = self.getViewBox()
+        if view is None or len(x) == 0:
+            self._built_for = None
+            return 0, len(x), 0
+        (x_min, x_max), _ = view.viewRange()
+        self._built_for = (x_min, x_max, int(view.width()))
+        # 两端各多留一个样本，线段连到视图边缘之外
+        lo = max(0, int(np.searchsorted(x, x_min, side='left')) - 1)
+        hi = min(len(x), int(np.searchsorted(x, x_max, side='right')) + 1)
+        return lo, max(lo, hi), int(view.width())
+
+    def _pen_groups(self, rows):
+        """按画笔把通道分组 -> [(pen, [rows])]，同组的通道在缓冲区里相邻"""
+        groups = {}
+        for row in rows:
+            pen = self.pens[row] if row < len(self.pens) else None
+            key = None if pen is None else (pen.color().rgba(), pen.widthF(), int(pen.style().value))
+            groups.setdefault(key, (pen, []))[1].append(row)
+        return list(groups.values())
+
+    def set_data(self, x, y, rows=None):
+        """
+        x: (n_points,) 共享时间轴
+        y: (n_channels, n_points) 原始幅值
+        rows: 需要绘制的通道索引 (None 表示全部)
+        """
+        if rows is None:
+            rows = np.arange(y.shape[0])
+        rows = np.asarray(rows, dtype=np.int64)
+        self._source = (x, y, rows)
+        lo, hi, width_px = self._visible_columns(x)
+        n = hi - lo
+
+        self.prepareGeometryChange()
+        if n == 0 or len(rows) == 0:
+            self._paths = []
+            self._bounds = QRectF()
+            self.update()
+            return
+
+        groups = self._pen_groups(rows)
+        ordered = np.concatenate([np.asarray(g, dtype=np.int64) for _, g in groups])
+
+        # min/max 抽取：每 step 个样本一列，列内的最小、最大值各一个点 (保留尖峰)，不足一列的尾部原样保留
+        step = n // width_px if width_px > 0 else 1
+        if step >= 2:
+            n_cols = n // step
+            end = lo + n_cols * step
+            blocks = y[ordered, lo:end]
+            starts = np.arange(0, n_cols * step, step)
+            tail = y[ordered, end:hi]
+            n_out = 2 * n_cols + tail.shape[1]
+        else:
+            n_out = n
+
+        # 缓冲区只在变大时重新分配，其余时间原地写入
+        if self._y.shape[0] < len(ordered) or self._y.shape[1] < n_out + 1:
+            shape = (max(len(ordered), self._y.shape[0]), max(n_out + 1, self._y.shape[1]))
+            self._x = np.empty(shape, dtype=np.float64)
+            self._y = np.empty(shape, dtype=np.float64)
+        x_buf = self._x[:len(ordered), :n_out + 1]
+        y_buf = self._y[:len(ordered), :n_out + 1]
+        x_view, y_view = x_buf[:, :n_out], y_buf[:, :n_out]
+
+        if step >= 2:
+            # reduceat 按列区间归约 (比 reshape 后沿很短的最后一轴归约快几倍)
+            y_view[:, 0:2 * n_cols:2] = np.minimum.reduceat(blocks, starts, axis=1)
+            y_view[:, 1:2 * n_cols:2] = np.maximum.reduceat(blocks, starts, axis=1)
+            y_view[:, 2 * n_cols:] = tail
+            x_view[:, 0:2 * n_cols:2] = x[lo:end:step]
+            x_view[:, 1:2 * n_cols:2] = x[lo:end:step]
+            x_view[:, 2 * n_cols:] = x[end:hi]
+        else:
+            y_view[:] = y[ordered, lo:hi]
+            x_view[:] = x[lo:hi]
+        y_view *= self.gains[ordered, None]
+        y_view += self.offsets[ordered, None]
+        # 每个通道的最后一个点不连到下一个通道
+        x_buf[:, -1] = np.nan
+        y_buf[:, -1] = np.nan
+
+        paths = []
+        start = 0
+        for pen, group in groups:
+            stop = start + len(group)
+            paths.append((pen, pg.arrayToQPath(x_buf[start:stop].ravel(), y_buf[start:stop].ravel(),
+                                               connect='finite', finiteCheck=False)))
+            start = stop
+        self._paths = paths
+
+        y_min, y_max = float(y_view.min()), float(y_view.max())
+        self._bounds = QRectF(float(x[0]), y_min, float(x[-1] - x[0]), y_max - y_min)
+        self.update()
+
+    def viewRangeChanged(self):
+        # 平移 / 缩放后可见范围和每个像素对应的样本数都变了；只改 y 范围时不必重新抽取
+        view = self.getViewBox()
+        if self._source is None or view is None:
+            return
+        (x_min, x_max), _ = view.viewRange()
+        if self._built_for != (x_min, x_max, int(view.width())):
+            self.set_data(*self._source)
+
+    def clear(self):
+        self._paths = []
+        self._source = None
+        self.prepareGeometryChange()
+        self._bounds = QRectF()
+        self.update()
+
+    def boundingRect(self):
+        return self._bounds
+
+    def paint(self, painter, *args):
+        for pen, path in self._paths:
+            if pen is not None:
+                painter.setPen(pen)
+            painter.drawPath(path)
@@ -0,0 +1,200 @@
+# File: ui/widgets/sweep_trace_item.py
+
+import numpy as np
+import pyqtgraph as pg
+from PyQt6.QtCore import Qt, QRectF
+from PyQt6.QtGui import QImage, QPainter, QTransform
+
+SWEEP_GAP_FRACTION = 0.02  # 写入点前方留白占窗口的比例
+MIN_SWEEP_GAP = 2  # 留白的最少样本数
+
+
+class SweepBuffer:
+    """
+    示波器扫描模式的共享数据窗口 (UI 线程内使用)。
+    样本按绝对序号 idx 写在第 idx % n_window 列，写入点到达右端后回到左侧继续覆盖。
+    多个 SweepTraceItem 共用同一个 SweepBuffer，各自记录自己已经画到哪个样本。
+    """
+
+    def __init__(self):
+        self.epoch = 0
+        self.reset(0, 1, 1.0)
+
+    def reset(self, num_channels, n_window, rate, total=0):
+        self.n_window = max(1, int(n_window))
+        self.rate = float(rate)
+        self.gap = self.gap_for(self.n_window)
+        self.data = np.zeros((num_channels, self.n_window), dtype=np.float32)
+        self.x = np.arange(self.n_window, dtype=np.float64) / self.rate
+        self.first_total = int(total)  # 窗口里最早的有效样本
+        self.total = int(total)  # 下一个写入样本的绝对序号
+        self.epoch += 1
+
+    @staticmethod
+    def gap_for(n_window):
+        return max(MIN_SWEEP_GAP, int(n_window * SWEEP_GAP_FRACTION))
+
+    @property
+    def window_seconds(self):
+        return self.n_window / self.rate
+
+    @property
+    def head_seconds(self):
+        return (self.total % self.n_window) / self.rate
+
+    def append(self, chunk):
+        """追加 (n_channels, n) 的新样本"""
+        n = chunk.shape[1]
+        if n == 0:
+            return
+        if n > self.n_window:
+            self.total += n - self.n_window
+            chunk = chunk[:, -self.n_window:]
+            n = self.n_window
+
+        for p0, p1, c0 in self.position_ranges(self.total, self.total + n):
+            self.data[:, p0:p1] = chunk[:, c0:c0 + p1 - p0]
+        self.total += n
+
+    def visible_start(self):
+        """当前仍然显示在屏幕上的最早样本 (写入点之后留白的部分除外)"""
+        return max(self.first_total, self.total - (self.n_window - self.gap))
+
+    def position_ranges(self, start, end):
+        """绝对序号区间 [start, end) -> [(列起点, 列终点, 区间内偏移)]，在窗口右端处拆开"""
+        ranges = []
+        offset = 0
+        while start < end:
+            p0 = start % self.n_window
+            p1 = min(self.n_window, p0 + end - start)
+            ranges.append((p0, p1, offset))
+            offset += p1 - p0
+            start += p1 - p0
+        return ranges
+
+
+class SweepTraceItem(pg.GraphicsObject):
+    """
+    增量绘制的扫描波形图元。
+    波形画在一张设备分辨率的 QImage 上：每帧只擦除并重画新到达的那一小段，
+    paint() 只是把整张图贴到屏幕上，因此每帧开销与新样本数成正比，而不是与窗口长度成正比。
+    视野、尺寸或布局变化时才整体重画一次。
+    """
+
+    def __init__(self, buffer, pens=None):
+        super().__init__()
+        self.buffer = buffer
+        self.pens = pens or []
+        self.rows = np.empty(0, dtype=np.int64)
+        self.offsets = np.empty(0, dtype=np.float64)
+        self.gains = np.empty(0, dtype=np.float64)
+
+        self._image = None
+        self._image_key = None
+        self._drawn_total = 0
+        self._layout_version = 0
+
+        # Y 方向的数据范围只增不减，整体重画时重新统计
+        self._bounds_total = 0
+        self._bounds_epoch = None
+        self._y_min, self._y_max = 0.0, 0.0
+
+    def set_pens(self, pens):
+        self.pens = list(pens)
+        self.invalidate()
+
+    def set_rows(self, rows, offsets, gains):
+        """rows: 需要绘制的通道；offsets/gains 按通道索引，y_plot = offset + gain * y"""
+        self.rows = np.asarray(rows, dtype=np.int64)
+        self.offsets = np.array(offsets, dtype=np.float64)
+        self.gains = np.array(gains, dtype=np.float64)
+        self._bounds_epoch = None
+        self.invalidate()
+
+    def invalidate(self):
+        """下次绘制时整体重画"""
+        self._layout_version += 1
+        self.update()
+
+    # --- 每帧由 Widget 调用 ---
+    def advance(self):
+        buf = self.buffer
+        if self._bounds_epoch != buf.epoch:
+            self._bounds_epoch = buf.epoch
+            self._bounds_total = buf.visible_start()
+            self._y_min, self._y_max = np.inf, -np.inf
+
+        if buf.total > self._bounds_total and len(self.rows):
+            y_min, y_max = self._y_min, self._y_max
+            for p0, p1, _ in buf.position_ranges(self._bounds_total, buf.total):
+                block = buf.data[self.rows, p0:p1]
+                y_min = min(y_min, float(np.min(block * self.gains[self.rows, None] + self.offsets[self.rows, None])))
+                y_max = max(y_max, float(np.max(block * self.gains[self.rows, None] + self.offsets[self.rows, None])))
+            self._bounds_total = buf.total
+            if (y_min, y_max) != (self._y_min, self._y_max):
+                self.prepareGeometryChange()
+                self._y_min, self._y_max = y_min, y_max
+
+        self.update()
+
+    # --- QGraphicsItem 接口 ---
+    def boundingRect(self):
+        if not np.isfinite(self._y_min):
+            return QRectF()
+        return QRectF(0.0, self._y_min, self.buffer.window_seconds, self._y_max - self._y_min)
+
+    def paint(self, painter, *args):
+        view_rect = self.viewRect()
+        if view_rect is None:
+            return
+        transform = painter.transform()
+        dev_rect = transform.mapRect(view_rect).toAlignedRect()
+        if dev_rect.isEmpty():
+            return
+
+        buf = self.buffer
+        key = (dev_rect.x(), dev_rect.y(), dev_rect.width(), dev_rect.height(),
+               transform.m11(), transform.m22(), transform.dx(), transform.dy(),
+               self._layout_version, buf.epoch)
+        full = (key != self._image_key or self._drawn_total < buf.first_total
+                or buf.total - self._drawn_total >= buf.n_window - buf.gap)
+
+        if full:
+            if self._image is None or self._image.size() != dev_rect.size():
+                self._image = QImage(dev_rect.size(), QImage.Format.Format_ARGB32_Premultiplied)
+            self._image.fill(Qt.GlobalColor.transparent)
+            self._image_key = key
+
+        if full or buf.total > self._drawn_total:
+            p = QPainter(self._image)
+            p.setTransform(transform * QTransform.fromTranslate(-dev_rect.x(), -dev_rect.y()))
+            if full:
+                self._draw_range(p, buf.visible_start(), buf.total)
+            else:
+                # 擦掉新数据和前方留白所在的列，再从上一次的最后一个样本接着画
+                p.setCompositionMode(QPainter.CompositionMode.CompositionMode_Clear)
+                step = 1.0 / buf.rate
+                for p0, p1, _ in buf.position_ranges(self._drawn_total, buf.total + buf.gap):
+                    p.fillRect(QRectF(buf.x[p0], view_rect.top(), (p1 - p0) * step, view_rect.height()),
+                               Qt.GlobalColor.transparent)
+                p.setCompositionMode(QPainter.CompositionMode.CompositionMode_SourceOver)
+                self._draw_range(p, max(buf.visible_start(), self._drawn_total - 1), buf.total)
+            p.end()
+            self._drawn_total = buf.total
+
+        painter.save()
+        painter.resetTransform()
+        painter.drawImage(dev_rect.topLeft(), self._image)
+        painter.restore()
+
+    def _draw_range(self, painter, start, end):
+        buf = self.buffer
+        for p0, p1, _ in buf.position_ranges(start, end):
+            if p1 - p0 < 2:
+                continue
+            x = buf.x[p0:p1]
+            for row in self.rows:
+                y = buf.data[row, p0:p1] * self.gains[row] + self.offsets[row]
+                if row < len(self.pens):
+                    painter.setPen(self.pens[row])
+                painter.drawPath(pg.arrayToQPath(x, y, connect='all', finiteCheck=False))
@@ -1,11 +1,23 @@
 # File: ui/widgets/time_domain_widget.py
 
+import time
 import pyqtgraph as pg
 import numpy as np
-from PyQt6.QtCore import QTimer, pyqtSlot, Qt
+from PyQt6.QtCore import QTimer, pyqtSlot, pyqtSignal
 from PyQt6.QtWidgets import QWidget, QVBoxLayout
 from functools import partial
 
+from .marker_overlay import MarkerOverlayItem
+from .stacked_trace_item import StackedTraceItem
+from .sweep_trace_item import SweepBuffer, SweepTraceItem
+
+LIVE_MARKER_DURATION_MS = 1500  # 实时打点提示线的显示时长
+MAX_PLOT_POINTS = 4000  # 实时窗口每通道的目标点数，用于挑选绘图金字塔的层级
+
+# 渲染模式：每通道一个 PlotItem / 所有通道堆叠在一个视图里 (适合 16-32 通道)
+RENDER_MODE_CLASSIC = 'classic'
+RENDER_MODE_STACKED = 'stacked'
+
 PLOT_COLORS = [
     "#007BFF", "#28A745", "#DC3545", "#17A2B8", "#FD7E14",
     "#6F42C1", "#343A40", "#E83E8C", "#6610f2", "#20c997"
@@ -13,6 +25,12 @@ PLOT_COLORS = [
 
 
 class TimeDomainWidget(QWidget):
+    # 可见时间范围 / 选区变化 (秒)，回放模式下用于驱动频谱计算
+    x_range_changed = pyqtSignal(float, float)
+    selection_changed = pyqtSignal(float, float)
+    # 可见通道变化，MainWindow 据此更新绘图订阅
+    visible_channels_changed = pyqtSignal(list)
+
     def __init__(self, data_processor=None, parent=None):
         super().__init__(parent)
         self.data_processor = data_processor
@@ -29,19 +47,31 @@ class TimeDomainWidget(QWidget):
 
         self.is_review_mode = False
         self.plot_seconds = 5
+        self.render_mode = RENDER_MODE_CLASSIC
+        # 扫描模式：写入点从左到右循环覆盖，每帧只画新到达的样本
+        self.sweep_enabled = False
+        self.sweep_buffer = SweepBuffer()
+        self._sweep_reset_needed = True
 
-        # 预分配 X 轴缓存
+        # 预分配 X 轴缓存 (对应当前选用的绘图金字塔层级)
         self._x_axis_cache = None
+        self._plot_level = 0
+        self._plot_rate = self.sample_rate / self.downsample_factor
         self._precompute_x_axis()
 
         # 状态
         self.individual_scales = []
+        self.channel_names = []
+        self.vertical_auto = False
+        self._applied_ranges = {}  # 自动缩放已应用到各通道的范围
         self.plot_items = []
         self.plot_curves = []
-        self.marker_lines = []
-        self.temp_marker_lines = []
+        self.marker_overlays = []
+        self.sweep_items = []
         self._is_reconfiguring = False
         self._initial_autorange_done = False
+        self._drawn_version = -1  # 已绘制的快照版本，-1 表示需要强制重绘
+        self.selection_region = None
 
         # --- 2. 独立的底部时间轴 (Footer) ---
         # 这是一个专门用来显示 X 轴刻度的 PlotItem，不画波形
@@ -71,10 +101,24 @@ class TimeDomainWidget(QWidget):
         # 固定高度：只给它留出显示文字的高度
         self.footer_plot.setMaximumHeight(40)
 
+        # Footer 与所有通道 X 轴联动，监听它即可得到当前可见时间范围
+        self.footer_plot.sigXRangeChanged.connect(self._on_x_range_changed)
+
+        # --- 2b. 堆叠模式视图 (所有通道共用一个 PlotItem + 一个图元) ---
+        self._build_stacked_plot()
+
         # --- 3. 定时器 ---
         self.plot_update_timer = QTimer(self)
         self.plot_update_timer.setInterval(16)  # ~60 FPS
-        self.plot_update_timer.timeout.connect(self.update_display)
+        self.plot_update_timer.timeout.connect(self._on_frame_timer)
+        # 每帧绘制耗时 (ms, 指数平滑)，供 LoadGovernor 调节帧率
+        self.render_cost_ms = 0.0
+
+        # 实时打点提示线：所有通道共用一个定时器
+        self.live_marker_timer = QTimer(self)
+        self.live_marker_timer.setSingleShot(True)
+        self.live_marker_timer.setInterval(LIVE_MARKER_DURATION_MS)
+        self.live_marker_timer.timeout.connect(self._clear_live_markers)
 
         # --- 4. UI 构建 ---
         main_layout = QVBoxLayout(self)
@@ -90,10 +134,20 @@ class TimeDomainWidget(QWidget):
 
     # --- 预计算 X 轴 ---
     def _precompute_x_axis(self):
-        effective_rate = self.sample_rate / self.downsample_factor
-        max_duration = 10.0
-        num_points = int(effective_rate * max_duration)
-        self._x_axis_cache = np.linspace(0, max_duration, num_points, dtype=np.float32)
+        """按时间窗口挑选点数不超过 MAX_PLOT_POINTS 的最细层级，并生成该层的 X 轴"""
+        base_rate = self.sample_rate / self.downsample_factor
+        levels = getattr(self.data_processor, 'plot_levels', None) or []
+
+        self._plot_level, self._plot_rate = 0, base_rate
+        for i, level in enumerate(levels):
+            rate = base_rate / level.decimation * (2 if level.envelope else 1)
+            self._plot_level, self._plot_rate = i, rate
+            n_points = self.plot_seconds * rate
+            if n_points <= MAX_PLOT_POINTS and n_points <= level.ring.capacity:
+                break
+
+        num_points = max(1, int(round(self.plot_seconds * self._plot_rate)))
+        self._x_axis_cache = np.arange(num_points, dtype=np.float32) / np.float32(self._plot_rate)
 
     # --- 生命周期 ---
     def start_updates(self):
@@ -104,6 +158,19 @@ class TimeDomainWidget(QWidget):
         if self.plot_update_timer.isActive():
             self.plot_update_timer.stop()
 
+    @pyqtSlot(int)
+    def set_frame_interval(self, interval_ms):
+        self.plot_update_timer.setInterval(interval_ms)
+
+    def _on_frame_timer(self):
+        drawn_version = self._drawn_version
+        t_start = time.perf_counter()
+        self.update_display()
+        # 只统计真正重绘了的帧
+        if self._drawn_version != drawn_version:
+            cost = (time.perf_counter() - t_start) * 1000
+            self.render_cost_ms += 0.2 * (cost - self.render_cost_ms)
+
     @pyqtSlot(int)
     def reconfigure_channels(self, num_channels):
         if self.num_channels == num_channels and len(self.plot_items) == num_channels:
@@ -114,15 +181,21 @@ class TimeDomainWidget(QWidget):
 
         self.num_channels = num_channels
         self.individual_scales = [200.0] * num_channels
+        self.channel_names = [f"CH {i + 1}" for i in range(num_channels)]
+        self._applied_ranges = {}
 
         self.graphics_layout.clear()
         self.plot_items.clear()
         self.plot_curves.clear()
+        self.marker_overlays.clear()
+        self.sweep_items.clear()
 
         # 定义统一的坐标轴画笔颜色
         #axis_pen = pg.mkPen(color='#808080', width=1)
         border_pen = pg.mkPen(color='#000000', width=1)
 
+        sweep_pens = [pg.mkPen(color=PLOT_COLORS[i % len(PLOT_COLORS)], width=2) for i in range(num_channels)]
+
         # 重新创建绘图对象
         for i in range(self.num_channels):
             p = pg.PlotItem()
@@ -173,8 +246,26 @@ class TimeDomainWidget(QWidget):
             color = PLOT_COLORS[i % len(PLOT_COLORS)]
             curve = p.plot(pen=pg.mkPen(color=color, width=2))
 
+            # 扫描模式下代替 curve 的增量绘制图元 (共用 sweep_buffer)
+            sweep = SweepTraceItem(self.sweep_buffer, sweep_pens)
+            sweep.set_rows([i], np.zeros(num_channels), np.ones(num_channels))
+            p.addItem(sweep)
+
+            # 每个通道只挂一个 Marker 图元 (不参与自动缩放)
+            overlay = MarkerOverlayItem()
+            p.addItem(overlay, ignoreBounds=True)
+
             self.plot_items.append(p)
             self.plot_curves.append(curve)
+            self.marker_overlays.append(overlay)
+            self.sweep_items.append(sweep)
+
+        stacked_pens = [pg.mkPen(color=PLOT_COLORS[i % len(PLOT_COLORS)], width=1) for i in range(num_channels)]
+        self.stacked_item.set_pens(stacked_pens)
+        self.stacked_item.clear()
+        self.stacked_sweep_item.set_pens(stacked_pens)
+        self._sweep_reset_needed = True
+        self._apply_trace_visibility()
 
         # 更新布局
         self._update_layout()
@@ -182,12 +273,94 @@ class TimeDomainWidget(QWidget):
         self._initial_autorange_done = False
         self._is_reconfiguring = False
         self.plot_update_timer.start()
+        self.visible_channels_changed.emit(self.visible_channels())
+
+    def _build_stacked_plot(self):
+        border_pen = pg.mkPen(color='#000000', width=1)
+        p = pg.PlotItem()
+        p.getViewBox().setBorder(None)
+        for axis in ('left', 'right', 'top', 'bottom'):
+            p.showAxis(axis, True)
+            p.getAxis(axis).setPen(border_pen)
+        # 与 Footer 左右轴宽度一致，保证时间刻度对齐
+        p.getAxis('left').setWidth(60)
+        p.getAxis('right').setWidth(10)
+        for axis in ('right', 'top', 'bottom'):
+            p.getAxis(axis).setStyle(showValues=False)
+        p.showGrid(x=True, y=False, alpha=0.3)
+
+        # 泳道布局固定，只允许 X 方向交互
+        p.getViewBox().setMouseEnabled(x=True, y=False)
+        p.setMenuEnabled(False)
+        p.hideButtons()
+
+        self.stacked_item = StackedTraceItem()
+        p.addItem(self.stacked_item)
+        self.stacked_sweep_item = SweepTraceItem(self.sweep_buffer)
+        p.addItem(self.stacked_sweep_item)
+        self.stacked_overlay = MarkerOverlayItem()
+        p.addItem(self.stacked_overlay, ignoreBounds=True)
+
+        self.stacked_plot = p
+        self._stacked_rows = np.empty(0, dtype=np.int64)
+
+    def _update_stacked_lanes(self):
+        """可见通道自上而下排列，每个通道占一个高度为 1 的泳道"""
+        rows = self.visible_channels()
+        n_rows = len(rows)
+        offsets = np.zeros(self.num_channels, dtype=np.float64)
+        gains = np.zeros(self.num_channels, dtype=np.float64)
+        ticks = []
+        for lane, idx in enumerate(rows):
+            offsets[idx] = n_rows - 1 - lane
+            # +/- scale 对应泳道的上下边界
+            gains[idx] = 0.5 / max(self.individual_scales[idx], 1e-6)
+            ticks.append((offsets[idx], self.channel_names[idx]))
+
+        self._stacked_rows = np.asarray(rows, dtype=np.int64)
+        self.stacked_sweep_item.set_rows(rows, offsets, gains)
+        self._drawn_version = -1
+        self.stacked_item.set_layout(offsets, gains)
+        self.stacked_plot.getAxis('left').setTicks([ticks, []])
+        self.stacked_plot.setYRange(-0.5, max(n_rows, 1) - 0.5, padding=0)
+
+    @pyqtSlot(bool)
+    def set_sweep_mode(self, enabled):
+        if enabled == self.sweep_enabled:
+            return
+        self.sweep_enabled = enabled
+        self._sweep_reset_needed = True
+        self._drawn_version = -1
+        self._apply_trace_visibility()
+
+    def _apply_trace_visibility(self):
+        """根据 扫描/滚动 和 回放 状态切换实际显示的波形图元"""
+        sweeping = self.sweep_enabled and not self.is_review_mode
+        for curve, sweep in zip(self.plot_curves, self.sweep_items):
+            curve.setVisible(not sweeping)
+            sweep.setVisible(sweeping)
+        self.stacked_item.setVisible(not sweeping)
+        self.stacked_sweep_item.setVisible(sweeping)
+
+    @pyqtSlot(str)
+    def set_render_mode(self, mode):
+        if mode not in (RENDER_MODE_CLASSIC, RENDER_MODE_STACKED) or mode == self.render_mode:
+            return
+        self.render_mode = mode
+        if mode == RENDER_MODE_STACKED:
+            empty = np.array([], dtype=np.float32)
+            for c in self.plot_curves: c.setData(empty, empty)
+        else:
+            self.stacked_item.clear()
+        self._update_layout()
+        self.stacked_plot.setXRange(0, self.plot_seconds)
 
     def _update_layout(self):
         """排版逻辑：数据通道平分高度，底部放置独立时间轴"""
         gl = self.graphics_layout.ci
         layout = gl.layout
         gl.clear()  # 清空 Item 引用
+        self._drawn_version = -1
 
         # 重置行高权重
         for r in range(layout.rowCount()):
@@ -201,8 +374,22 @@ class TimeDomainWidget(QWidget):
         if not visible_items:
             return
 
-        # 找到第一个可见的图表作为 X 轴联动的 Master
-        master_plot = visible_items[0][1]
+        if self.render_mode == RENDER_MODE_STACKED:
+            # 堆叠模式：只有一个数据视图，占满全部高度
+            self._update_stacked_lanes()
+            master_plot = self.stacked_plot
+            master_plot.setXLink(None)
+            gl.addItem(master_plot, row=0, col=0)
+            layout.setRowSpacing(0, 0)
+            layout.setRowStretchFactor(0, 1)
+            layout.setRowPreferredHeight(0, 0)
+            layout.setRowMinimumHeight(0, 0)
+            data_rows = 1
+            visible_items = []
+        else:
+            # 找到第一个可见的图表作为 X 轴联动的 Master
+            master_plot = visible_items[0][1]
+            data_rows = len(visible_items)
 
         # --- 1. 循环添加数据通道 ---
         for row, (idx, plot) in enumerate(visible_items):
@@ -216,7 +403,7 @@ class TimeDomainWidget(QWidget):
 
             # 设置左侧标签
             color = PLOT_COLORS[idx % len(PLOT_COLORS)]
-            plot.setLabel('left', f"CH {idx + 1}", units='µV', color=color)
+            plot.setLabel('left', self.channel_names[idx], units='µV', color=color)
 
             # 清空底部 Label (因为数字和单位都由 Footer 负责)
             plot.setLabel('bottom', None)
@@ -234,7 +421,7 @@ class TimeDomainWidget(QWidget):
             layout.setRowMinimumHeight(row, 0)
 
         # --- 2. 添加独立的 Footer 时间轴 ---
-        footer_row = len(visible_items)
+        footer_row = data_rows
 
         # Footer 必须联动 X 轴，这样拖动波形时时间轴才会动
         self.footer_plot.setXLink(master_plot)
@@ -252,21 +439,31 @@ class TimeDomainWidget(QWidget):
         if not self.isVisible() or self.is_review_mode or self._is_reconfiguring or not self.data_processor:
             return
 
-        full_data = self.data_processor.get_plot_data()
-        if full_data is None:
+        snapshot = self.data_processor.get_plot_snapshot(self._plot_level)
+        # 没有新数据、显示参数也没变：这一帧什么都不用做
+        if snapshot.version == self._drawn_version or snapshot.data.shape[0] != self.num_channels:
             return
+        self._drawn_version = snapshot.version
+        full_data = snapshot.data
 
-        effective_rate = self.sample_rate / self.downsample_factor
-        points_to_show = int(self.plot_seconds * effective_rate)
+        if self.sweep_enabled:
+            self._update_sweep(snapshot)
+            return
 
+        points_to_show = len(self._x_axis_cache)
         current_samples = full_data.shape[1]
 
         if current_samples >= points_to_show:
             y_data_slice = full_data[:, -points_to_show:]
-            x_data = self._x_axis_cache[:points_to_show]
+            x_data = self._x_axis_cache
         else:
+            # 缓冲区比窗口短：最新数据仍然对齐到右端
             y_data_slice = full_data
-            x_data = self._x_axis_cache[:current_samples]
+            x_data = self._x_axis_cache[-current_samples:]
+
+        if self.render_mode == RENDER_MODE_STACKED:
+            self.stacked_item.set_data(x_data, y_data_slice, self._stacked_rows)
+            return
 
         for curve, y_row in zip(self.plot_curves, y_data_slice):
             if curve.isVisible():
@@ -277,30 +474,91 @@ class TimeDomainWidget(QWidget):
                 p.enableAutoRange(axis='y', enable=False)
             self._initial_autorange_done = True
 
+    def _update_sweep(self, snapshot):
+        """扫描模式：只把新到达的样本交给 SweepBuffer，图元各自增量重画"""
+        buf = self.sweep_buffer
+        n_window = len(self._x_axis_cache)
+        capacity = snapshot.data.shape[1]
+        n_new = snapshot.total_samples - buf.total
+
+        # 窗口长度、金字塔层级或通道数变化时都重新开始
+        if (self._sweep_reset_needed or buf.n_window != n_window or buf.rate != self._plot_rate
+                or buf.data.shape[0] != self.num_channels or n_new < 0 or n_new > capacity):
+            # 重新开始一轮扫描，用快照里已有的数据把窗口预先填满
+            n_fill = min(snapshot.total_samples, n_window - SweepBuffer.gap_for(n_window), capacity)
+            buf.reset(self.num_channels, n_window, self._plot_rate, total=snapshot.total_samples - n_fill)
+            n_new = n_fill
+            self._sweep_reset_needed = False
+
+        if n_new > 0:
+            buf.append(snapshot.data[:, capacity - n_new:])
+
+        if self.render_mode == RENDER_MODE_STACKED:
+            if self.stacked_sweep_item.isVisible():
+                self.stacked_sweep_item.advance()
+            return
+
+        for plot, sweep in zip(self.plot_items, self.sweep_items):
+            if plot.isVisible():
+                sweep.advance()
+
+        if not self._initial_autorange_done and buf.total - buf.first_total > 10:
+            for p in self.plot_items:
+                p.enableAutoRange(axis='y', enable=False)
+            self._initial_autorange_done = True
+
     # --- 交互槽函数 ---
     @pyqtSlot(int)
     def set_sample_rate(self, new_rate):
         if self.sample_rate == new_rate: return
         self.sample_rate = new_rate
         self._precompute_x_axis()
-        for p in self.plot_items:
+        self._drawn_version = -1
+        for p in self.plot_items + [self.stacked_plot]:
             p.setXRange(0, self.plot_seconds)
 
     @pyqtSlot(int)
     def set_plot_duration(self, seconds):
         if self.is_review_mode or seconds == self.plot_seconds: return
         self.plot_seconds = seconds
-        for p in self.plot_items:
+        self._precompute_x_axis()
+        self._drawn_version = -1
+        for p in self.plot_items + [self.stacked_plot]:
             p.setXRange(0, self.plot_seconds)
 
-        effective_rate = self.sample_rate / self.downsample_factor
-        if len(self._x_axis_cache) < int(seconds * effective_rate):
-            self._precompute_x_axis()
-
     def toggle_visibility(self, channel, visible):
         if 0 <= channel < len(self.plot_items):
             self.plot_items[channel].setVisible(visible)
             self._update_layout()
+            self.visible_channels_changed.emit(self.visible_channels())
+
+    def visible_channels(self):
+        return [i for i, p in enumerate(self.plot_items) if p.isVisible()]
+
+    def _on_x_range_changed(self, view_box, x_range):
+        self.x_range_changed.emit(float(x_range[0]), float(x_range[1]))
+
+    def visible_time_range(self):
+        x_range = self.footer_plot.getViewBox().viewRange()[0]
+        return float(x_range[0]), float(x_range[1])
+
+    def set_selection_enabled(self, enabled):
+        """在底部时间轴上显示/隐藏可拖动的时间选区"""
+        if enabled and self.selection_region is None:
+            t0, t1 = self.visible_time_range()
+            span = t1 - t0
+            self.selection_region = pg.LinearRegionItem(values=(t0 + span * 0.4, t0 + span * 0.6),
+                                                        brush=pg.mkBrush(26, 115, 232, 50))
+            self.selection_region.sigRegionChangeFinished.connect(self._on_selection_changed)
+            self.footer_plot.addItem(self.selection_region)
+            self._on_selection_changed()
+        elif not enabled and self.selection_region is not None:
+            self.footer_plot.removeItem(self.selection_region)
+            self.selection_region = None
+
+    def _on_selection_changed(self):
+        t0, t1 = self.selection_region.getRegion()
+        self.selection_changed.emit(float(t0), float(t1))
 
     def _on_y_range_changed(self, channel_index):
         if self._is_reconfiguring: return
@@ -315,11 +573,16 @@ class TimeDomainWidget(QWidget):
         if 0 <= channel < len(self.plot_items):
             self.individual_scales[channel] = new_scale
             self.plot_items[channel].setYRange(-new_scale, new_scale)
+            if self.render_mode == RENDER_MODE_STACKED:
+                self._update_stacked_lanes()
 
     @pyqtSlot(int, str)
     def update_channel_name(self, channel, new_name):
         if 0 <= channel < len(self.plot_items):
+            self.channel_names[channel] = new_name
             self.plot_items[channel].getAxis('left').setLabel(new_name, units='µV')
+            if self.render_mode == RENDER_MODE_STACKED:
+                self._update_stacked_lanes()
 
     @pyqtSlot(int)
     def set_vertical_scale(self, scale_uv):
@@ -327,45 +590,64 @@ class TimeDomainWidget(QWidget):
         设置 Y 轴缩放
         :param scale_uv: 0 为 Auto, 其他值为 +/- uV 限制
         """
+        self.vertical_auto = (scale_uv == 0)
+        self._applied_ranges = {}
+
         # 更新所有通道的 scale
         for i, p in enumerate(self.plot_items):
-            if scale_uv == 0:
-                # 开启自动缩放
-                p.enableAutoRange(axis='y', enable=True)
-            else:
-                # 关闭自动缩放并设置固定范围
-                p.enableAutoRange(axis='y', enable=False)
+            # Auto 模式的范围由处理线程的 RobustRangeTracker 推送 (apply_autoscale_ranges)，
+            # 不再使用 pyqtgraph 每帧扫描全部数据点的 autoRange
+            p.enableAutoRange(axis='y', enable=False)
+            if scale_uv != 0:
                 p.setYRange(-scale_uv, scale_uv)
 
                 # 如果需要更新内部状态
                 if i < len(self.individual_scales):
                     self.individual_scales[i] = float(scale_uv)
 
+        if self.render_mode == RENDER_MODE_STACKED:
+            self._update_stacked_lanes()
+
+    @pyqtSlot(np.ndarray)
+    def apply_autoscale_ranges(self, ranges):
+        """接收处理线程推送的 [下限, 上限]，只更新范围真正变化了的通道"""
+        if not self.vertical_auto or self.is_review_mode or len(ranges) != self.num_channels:
+            return
+
+        if self.render_mode == RENDER_MODE_STACKED:
+            scales = np.maximum(np.abs(ranges[:, 0]), np.abs(ranges[:, 1]))
+            if not np.array_equal(scales, self.individual_scales):
+                self.individual_scales = [float(v) for v in scales]
+                self._update_stacked_lanes()
+            return
+
+        for i, p in enumerate(self.plot_items):
+            lo, hi = float(ranges[i, 0]), float(ranges[i, 1])
+            if self._applied_ranges.get(i) != (lo, hi):
+                self._applied_ranges[i] = (lo, hi)
+                p.setYRange(lo, hi, padding=0)
+
     # --- Marker 和 Static Mode ---
     @pyqtSlot()
     def show_live_marker(self):
-        pos = self.plot_seconds
-        pen = pg.mkPen('g', style=Qt.PenStyle.DashLine, width=2)
-        lines = []
-        for p in self.plot_items:
+        # 扫描模式下最新数据在写入点，而不是窗口右端
+        positions = [self.sweep_buffer.head_seconds if self.sweep_enabled else self.plot_seconds]
+        for p, overlay in zip(self.plot_items, self.marker_overlays):
             if p.isVisible():
-                line = pg.InfiniteLine(pos=pos, angle=90, pen=pen)
-                p.addItem(line)
-                lines.append(line)
-        self.temp_marker_lines.extend(lines)
-        QTimer.singleShot(1500, partial(self._remove_temp_lines, lines))
-
-    def _remove_temp_lines(self, lines):
-        for line in lines:
-            try:
-                if line.scene(): line.scene().removeItem(line)
-                if line in self.temp_marker_lines: self.temp_marker_lines.remove(line)
-            except:
-                pass
+                overlay.set_live_markers(positions)
+        if self.render_mode == RENDER_MODE_STACKED:
+            self.stacked_overlay.set_live_markers(positions)
+        # 连续打点时只需重启定时器
+        self.live_marker_timer.start()
+
+    def _clear_live_markers(self):
+        for overlay in self.marker_overlays + [self.stacked_overlay]:
+            overlay.set_live_markers([])
 
     def display_static_data(self, data, sampling_rate, markers=None, channel_names=None):
         self.is_review_mode = True
         self.stop_updates()
+        self._apply_trace_visibility()
 
         num_channels, num_samples = data.shape
         self.reconfigure_channels(num_channels)
@@ -377,37 +659,41 @@ class TimeDomainWidget(QWidget):
         max_val = np.max(np.abs(data)) if np.any(data) else 50.0
         if max_val < 10: max_val = 50.0
 
-        for i, p in enumerate(self.plot_items):
-            p.setXRange(0, duration)
-            p.setYRange(-max_val, max_val)
-            self.plot_curves[i].setData(time_vector, data[i], skipFiniteCheck=True)
-
         if channel_names:
             for i, name in enumerate(channel_names):
                 self.update_channel_name(i, name)
 
+        if self.render_mode == RENDER_MODE_STACKED:
+            self.individual_scales = [float(max_val)] * num_channels
+            self._update_stacked_lanes()
+            self.stacked_plot.setXRange(0, duration)
+            self.stacked_item.set_data(time_vector, data, self._stacked_rows)
+        else:
+            for i, p in enumerate(self.plot_items):
+                p.setXRange(0, duration)
+                p.setYRange(-max_val, max_val)
+                self.plot_curves[i].setData(time_vector, data[i], skipFiniteCheck=True)
+
         if markers and 'timestamps' in markers:
             self._draw_static_markers(markers, sampling_rate)
 
     def _draw_static_markers(self, markers, fs):
-        timestamps, labels = markers['timestamps'], markers['labels']
-        pen = pg.mkPen('r', style=Qt.PenStyle.DashLine, width=1)
-        for ts, lbl in zip(timestamps, labels):
-            t_sec = float(ts) / fs
-            for p in self.plot_items:
-                line = pg.InfiniteLine(pos=t_sec, angle=90, pen=pen, label=str(lbl),
-                                       labelOpts={'position': 0.1, 'color': 'r', 'movable': True})
-                p.addItem(line)
-                self.marker_lines.append(line)
+        positions = np.asarray(markers['timestamps'], dtype=np.float64) / fs
+        labels = markers['labels']
+        for overlay in self.marker_overlays + [self.stacked_overlay]:
+            overlay.set_markers(positions, labels)
 
     def clear_plots(self, for_static=False):
-        for line in self.marker_lines:
-            if line.scene(): line.scene().removeItem(line)
-        self.marker_lines.clear()
+        for overlay in self.marker_overlays + [self.stacked_overlay]:
+            overlay.clear()
 
         if not for_static:
             self.is_review_mode = False
             self._initial_autorange_done = False
+            self._drawn_version = -1
+            self._sweep_reset_needed = True
+            self._apply_trace_visibility()
             empty = np.array([], dtype=np.float32)
             for c in self.plot_curves: c.setData(empty, empty)
-            for p in self.plot_items: p.enableAutoRange(axis='y', enable=True)
\ No newline at end of file
+            for p in self.plot_items: p.enableAutoRange(axis='y', enable=True)
+            self.stacked_item.clear()
\ No newline at end of file
@@ -2,7 +2,7 @@
 
 from PyQt6.QtWidgets import QWidget, QVBoxLayout, QPushButton, QMenu
 from PyQt6.QtCore import pyqtSignal, Qt  # <--- 必须导入 Qt
-from PyQt6.QtGui import QAction
+from PyQt6.QtGui import QAction, QActionGroup
 
 # 样式表
 MENU_BUTTON_STYLE = """
@@ -42,6 +42,11 @@ class ToolsPanel(QWidget):
     eog_acquisition_triggered = pyqtSignal()
     ica_calibration_triggered = pyqtSignal(int)
     ica_toggle_changed = pyqtSignal(bool)
+    ica_method_changed = pyqtSignal(str)
+    ica_training_cancel_requested = pyqtSignal()
+    online_ica_toggled = pyqtSignal(bool)
+    asr_calibration_triggered = pyqtSignal(int)
+    asr_toggle_changed = pyqtSignal(bool)
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -90,24 +95,78 @@ class ToolsPanel(QWidget):
         self.calibrate_action = QAction("Calibrate ICA Model (30s)", self)
         self.calibrate_action.triggered.connect(self._on_start_calibration)
 
+        # 训练期间可取消
+        self.cancel_training_action = QAction("Cancel ICA Training", self)
+        self.cancel_training_action.setEnabled(False)
+        self.cancel_training_action.triggered.connect(self.ica_training_cancel_requested.emit)
+
+        # 训练算法 (互斥)
+        self.method_submenu = QMenu("ICA Algorithm", self)
+        self.method_group = QActionGroup(self)
+        self.method_group.setExclusive(True)
+        for method, label in (('picard', "Picard (fast)"), ('fastica', "FastICA")):
+            action = QAction(label, self)
+            action.setCheckable(True)
+            action.setChecked(method == 'picard')
+            action.setData(method)
+            self.method_group.addAction(action)
+            self.method_submenu.addAction(action)
+        self.method_group.triggered.connect(lambda action: self.ica_method_changed.emit(action.data()))
+
         # Action 2: 启用/禁用
         self.enable_action = QAction("Enable Real-time Cleaning", self)
         self.enable_action.setCheckable(True)
         self.enable_action.toggled.connect(self.ica_toggle_changed.emit)
 
+        # Action 3: 在线 ICA (无需校准，持续自适应并自动去除眼电成分)
+        self.online_action = QAction("Online ICA (Adaptive)", self)
+        self.online_action.setCheckable(True)
+        self.online_action.toggled.connect(self._on_online_toggled)
+
         self.ica_submenu.addAction(self.calibrate_action)
+        self.ica_submenu.addAction(self.cancel_training_action)
+        self.ica_submenu.addMenu(self.method_submenu)
         self.ica_submenu.addSeparator()
         self.ica_submenu.addAction(self.enable_action)
+        self.ica_submenu.addSeparator()
+        self.ica_submenu.addAction(self.online_action)
 
         self.ica_menu_button.setMenu(self.ica_submenu)
         main_layout.addWidget(self.ica_menu_button)
 
+        # --- 3. ASR 功能按钮 (自动清理，无需挑选成分) ---
+        self.asr_menu_button = QPushButton("🧹  ASR Artifact Removal  ▼")
+        self.asr_menu_button.setStyleSheet(MENU_BUTTON_STYLE)
+        self.asr_menu_button.setCursor(Qt.CursorShape.PointingHandCursor)
+
+        self.asr_submenu = QMenu(self)
+        self.asr_submenu.setStyleSheet(self.ica_submenu.styleSheet())
+
+        self.asr_calibrate_action = QAction("Calibrate ASR (60s, clean data)", self)
+        self.asr_calibrate_action.triggered.connect(self._on_start_asr_calibration)
+
+        self.asr_enable_action = QAction("Enable ASR Cleaning", self)
+        self.asr_enable_action.setCheckable(True)
+        self.asr_enable_action.toggled.connect(self.asr_toggle_changed.emit)
+
+        self.asr_submenu.addAction(self.asr_calibrate_action)
+        self.asr_submenu.addSeparator()
+        self.asr_submenu.addAction(self.asr_enable_action)
+
+        self.asr_menu_button.setMenu(self.asr_submenu)
+        main_layout.addWidget(self.asr_menu_button)
+
         # 添加弹簧
         main_layout.addStretch()
 
         # 初始化UI状态
         self.update_status(False)
 
+    def _on_online_toggled(self, checked):
+        if not checked:
+            self.online_action.setText("Online ICA (Adaptive)")
+        self.online_ica_toggled.emit(checked)
+
     def _on_start_calibration(self):
         calibration_duration_seconds = 30
         self.ica_calibration_triggered.emit(calibration_duration_seconds)
@@ -115,33 +174,84 @@ class ToolsPanel(QWidget):
         # 更新UI
         self.calibrate_action.setText("Calibrating (Please wait)...")
         self.calibrate_action.setEnabled(False)
+        self.asr_calibrate_action.setEnabled(False)
         self.eog_button.setEnabled(False)
 
+    def _on_start_asr_calibration(self):
+        calibration_duration_seconds = 60
+        self.asr_calibration_triggered.emit(calibration_duration_seconds)
+
+        self.asr_calibrate_action.setText("Calibrating ASR (Please wait)...")
+        self.asr_calibrate_action.setEnabled(False)
+        self.calibrate_action.setEnabled(False)
+
+    def set_asr_calibration_finished(self):
+        self.asr_calibrate_action.setText("Re-calibrate ASR")
+        self.asr_calibrate_action.setEnabled(True)
+        self.calibrate_action.setEnabled(True)
+        self.asr_enable_action.setEnabled(True)
+        # 只更新勾选状态 (DataProcessor 收到模型后已自动启用)
+        self.asr_enable_action.blockSignals(True)
+        self.asr_enable_action.setChecked(True)
+        self.asr_enable_action.blockSignals(False)
+
+    def reset_asr_ui(self):
+        self.asr_calibrate_action.setText("Calibrate ASR (60s, clean data)")
+        self.asr_enable_action.setChecked(False)
+        self.asr_enable_action.setEnabled(False)
+
     def set_calibration_finished(self):
+        self.cancel_training_action.setEnabled(False)
         self.calibrate_action.setText("Re-calibrate ICA Model")
         self.calibrate_action.setEnabled(True)
         self.enable_action.setEnabled(True)
         self.enable_action.setChecked(True)
+        self.asr_calibrate_action.setEnabled(True)
         self.eog_button.setEnabled(True)
 
     def reset_calibration_ui(self):
         self.calibrate_action.setText("Calibrate ICA Model (30s)")
         self.enable_action.setChecked(False)
         self.enable_action.setEnabled(False)
+        self.asr_calibrate_action.setEnabled(True)
         self.eog_button.setEnabled(True)
 
     def set_training_state(self):
         self.calibrate_action.setText("Computing ICA (Busy)...")
         self.calibrate_action.setEnabled(False)
+        self.cancel_training_action.setEnabled(True)
+
+    def set_training_progress(self, done, total):
+        self.calibrate_action.setText(f"Computing ICA ({done}/{total} fits)...")
 
     def update_status(self, is_connected):
+        self.cancel_training_action.setEnabled(False)
         self.eog_button.setEnabled(is_connected)
         self.ica_menu_button.setEnabled(is_connected)
+        self.asr_menu_button.setEnabled(is_connected)
 
         if not is_connected:
+            self.online_action.setChecked(False)
             self.reset_calibration_ui()
+            self.reset_asr_ui()
             self.calibrate_action.setEnabled(False)
+            self.asr_calibrate_action.setEnabled(False)
         else:
             self.calibrate_action.setEnabled(True)
+            if "Computing" in self.calibrate_action.text():
+                # 训练被取消或失败：之前的 ICA 模型 (如果有) 仍然有效
+                self.calibrate_action.setText(
+                    "Re-calibrate ICA Model" if self.enable_action.isEnabled() else "Calibrate ICA Model (30s)")
             if "Calibrate" in self.calibrate_action.text():
-                self.enable_action.setEnabled(False)
\ No newline at end of file
+                self.enable_action.setEnabled(False)
+            self.asr_calibrate_action.setEnabled(True)
+            if "Please wait" in self.asr_calibrate_action.text():
+                # 校准被取消或失败：之前的 ASR 模型 (如果有) 仍然有效
+                calibrated = self.asr_enable_action.isEnabled()
+                self.asr_calibrate_action.setText(
+                    "Re-calibrate ASR" if calibrated else "Calibrate ASR (60s, clean data)")
+
+    def update_online_ica_status(self, n_samples, excluded):
+        if not self.online_action.isChecked():
+            return
+        self.online_action.setText(f"Online ICA (Adaptive) - removing {len(excluded)} comp.")